@@ -0,0 +1,52 @@
+"""
+App Settings
+============
+
+streamlit_app_settings.json, parsed once per process and shared by both apps
+and every session, instead of being re-read on every script run. The file is
+only parsed again when its mtime or size changes, so edits still apply.
+"""
+
+import json
+import threading
+
+from storyworld_io import file_version
+
+SETTINGS_FILE = "streamlit_app_settings.json"
+
+DEFAULTS = {
+    "show_download": True,
+    "json_indent": 2,
+    "enable_editing": True,
+    "validate_schema": True,
+    "page_size": 25,
+    "sqlite_index": False,
+    "watch_files": True,
+    "profiling": False,
+    "compact_models": False,
+}
+
+_loaded = {}  # path -> (version, settings, error)
+_lock = threading.Lock()
+
+
+def load_settings(path=SETTINGS_FILE):
+    """(settings, error): DEFAULTS updated from the file, and why it couldn't be read (or None)."""
+    version = file_version(path)
+    loaded = _loaded.get(path)
+    if loaded is None or loaded[0] != version:
+        with _lock:
+            settings = dict(DEFAULTS)
+            error = None
+            if version is not None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        settings.update(json.load(f))
+                except (OSError, ValueError, TypeError) as e:
+                    error = str(e)
+            loaded = _loaded[path] = (version, settings, error)
+    return dict(loaded[1]), loaded[2]
+
+
+def get_setting(name, path=SETTINGS_FILE):
+    return load_settings(path)[0].get(name)
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Story Bible Sync
+================
+
+Keeps the story bible CSV (Ann_series_story_bible_Characters.csv, used by the
+Character Selector) and the characters/*.json profiles (used by the explorer)
+in step, in both directions:
+
+- CSV columns map to schema fields (COLUMN_FIELDS: Name -> name, Role ->
+  static_attributes.role, Groups -> groups...). Columns without a schema
+  field are kept under "story_bible" in the JSON, so nothing is lost.
+- A row edited in the CSV is written to its character file (atomically,
+  merged into what the file already has); a character file edited as JSON is
+  exported back to its row, and characters that only exist as JSON get a new
+  row (except the explorer's new_character.json placeholder). New files start
+  from the explorer's template, so they have every field the schema requires.
+  Rows and files are linked by name.
+- The last sync is remembered in .storyworld_cache/: a hash per block of
+  CHUNK_ROWS raw CSV records, a hash per row, and the (mtime, size) per file.
+  A re-sync streams the CSV, and only parses the blocks whose bytes changed
+  or that hold a row whose file was edited; everything else is reused
+  as-is. Rows exported from JSON are re-serialized alone, the rest of the
+  file is written back byte for byte. After a one-line edit of the CSV, one
+  file is written; if neither side changed, nothing is read at all.
+- A row and file that both changed since the last sync are a conflict and
+  are left alone, unless --prefer csv or --prefer json says who wins.
+
+    python bible_sync.py
+    python bible_sync.py my_bible.csv --characters characters --prefer csv
+    python bible_sync.py --dry-run
+"""
+
+import os
+import re
+import io
+import copy
+import sys
+import csv
+import json
+import pickle
+import hashlib
+import argparse
+import unicodedata
+from collections import defaultdict
+
+from search_index import fold
+from storyworld import CHARACTER_TEMPLATE, NEW_CHARACTER_FILE
+from story_bible import normalize_headers
+from storyworld_io import atomic_write_text, file_version, save_json
+
+BIBLE_FILE = "Ann_series_story_bible_Characters.csv"
+CHAR_FOLDER = "characters"
+STATE_FOLDER = ".storyworld_cache"
+EXTRA_FIELD = "story_bible"
+STATE_FORMAT = 2
+CHUNK_ROWS = 1000
+
+# CSV column -> path of the schema field it maps to
+COLUMN_FIELDS = {
+    "Name": ("name",),
+    "Role": ("static_attributes", "role"),
+    "Pronouns": ("pronouns",),
+    "Groups": ("groups",),
+    "Other Names": ("other_names",),
+    "Personality": ("personality",),
+    "Background": ("background",),
+    "Physical Description": ("physical_description",),
+    "Dialogue Style": ("dialogue_style",),
+}
+
+# Columns holding comma-separated lists in the CSV and arrays in the JSON
+LIST_COLUMNS = {"Groups", "Other Names"}
+
+# Values a blank cell stands for
+EMPTY = (None, "", [], {})
+
+CSV_SIDE = "csv"
+JSON_SIDE = "json"
+
+
+def row_hash(row):
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def name_key(name):
+    return " ".join(fold(name).split())
+
+
+def character_filename(name, taken):
+    """A new characters/ file name for name ("Dr. Eric Nilsson" -> Dr_Eric_Nilsson.json).
+
+    ASCII only ("Nyström" -> "Nystrom"): the stem is the character's id, which
+    the schema limits to letters, digits, "_" and "-".
+    """
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    stem = re.sub(r"[^A-Za-z0-9]+", "_", ascii_name).strip("_") or "character"
+    filename = f"{stem}.json"
+    n = 1
+    while filename in taken:
+        n += 1
+        filename = f"{stem}_{n}.json"
+    return filename
+
+
+def new_character(filename):
+    """Data for a character file created from a row: the explorer's template, emptied.
+
+    Gets every field the schema requires, and an id like the migrated files.
+    """
+    data = copy.deepcopy(CHARACTER_TEMPLATE)
+    data.update(id=filename[:-len(".json")], name="", pronouns="")
+    return data
+
+
+def is_template(filename, data):
+    """The explorer's "Create New Character" placeholder, which isn't a character yet."""
+    return filename == NEW_CHARACTER_FILE or data.get("id") == CHARACTER_TEMPLATE["id"]
+
+
+# === MAPPING ===
+
+def _get(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _set(data, path, value):
+    if value in EMPTY:
+        # A blank cell clears the field; text and lists stay as "" and [] since the
+        # schema requires most of them, fields that are already empty are left alone
+        parent = _get(data, path[:-1])
+        current = parent.get(path[-1]) if isinstance(parent, dict) else None
+        if current in EMPTY:
+            return
+        if isinstance(current, (str, list)):
+            parent[path[-1]] = type(current)()
+        else:
+            del parent[path[-1]]
+        return
+    for key in path[:-1]:
+        if not isinstance(data.get(key), dict):
+            data[key] = {}
+        data = data[key]
+    data[path[-1]] = value
+
+
+def row_to_character(headers, row, data=None):
+    """Character data for a CSV row, merged into the character's existing data."""
+    data = json.loads(json.dumps(data)) if data else {}
+    extra = {}
+    for column, value in zip(headers, row):
+        value = value.strip()
+        path = COLUMN_FIELDS.get(column)
+        if path is None:
+            if value:
+                extra[column] = value
+        elif column in LIST_COLUMNS:
+            _set(data, path, [v.strip() for v in value.split(",") if v.strip()])
+        else:
+            _set(data, path, value)
+    _set(data, (EXTRA_FIELD,), extra)
+    return data
+
+
+def character_to_row(headers, data, row=None):
+    """The CSV row for character data, keeping cells the character has no value for."""
+    row = list(row) if row else [""] * len(headers)
+    row += [""] * (len(headers) - len(row))
+    extra = data.get(EXTRA_FIELD) if isinstance(data.get(EXTRA_FIELD), dict) else None
+    for i, column in enumerate(headers):
+        path = COLUMN_FIELDS.get(column)
+        if path is not None:
+            value = _get(data, path)
+            if isinstance(value, list):
+                value = ", ".join(str(v) for v in value)
+            row[i] = "" if value is None else str(value)
+        elif extra is not None:
+            row[i] = str(extra.get(column, ""))
+    return row
+
+
+# === SYNC ===
+
+def state_path(csv_path, folder):
+    """Where the last sync of this CSV/folder pair is remembered."""
+    pair = f"{os.path.abspath(csv_path)}|{os.path.abspath(folder)}"
+    return os.path.join(STATE_FOLDER, f"bible_sync-{hashlib.sha1(pair.encode('utf-8')).hexdigest()[:12]}.pkl")
+
+
+def _empty_state():
+    return {"csv_version": None, "header": None, "chunks": [], "files": {}}
+
+
+def _load_state(path):
+    # Pickled like the story bible snapshots: a 50k-row state loads in milliseconds
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        state = None
+    if not isinstance(state, dict) or state.get("format") != STATE_FORMAT:
+        return _empty_state()
+    return state
+
+
+def _save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(dict(state, format=STATE_FORMAT), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _scan(folder):
+    versions = {}
+    if os.path.isdir(folder):
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    versions[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return versions
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def iter_records(f):
+    """Raw CSV records (bytes, quoted newlines included) from a binary file."""
+    record = []
+    in_quotes = False
+    for line in f:
+        record.append(line)
+        # An odd number of quotes opens or closes a quoted field spanning lines
+        if line.count(b'"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            yield b"".join(record) if len(record) > 1 else line
+            record = []
+    if record:
+        yield b"".join(record)
+
+
+def iter_chunks(records, size=CHUNK_ROWS):
+    """Lists of up to size raw records."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def chunk_hash(records):
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        digest.update(record)
+    return digest.hexdigest()
+
+
+def _parse(record):
+    return next(csv.reader([record.decode("utf-8")]), [])
+
+
+def _format(row, newline):
+    out = io.StringIO()
+    csv.writer(out, lineterminator=newline).writerow(row)
+    return out.getvalue().encode("utf-8")
+
+
+class _Sync:
+    """One sync run; see sync()."""
+
+    def __init__(self, csv_path, folder, prefer, dry_run, state):
+        self.csv_path = csv_path
+        self.folder = folder
+        self.prefer = prefer
+        self.dry_run = dry_run
+        self.state = state
+        self.result = {"json_written": [], "csv_updated": [], "csv_added": [], "conflicts": [],
+                       "csv_rewritten": False}
+        self.versions = _scan(folder)
+        known = state["files"]
+        self.json_changed = {f for f, v in self.versions.items() if f not in known or known[f][0] != v}
+        self.changed_data = {}
+        self.files_by_key = {}
+        self.linked = set()
+        self.conflicted_files = set()
+        self.taken = set(self.versions)
+        self.seen = defaultdict(int)   # name key -> rows with it so far (for "name #2" keys)
+        self.name_col = None
+
+    def link_files(self, previous):
+        """Which file belongs to which row: from the last sync, or by name for new files."""
+        known = self.state["files"]
+        self.changed_data = {f: _read_json(os.path.join(self.folder, f)) for f in sorted(self.json_changed)}
+        self.files_by_key = {key: f for f, (_, key) in known.items() if f in self.versions and key}
+        for key, (_, filename) in previous.items():
+            if filename in self.versions:
+                self.files_by_key.setdefault(key, filename)
+        # Files not linked to a row yet: the n-th row with a name gets the n-th file with it
+        linked = set(self.files_by_key.values())
+        unlinked = defaultdict(list)
+        for filename, data in self.changed_data.items():
+            if data and data.get("name") and filename not in linked:
+                unlinked[name_key(data["name"])].append(filename)
+        for key, filenames in unlinked.items():
+            for n, filename in enumerate(filenames, 1):
+                self.files_by_key.setdefault(key if n == 1 else f"{key} #{n}", filename)
+
+    def _next_key(self, base):
+        self.seen[base] += 1
+        return base if self.seen[base] == 1 else f"{base} #{self.seen[base]}"
+
+    def sync_row(self, headers, row, previous):
+        """Sync one parsed row in place; returns its (key, base, hash, file) entry, or None."""
+        name_col = self.name_col
+        if name_col is None or name_col >= len(row) or not row[name_col].strip():
+            return None
+        base = name_key(row[name_col])
+        key = self._next_key(base)
+
+        digest = row_hash(row)
+        before = previous.get(key)
+        filename = (before[1] if before else None) or self.files_by_key.get(key)
+        row_changed = before is None or before[0] != digest
+        file_changed = filename in self.json_changed
+        existing = self.changed_data.get(filename)
+        if filename:
+            self.linked.add(filename)
+
+        if row_changed and file_changed and existing is not None:
+            # Both sides changed (or were never synced) but may already agree
+            if row_to_character(headers, row, existing) == existing:
+                row_changed = file_changed = False
+        winner = None
+        if row_changed and file_changed:
+            if self.prefer is None:
+                self.result["conflicts"].append(key)
+                self.conflicted_files.add(filename)
+                # Left for the next sync, once someone decides; still linked to its file so it
+                # isn't added again as a JSON-only character, and with no hash if never synced
+                return (key, base, before[0] if before else None, filename)
+            winner = self.prefer
+        elif row_changed:
+            winner = CSV_SIDE
+        elif file_changed:
+            winner = JSON_SIDE
+
+        if winner == CSV_SIDE:
+            if not filename:
+                filename = character_filename(row[name_col].strip(), self.taken)
+                self.taken.add(filename)
+                self.linked.add(filename)
+            path = os.path.join(self.folder, filename)
+            if filename not in self.changed_data:
+                existing = _read_json(path)
+            data = row_to_character(headers, row, existing or new_character(filename))
+            if data != existing:
+                if not self.dry_run:
+                    self.versions[filename] = save_json(path, data, expected_version=self.versions.get(filename))
+                self.result["json_written"].append(filename)
+            self.changed_data[filename] = data
+        elif winner == JSON_SIDE and existing:
+            new_row = character_to_row(headers, existing, row)
+            if new_row != row:
+                row[:] = new_row
+                digest = row_hash(row)
+                self.result["csv_updated"].append(key)
+        return (key, base, digest, filename)
+
+    def run(self):
+        state = self.state
+        csv_version = file_version(self.csv_path)
+        if csv_version is not None and csv_version == state["csv_version"] and not self.json_changed:
+            return self.result  # Neither side changed since the last sync
+
+        # chunk = (hash of its raw records, one (key, base, hash, file) entry or None per record)
+        previous = {e[0]: (e[2], e[3]) for _, entries in state["chunks"] for e in entries if e}
+        self.link_files(previous)
+        # Rows linked to an edited file must be parsed even if their chunk didn't change
+        edited_keys = {key for key, f in self.files_by_key.items() if f in self.json_changed}
+
+        header = None
+        headers = list(COLUMN_FIELDS)
+        newline = "\n"
+        records = []     # every raw record, kept only when the CSV may be rewritten
+        entries = []     # one entry per record
+        chunks = []
+        csv_dirty = False
+
+        if csv_version is not None:
+            with open(self.csv_path, "rb") as f:
+                raw = iter_records(f)
+                header = next(raw, b"")
+                newline = "\r\n" if header.endswith(b"\r\n") else "\n"
+                headers = normalize_headers(_parse(header.removeprefix(b"\xef\xbb\xbf")))
+                self.name_col = headers.index("Name") if "Name" in headers else None
+                same_header = header == state["header"]
+                for i, chunk in enumerate(iter_chunks(raw, CHUNK_ROWS)):
+                    digest = chunk_hash(chunk)
+                    old = state["chunks"][i] if same_header and i < len(state["chunks"]) else None
+                    if old is not None and old[0] == digest and not any(e and e[0] in edited_keys for e in old[1]):
+                        # Unchanged since the last sync: reuse its rows without parsing
+                        for entry in old[1]:
+                            if entry:
+                                self.seen[entry[1]] += 1
+                                if entry[3]:
+                                    self.linked.add(entry[3])
+                        chunk_entries = old[1]
+                    else:
+                        chunk_entries = []
+                        for j, record in enumerate(chunk):
+                            row = _parse(record)
+                            before = list(row)
+                            chunk_entries.append(self.sync_row(headers, row, previous))
+                            if row != before:
+                                chunk[j] = _format(row, newline)
+                                csv_dirty = True
+                        chunk_entries = tuple(chunk_entries)
+                        digest = chunk_hash(chunk)
+                    chunks.append((digest, chunk_entries))
+                    entries.extend(chunk_entries)
+                    if self.json_changed:
+                        records.extend(chunk)
+
+        # Characters that only exist as JSON get a row of their own
+        for filename in sorted(self.json_changed - self.linked):
+            data = self.changed_data.get(filename)
+            if not data or not data.get("name") or is_template(filename, data):
+                continue
+            row = character_to_row(headers, data)
+            base = name_key(data["name"])
+            if records and not records[-1].endswith(b"\n"):
+                records[-1] += newline.encode("ascii")
+            records.append(_format(row, newline))
+            entries.append((self._next_key(base), base, row_hash(row), filename))
+            self.result["csv_added"].append(filename)
+            csv_dirty = True
+
+        if self.dry_run:
+            return self.result
+
+        if csv_dirty:
+            if header is None:
+                header = _format(headers, newline)
+            # Unchanged records are written back byte for byte
+            atomic_write_text(self.csv_path, (header + b"".join(records)).decode("utf-8"))
+            self.result["csv_rewritten"] = True
+            if self.result["csv_added"]:
+                # New rows went at the end; chunk them the way the next sync will read them
+                chunks = [(chunk_hash(records[i:i + CHUNK_ROWS]), tuple(entries[i:i + CHUNK_ROWS]))
+                          for i in range(0, len(records), CHUNK_ROWS)]
+
+        self.state = self.new_state(header, chunks)
+        return self.result
+
+    def new_state(self, header, chunks):
+        known = self.state["files"]
+        keys = {e[3]: e[0] for _, entries in chunks for e in entries if e and e[3]}
+        files = {}
+        for filename, version in self.versions.items():
+            if filename in self.conflicted_files:
+                # Still changed next time, so the conflict is reported again
+                if filename in known:
+                    files[filename] = known[filename]
+                continue
+            files[filename] = (version, keys.get(filename) or known.get(filename, (None, None))[1])
+        return {
+            "csv_version": file_version(self.csv_path),
+            "header": header,
+            "chunks": chunks,
+            "files": files,
+        }
+
+
+def sync(csv_path=BIBLE_FILE, folder=CHAR_FOLDER, prefer=None, dry_run=False, state_file=None):
+    """Sync the CSV and the character files; returns what was done.
+
+    {"json_written": [...], "csv_updated": [...], "csv_added": [...],
+     "conflicts": [...], "csv_rewritten": bool}
+    """
+    state_file = state_file or state_path(csv_path, folder)
+    state = _load_state(state_file)
+    run = _Sync(csv_path, folder, prefer, dry_run, state)
+    result = run.run()
+    if not dry_run and run.state is not state:
+        _save_state(state_file, run.state)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync the story bible CSV with the characters/*.json files.")
+    parser.add_argument("csv", nargs="?", default=BIBLE_FILE, help=f"Story bible CSV (default: {BIBLE_FILE})")
+    parser.add_argument("--characters", default=CHAR_FOLDER, help=f"Character folder (default: {CHAR_FOLDER})")
+    parser.add_argument("--prefer", choices=[CSV_SIDE, JSON_SIDE], help="Who wins when a row and its file both changed")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args(argv)
+
+    result = sync(args.csv, args.characters, args.prefer, args.dry_run)
+    verb = "would be " if args.dry_run else ""
+    for filename in result["json_written"]:
+        print(f"📝 {os.path.join(args.characters, filename)} {verb}updated from the CSV")
+    for key in result["csv_updated"]:
+        print(f"📝 CSV row '{key}' {verb}updated from its JSON")
+    for filename in result["csv_added"]:
+        print(f"➕ {filename} {verb}added to the CSV")
+    for key in result["conflicts"]:
+        print(f"⚠️ '{key}' changed in both the CSV and its JSON - rerun with --prefer csv or --prefer json")
+    if not any(result[k] for k in ("json_written", "csv_updated", "csv_added", "conflicts")):
+        print("✅ Story bible and characters are in sync")
+    return 1 if result["conflicts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,23 @@
 import streamlit as st
-import pandas as pd
 import json
 from datetime import datetime
-from collections import defaultdict
 import io
+from search_index import build_bible_index
+from storyworld import Storyworld
+from name_conflicts import ConflictIndex, NEAR_MATCH_KINDS, bible_characters, format_conflict
+import app_settings
+import effective_world
+# pandas (via story_bible) and storyworld_db are imported once they're needed,
+# so the page paints before the slow imports
+import profiling
+from scene_builder import (
+    SPEC_FIELDS, BATCH_FORMATS, build_scene_characters, character_lookup, generate_scene_output,
+    load_scene_specs, build_scenes, write_batch
+)
+
+# Conflicts listed one expander each; near matches are summed up per kind
+CONFLICTS_SHOWN = 50
+NEAR_MATCHES_SHOWN = 25
 
 # Set page config
 st.set_page_config(
@@ -18,8 +32,28 @@ if 'characters_df' not in st.session_state:
 if 'scene_data' not in st.session_state:
     st.session_state.scene_data = None
 
+# Per-rerun timing spans, if "profiling" is on in streamlit_app_settings.json
+profiling_enabled = profiling.enabled()
+profiler = profiling.get_recorder(st.session_state)
+if profiling_enabled:
+    profiler.begin_run()
+
+@st.cache_resource
+def get_storyworld():
+    """The storyworld JSON repository, shared by every session of this app"""
+    return Storyworld()
+
+@st.cache_resource
+def get_storyworld_db():
+    """The optional SQLite index, if switched on in streamlit_app_settings.json"""
+    if not app_settings.get_setting("sqlite_index"):
+        return None
+    import storyworld_db
+    return storyworld_db.get_db()
+
 def load_sample_data():
     """Load sample data if no CSV is uploaded"""
+    import pandas as pd
     sample_data = {
         'Name': ['Saga Lundqvist', 'Mira Nguyen', 'Elin Voss', 'Freja Holm'],
         'Role': ['Chaotic Rising Star', 'Production Queen', 'Team Leader', 'Technical Specialist'],
@@ -29,115 +63,64 @@ def load_sample_data():
     }
     return pd.DataFrame(sample_data)
 
+def get_search_index(df):
+    """Build the search index once per loaded character DataFrame"""
+    if st.session_state.get('search_index_df') is not df:
+        st.session_state.search_index = build_bible_index(df)
+        st.session_state.search_index_df = df
+    return st.session_state.search_index
+
+def get_name_index(df):
+    """Name-indexed view of the DataFrame (first row per name), built once per load"""
+    if st.session_state.get('name_index_df') is not df:
+        st.session_state.name_index = (
+            df.dropna(subset=['Name'])
+            .drop_duplicates('Name')
+            .set_index('Name', drop=False)
+        )
+        st.session_state.name_index_df = df
+    return st.session_state.name_index
+
+def get_character_lookup(df):
+    """Scene character dicts by name, built once per load (no .loc per character)"""
+    if st.session_state.get('character_lookup_df') is not df:
+        st.session_state.character_lookup = character_lookup(get_name_index(df))
+        st.session_state.character_lookup_df = df
+    return st.session_state.character_lookup
+
+def get_conflict_index(df):
+    """Name conflict index for this session, updated only for rows that changed"""
+    if 'conflict_index' not in st.session_state:
+        st.session_state.conflict_index = ConflictIndex()
+    if st.session_state.get('conflict_index_df') is not df:
+        st.session_state.conflict_index.sync(bible_characters(df))
+        st.session_state.conflict_index_df = df
+    return st.session_state.conflict_index
+
 def analyze_name_conflicts(df):
     """Detect name conflicts in the character database"""
-    conflicts = []
-
-    # Extract first and last names
-    first_names = defaultdict(list)
-    last_names = defaultdict(list)
-
-    for _, row in df.iterrows():
-        name = str(row.get('Name', ''))
-        if name and name != 'nan':
-            parts = name.split()
-            if parts:
-                first_name = parts[0]
-                first_names[first_name].append(name)
-
-                if len(parts) > 1:
-                    last_name = parts[-1]
-                    last_names[last_name].append(name)
-
-    # Find conflicts
-    for first_name, names in first_names.items():
-        if len(names) > 1:
-            conflicts.append({
-                'type': 'First Name',
-                'name': first_name,
-                'characters': names
-            })
-
-    for last_name, names in last_names.items():
-        if len(names) > 1:
-            conflicts.append({
-                'type': 'Last Name',
-                'name': last_name,
-                'characters': names
-            })
-
-    return conflicts
+    return get_conflict_index(df).conflicts()
 
 def check_scene_conflicts(selected_characters, df):
     """Check for name conflicts in selected scene characters"""
-    conflicts = []
-    first_names = defaultdict(list)
-
-    for char_name in selected_characters:
-        parts = char_name.split()
-        if parts:
-            first_name = parts[0]
-            first_names[first_name].append(char_name)
-
-    for first_name, names in first_names.items():
-        if len(names) > 1:
-            conflicts.append(f"⚠️ Multiple characters with first name '{first_name}': {', '.join(names)}")
-
-    return conflicts
-
-def generate_scene_output(scene_data):
-    """Generate formatted scene output"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    output = f"""=== SCENE BUILDER OUTPUT ===
-Generated: {timestamp}
-
-GROUP: {scene_data.get('group', 'Not specified')}
-LOCATION: {scene_data.get('location', 'Not specified')}
-
-CHARACTERS IN SCENE:
-"""
-
-    for char in scene_data.get('characters', []):
-        output += f"""• {char.get('name', 'Unknown')} ({char.get('role', 'No role')})
-  Groups: {char.get('groups', 'No group')}
-  Personality: {char.get('personality', 'No personality data')}
-  Dialogue Style: {char.get('dialogue_style', 'No dialogue style data')}
-
-"""
-
-    output += f"""SCENE CONCEPT:
-{scene_data.get('concept', 'No concept provided')}
-
-"""
-
-    if scene_data.get('conflicts'):
-        output += f"""NAME CONFLICTS TO WATCH:
-{chr(10).join(scene_data['conflicts'])}
-
-"""
-
-    output += f"""=== AI PROMPT SUGGESTION ===
-Write a scene with the following characters in {scene_data.get('location', 'an unspecified location')}:
-"""
-
-    for char in scene_data.get('characters', []):
-        output += f"- {char.get('name', 'Unknown')}: {char.get('personality', 'No personality data')}\n"
-
-    output += f"""
-Scene concept: {scene_data.get('concept', 'No concept provided')}
-
-"""
-
-    if scene_data.get('conflicts'):
-        output += "NOTE: Be careful with name conflicts - use full names or distinctive descriptors when multiple characters share first names.\n"
-
-    return output
+    conflicts = get_conflict_index(df).conflicts_among(selected_characters)
+    return [format_conflict(conflict) for conflict in conflicts]
 
 # Main app
 st.title("🎭 Character Selector & Scene Builder")
 st.markdown("*For the Ann series and They Burn Witches storyworld*")
 
+if app_settings.get_setting("watch_files"):
+    # Storyworld files changed on disk are applied in the background; the page reruns
+    import storyworld_watch
+    storyworld_watch.auto_refresh(storyworld_watch.get_watcher(get_storyworld(), get_storyworld_db()))
+else:
+    # Folders are re-checked on disk the first time this run touches them
+    get_storyworld().invalidate()
+    if get_storyworld_db():
+        with profiler.span("load.db_sync"):
+            get_storyworld_db().sync()
+
 # Sidebar for file upload and database info
 with st.sidebar:
     st.header("📁 Character Database")
@@ -146,7 +129,10 @@ with st.sidebar:
 
     if uploaded_file:
         try:
-            st.session_state.characters_df = pd.read_csv(uploaded_file)
+            # Parsed once per distinct file content, then served from cache
+            from story_bible import load_story_bible
+            with profiler.span("load.story_bible"):
+                st.session_state.characters_df = load_story_bible(uploaded_file.getvalue())
             st.success(f"Loaded {len(st.session_state.characters_df)} characters")
         except Exception as e:
             st.error(f"Error loading CSV: {e}")
@@ -170,44 +156,67 @@ with st.sidebar:
 
 # Main content area
 if st.session_state.characters_df is not None:
+    import pandas as pd
     df = st.session_state.characters_df
 
     # Two columns for main content
     col1, col2 = st.columns([1, 1])
 
-    with col1:
+    with col1, profiler.span("render.database"):
         st.header("👥 Character Database")
 
         # Name conflict analysis
-        conflicts = analyze_name_conflicts(df)
+        with profiler.span("conflicts"):
+            conflicts = analyze_name_conflicts(df)
         if conflicts:
             st.subheader("⚠️ Name Conflicts Detected")
-            for conflict in conflicts:
+            name_index = get_name_index(df)
+            shared = [c for c in conflicts if c['type'] not in NEAR_MATCH_KINDS]
+            for conflict in shared[:CONFLICTS_SHOWN]:
                 with st.expander(f"{conflict['type']}: {conflict['name']}"):
                     for char in conflict['characters']:
-                        char_data = df[df['Name'] == char].iloc[0]
+                        char_data = name_index.loc[char]
                         st.write(f"**{char}** ({char_data.get('Role', 'No role')})")
                         if 'Groups' in char_data:
                             st.write(f"Groups: {char_data.get('Groups', 'No group')}")
+            if len(shared) > CONFLICTS_SHOWN:
+                st.caption(f"...and {len(shared) - CONFLICTS_SHOWN} more shared names")
+
+            # Sound-alikes and near-typos are only hints: one collapsed list per kind
+            for kind in sorted(NEAR_MATCH_KINDS):
+                near = [c for c in conflicts if c['type'] == kind]
+                if near:
+                    with st.expander(f"{kind} ({len(near)})"):
+                        for conflict in near[:NEAR_MATCHES_SHOWN]:
+                            st.write(format_conflict(conflict))
+                        if len(near) > NEAR_MATCHES_SHOWN:
+                            st.caption(f"...and {len(near) - NEAR_MATCHES_SHOWN} more")
 
         # Character list
         st.subheader("All Characters")
-        search_term = st.text_input("Search characters:")
+        search_term = st.text_input("Search characters:", help="Matches names, other names, groups, role, personality, background and dialogue style")
 
-        display_df = df.copy()
+        display_df = df
         if search_term:
-            mask = display_df['Name'].str.contains(search_term, case=False, na=False)
-            display_df = display_df[mask]
+            results = get_search_index(df).search(search_term, limit=len(df))
+            display_df = df.loc[[row_label for row_label, _, _ in results]]
 
-        for _, char in display_df.iterrows():
+        # Scene appearances come from the storyworld index, when it's on
+        db = get_storyworld_db()
+
+        for char in display_df.to_dict('records'):
             with st.expander(f"{char.get('Name', 'Unknown')} ({char.get('Role', 'No role')})"):
                 st.write(f"**Groups:** {char.get('Groups', 'No group')}")
                 if 'Personality' in char and pd.notna(char['Personality']):
                     st.write(f"**Personality:** {char['Personality']}")
                 if 'Dialogue Style' in char and pd.notna(char['Dialogue Style']):
                     st.write(f"**Dialogue Style:** {char['Dialogue Style']}")
+                if db and isinstance(char.get('Name'), str):
+                    scenes = db.scenes_for_character(char['Name'])
+                    if scenes:
+                        st.write("**Scenes:** " + ", ".join(f"{s['scene_id']} {s['title']}" for s in scenes))
 
-    with col2:
+    with col2, profiler.span("render.scene_builder"):
         st.header("🎬 Scene Builder")
 
         # Scene building form
@@ -239,9 +248,12 @@ if st.session_state.characters_df is not None:
                     selected_characters.extend(additional_chars)
 
             # Location
+            world = get_storyworld()
+            locations = ["Stockholm", "Rwanda", "Burundi", "Lake Kivu", "Houseboat"]
+            locations += [name for name in world.location_names() if name and name not in locations]
             location = st.selectbox(
                 "Location:",
-                ["Stockholm", "Rwanda", "Burundi", "Lake Kivu", "Houseboat", "Custom"]
+                locations + ["Custom"]
             )
 
             if location == "Custom":
@@ -268,16 +280,8 @@ if st.session_state.characters_df is not None:
             scene_conflicts = check_scene_conflicts(selected_characters, df)
 
             # Build character data
-            character_data = []
-            for char_name in selected_characters:
-                char_row = df[df['Name'] == char_name].iloc[0]
-                character_data.append({
-                    'name': char_name,
-                    'role': char_row.get('Role', 'No role'),
-                    'groups': char_row.get('Groups', 'No group'),
-                    'personality': char_row.get('Personality', 'No personality data'),
-                    'dialogue_style': char_row.get('Dialogue Style', 'No dialogue style data')
-                })
+            with profiler.span("build_scene"):
+                character_data = build_scene_characters(get_character_lookup(df), selected_characters)
 
             # Store scene data
             st.session_state.scene_data = {
@@ -298,11 +302,52 @@ if st.session_state.characters_df is not None:
                 for conflict in scene_conflicts:
                     st.write(conflict)
 
+        # Many planned scenes at once, streamed into one download
+        with st.expander("📦 Batch Scene Export"):
+            st.caption(f"Upload planned scenes as CSV (columns: {', '.join(SPEC_FIELDS)}; "
+                       "characters separated by \";\") or as a JSON list of scenes.")
+            specs_file = st.file_uploader("Planned scenes", type=['csv', 'json'], key="scene_specs")
+            batch_format = st.radio("Format:", BATCH_FORMATS, horizontal=True)
+
+            if specs_file and st.button("📦 Build Scenes"):
+                try:
+                    specs = load_scene_specs(specs_file.getvalue(), specs_file.name)
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(f"Error loading scenes: {e}")
+                else:
+                    unknown = set()
+
+                    world_rules = effective_world.get_resolver(get_storyworld()).for_location
+
+                    def scenes():
+                        for scene_data in build_scenes(get_character_lookup(df), specs, get_conflict_index(df),
+                                                       world_rules=world_rules):
+                            unknown.update(scene_data.get('unknown_characters', ()))
+                            yield scene_data
+
+                    buffer = io.BytesIO()
+                    with profiler.span("batch_export"):
+                        count = write_batch(scenes(), buffer, batch_format)
+                    st.session_state.batch_export = (
+                        buffer.getvalue(), count, sorted(unknown),
+                        f"scenes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{batch_format}"
+                    )
+
+            if st.session_state.get('batch_export'):
+                data, count, unknown, file_name = st.session_state.batch_export
+                if unknown:
+                    st.warning(f"Not in the character database: {', '.join(unknown)}")
+                st.download_button(f"📥 Download {count} Scenes", data, file_name=file_name)
+
 # Scene output section
 if st.session_state.scene_data:
     st.header("📝 Scene Output")
 
-    scene_output = generate_scene_output(st.session_state.scene_data)
+    with profiler.span("render.scene_output"):
+        # World defaults merged with the location's region, memoized per region
+        world_rules = effective_world.get_resolver(get_storyworld())
+        scene_data = st.session_state.scene_data
+        scene_output = generate_scene_output({**scene_data, 'world': world_rules.for_location(scene_data['location'])})
 
     col1, col2 = st.columns([3, 1])
 
@@ -346,4 +391,8 @@ else:
     - Avoid the "Voss problem" by catching name conflicts early
     - Generate AI prompts for co-writing sessions
     - Track scene continuity across chapters
-    """)
\ No newline at end of file
+    """)
+
+if profiling_enabled:
+    profiler.end_run()
+    profiling.show_panel(profiler)
\ No newline at end of file
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Cross-Reference Resolver
+========================
+
+Scenes and relationships refer to people by display name - "characters_present",
+dialogue "speaker", relationship "between" - while characters have an
+immutable id. This module links the two:
+
+- One name index for the whole cast. Each character is filed under its id,
+  its name and other_names, and the first word of its name ("Ann" for
+  "Ann Charlotte"), all folded so case and accents don't matter.
+- A reference resolves to the first of those kinds that matches anyone:
+  an exact id beats a name or alias, which beats a first-name shorthand.
+  One match is resolved, several are ambiguous, none is dangling.
+- Updates are incremental: characters are re-filed only when their name or
+  aliases changed, and only the resolutions of the keys they touched are
+  forgotten. References are collected per file and reused while the file
+  is unchanged.
+
+    python cross_references.py             # report dangling/ambiguous references
+    python cross_references.py --format json
+"""
+
+import sys
+import json
+import argparse
+import threading
+from collections import defaultdict
+
+from search_index import fold
+from name_conflicts import name_words, split_other_names
+
+ID = "Id"
+NAME_OR_ALIAS = "Name or Alias"
+FIRST_NAME = "First Name"
+
+# Kinds in order of precedence: a reference resolves to the first kind with a match
+KINDS = [ID, NAME_OR_ALIAS, FIRST_NAME]
+
+RESOLVED = "resolved"
+AMBIGUOUS = "ambiguous"
+DANGLING = "dangling"
+
+# (folder, field) of every reference to a character by name
+REFERENCE_FIELDS = [
+    ("scenes", "characters_present"),
+    ("scenes", "dialogue.speaker"),
+    ("relationships", "between"),
+]
+
+
+def _key(text):
+    return " ".join(fold(str(text)).split())
+
+
+def reference_keys(char_id, name, other_names=()):
+    """Return {(kind, folded key)} a character can be referred to by."""
+    keys = {(ID, _key(char_id))}
+    for full_name in [name, *split_other_names(other_names)]:
+        if _key(full_name):
+            keys.add((NAME_OR_ALIAS, _key(full_name)))
+    words = name_words(name)
+    if len(words) > 1:
+        keys.add((FIRST_NAME, _key(words[0])))
+    return keys
+
+
+class ReferenceIndex:
+    """Incrementally maintained name/alias -> character id index."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = {}                    # character id -> {(kind, key)}
+        self._names = {}                   # character id -> display name
+        self._buckets = defaultdict(set)   # (kind, key) -> {character id}
+        self._signatures = {}              # character id -> (name, other_names) last indexed
+        self._resolved = {}                # folded reference -> resolution
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _touch(self, bucket_key):
+        if not self._buckets.get(bucket_key):
+            self._buckets.pop(bucket_key, None)
+        # Only resolutions of this key can have changed
+        self._resolved.pop(bucket_key[1], None)
+
+    def upsert(self, char_id, name, other_names=()):
+        """Add or update one character; only keys that changed are touched."""
+        signature = (name, tuple(split_other_names(other_names)))
+        with self._lock:
+            if self._signatures.get(char_id) == signature:
+                return False
+            new_keys = reference_keys(char_id, name, other_names)
+            old_keys = self._keys.get(char_id, set())
+            for bucket_key in old_keys - new_keys:
+                self._buckets[bucket_key].discard(char_id)
+                self._touch(bucket_key)
+            for bucket_key in new_keys - old_keys:
+                self._buckets[bucket_key].add(char_id)
+                self._touch(bucket_key)
+            self._keys[char_id] = new_keys
+            self._names[char_id] = name
+            self._signatures[char_id] = signature
+            return True
+
+    def remove(self, char_id):
+        with self._lock:
+            for bucket_key in self._keys.pop(char_id, ()):
+                self._buckets[bucket_key].discard(char_id)
+                self._touch(bucket_key)
+            self._names.pop(char_id, None)
+            self._signatures.pop(char_id, None)
+
+    def sync(self, characters):
+        """Bring the index in line with {char_id: (name, other_names)}; returns the changes."""
+        with self._lock:
+            changed = 0
+            for char_id, (name, other_names) in characters.items():
+                changed += self.upsert(char_id, name, other_names)
+            for char_id in [c for c in self._keys if c not in characters]:
+                self.remove(char_id)
+                changed += 1
+            return changed
+
+    def resolve(self, name):
+        """{"status", "kind", "ids"} for a reference; the same dict while nothing it depends on changes."""
+        key = _key(name)
+        with self._lock:
+            resolution = self._resolved.get(key)
+            if resolution is None:
+                resolution = {"status": DANGLING, "kind": None, "ids": []}
+                for kind in KINDS:
+                    ids = self._buckets.get((kind, key))
+                    if ids:
+                        resolution = {
+                            "status": RESOLVED if len(ids) == 1 else AMBIGUOUS,
+                            "kind": kind,
+                            "ids": sorted(ids),
+                        }
+                        break
+                self._resolved[key] = resolution
+            return resolution
+
+    def name(self, char_id):
+        return self._names.get(char_id)
+
+
+def world_characters(world):
+    """{char_id: (name, other_names)} for a Storyworld's characters."""
+    return {
+        char_id: (data.get("name", char_id), data.get("other_names") or [])
+        for char_id, data in world.characters().items()
+    }
+
+
+# === REFERENCES ===
+
+def _names(value):
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str) and v.strip()]
+    return []
+
+
+def file_references(folder, data):
+    """[(field, name)] of one scene or relationship file, each name once per field."""
+    found = []
+    if folder == "scenes":
+        found += [("characters_present", n) for n in _names(data.get("characters_present"))]
+        dialogue = data.iter_dialogue() if hasattr(data, "iter_dialogue") else data.get("dialogue") or []
+        found += [("dialogue.speaker", entry.get("speaker")) for entry in dialogue
+                  if isinstance(entry, dict) and isinstance(entry.get("speaker"), str) and entry["speaker"].strip()]
+    elif folder == "relationships":
+        relationship = data.get("relationship", data)
+        if isinstance(relationship, dict):
+            found += [("between", n) for n in _names(relationship.get("between"))]
+    return list(dict.fromkeys(found))
+
+
+class CrossReferences:
+    """Resolves every name reference of a Storyworld against its characters."""
+
+    def __init__(self):
+        self.index = ReferenceIndex()
+        self._lock = threading.Lock()
+        self._file_refs = {}   # (folder, filename) -> (data object, [(field, name)])
+        self._sources = None   # what the last report was built from
+        self._report = None
+
+    def _references(self, folder, items):
+        for filename, data in items.items():
+            if "error" in data:
+                continue
+            cached = self._file_refs.get((folder, filename))
+            # Loaded data is the same object while the file is unchanged
+            if cached is None or cached[0] is not data:
+                cached = self._file_refs[(folder, filename)] = (data, file_references(folder, data))
+            for field, name in cached[1]:
+                yield filename, field, name
+
+    def report(self, world):
+        """Every reference with its resolution, plus the dangling and ambiguous ones.
+
+        Rebuilt only when characters, scenes or relationships changed.
+        """
+        folders = sorted({folder for folder, _ in REFERENCE_FIELDS})
+        with self._lock:
+            # The world rebuilds these whenever one of their files changed
+            sources = (world.characters(), world.scenes(), world.relationships())
+            if self._report is not None and all(a is b for a, b in zip(sources, self._sources)):
+                return self._report
+            items = {folder: world.items(folder) for folder in folders}
+
+            self.index.sync(world_characters(world))
+            references = []
+            by_character = defaultdict(list)
+            for folder in folders:
+                for filename, field, name in self._references(folder, items[folder]):
+                    resolution = self.index.resolve(name)
+                    reference = {"folder": folder, "file": filename, "field": field, "name": name, **resolution}
+                    references.append(reference)
+                    for char_id in resolution["ids"]:
+                        by_character[char_id].append(reference)
+            for folder in folders:
+                for key in [k for k in self._file_refs if k[0] == folder and k[1] not in items[folder]]:
+                    del self._file_refs[key]
+
+            self._report = {
+                "references": references,
+                "dangling": [r for r in references if r["status"] == DANGLING],
+                "ambiguous": [r for r in references if r["status"] == AMBIGUOUS],
+                "by_character": dict(by_character),
+            }
+            self._sources = sources
+            return self._report
+
+    def resolve(self, world, name):
+        """Resolution of one name against the world's current characters."""
+        with self._lock:
+            self.index.sync(world_characters(world))
+            return self.index.resolve(name)
+
+    def references_to(self, world, char_id):
+        """References that point (possibly ambiguously) at one character."""
+        return list(self.report(world)["by_character"].get(char_id, []))
+
+
+def format_reference(reference, index=None):
+    """One line for a dangling or ambiguous reference, as shown in the apps."""
+    where = f"{reference['folder']}/{reference['file']} ({reference['field']})"
+    if reference["status"] == DANGLING:
+        return f"⚠️ '{reference['name']}' in {where} matches no character"
+    if reference["status"] == AMBIGUOUS:
+        names = ", ".join((index.name(i) if index else None) or i for i in reference["ids"])
+        return f"⚠️ '{reference['name']}' in {where} could be any of: {names}"
+    return f"✅ '{reference['name']}' in {where} -> {reference['ids'][0]}"
+
+
+# Shared by every Streamlit session running in this process
+_resolver = CrossReferences()
+
+
+def get_resolver():
+    return _resolver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve character names in scenes and relationships to ids.")
+    parser.add_argument("--root", default=".", help="Storyworld repository root (default: current folder)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Report format")
+    args = parser.parse_args(argv)
+
+    import storyworld
+    report = _resolver.report(storyworld.Storyworld(args.root))
+    problems = report["dangling"] + report["ambiguous"]
+
+    if args.format == "json":
+        json.dump({
+            "references": len(report["references"]),
+            "dangling": report["dangling"],
+            "ambiguous": report["ambiguous"],
+        }, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for reference in problems:
+            print(format_reference(reference, _resolver.index))
+        print()
+        print(f"📊 Summary:")
+        print(f"   References: {len(report['references'])}")
+        print(f"   Dangling: {len(report['dangling'])}")
+        print(f"   Ambiguous: {len(report['ambiguous'])}")
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Effective World
+===============
+
+The rules that apply in one place: schemas/world-schema.json holds the
+world-wide defaults (global transport, internet and AI, rules, narrative
+lens), and each locations/ region file only holds what is special about the
+region. This module merges the two into one effective config per region:
+
+    {"world_name": ..., "time_period": ...,
+     "global": {...}, "rules": {...}, "narrative_lens": {...},
+     "region": {region fields}, "overrides": [keys the region changed]}
+
+A region key that names a world default ("internet", "AI_can_feel",
+"global": {...}) replaces that default; objects are merged key by key. All
+other region fields (tone, tech_level, problems...) are kept under "region".
+
+Results are memoized per region. The schema and the region files are read
+through the mtime-keyed JSON cache, which hands back the same object while a
+file is unchanged, so a memoized config is reused until the schema or that
+region's file changes.
+"""
+
+import os
+import copy
+import threading
+
+import storyworld_cache
+from search_index import fold, tokenize
+
+WORLD_SCHEMA = os.path.join("schemas", "world-schema.json")
+
+# Region file keys that are bookkeeping, not world data
+IGNORED_KEYS = {"$schema"}
+
+_MISSING = object()
+
+
+def schema_defaults(schema):
+    """The "default" values of a schema, nested like the data they describe."""
+    if not isinstance(schema, dict):
+        return _MISSING
+    if "default" in schema:
+        return copy.deepcopy(schema["default"])
+    defaults = {}
+    for key, prop in (schema.get("properties") or {}).items():
+        value = schema_defaults(prop)
+        if value is not _MISSING:
+            defaults[key] = value
+    return defaults if defaults or schema.get("type") == "object" else _MISSING
+
+
+def _plain(value):
+    # Compact entity models and their tuples back to JSON data
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _merge(base, override, path, overridden):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value, f"{path}{key}.", overridden)
+        else:
+            base[key] = value
+            overridden.append(path + key)
+
+
+def merge_region(defaults, region):
+    """Effective config for region data on top of the world defaults."""
+    config = copy.deepcopy(defaults) if isinstance(defaults, dict) else {}
+    region = {k: v for k, v in _plain(region or {}).items() if k not in IGNORED_KEYS}
+    sections = [key for key, value in config.items() if isinstance(value, dict)]
+    overridden = []
+
+    for key, value in region.items():
+        if key in config:
+            _merge(config, {key: value}, "", overridden)
+            continue
+        section = next((s for s in sections if key in config[s]), None)
+        if section is not None:
+            _merge(config[section], {key: value}, f"{section}.", overridden)
+
+    config["region"] = region
+    config["overrides"] = overridden
+    return config
+
+
+class WorldResolver:
+    """Memoized effective configs for the regions of a Storyworld."""
+
+    def __init__(self, world, schema_path=None):
+        self.world = world
+        self.schema_path = schema_path or os.path.join(world.root, WORLD_SCHEMA)
+        self._lock = threading.Lock()
+        self._schema = None
+        self._defaults = {}
+        self._memo = {}   # folded region name -> (region data, effective config)
+        self.builds = 0
+
+    def defaults(self):
+        """World-wide defaults from the world schema ({} if it can't be read)."""
+        try:
+            schema = self.world.cache.load_file(self.schema_path)
+        except OSError:
+            schema = None
+        with self._lock:
+            if schema is not self._schema:
+                # The cache returns a new object only when the schema file changed
+                defaults = schema_defaults(schema) if "error" not in (schema or {}) else _MISSING
+                self._defaults = defaults if defaults is not _MISSING else {}
+                self._schema = schema
+                self._memo.clear()
+            return self._defaults
+
+    def effective(self, region_name=None):
+        """Effective config for a region; the world defaults alone for None or an unknown region."""
+        defaults = self.defaults()
+        region = self.world.location(region_name) if region_name else None
+        key = fold(region_name or "")
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is None or cached[0] is not region:
+                cached = self._memo[key] = (region, merge_region(defaults, region))
+                self.builds += 1
+            return cached[1]
+
+    def find_region(self, location):
+        """Region name for a free-text location ("Stockholm, Sweden" -> "Sweden"), or None."""
+        if not location:
+            return None
+        names = self.world.location_names()
+        key = fold(location).strip()
+        for name in names:
+            if fold(name).strip() == key:
+                return name
+        words = set(tokenize(location))
+        for name in names:
+            name_words = tokenize(name)
+            if name_words and set(name_words) <= words:
+                return name
+        return None
+
+    def for_location(self, location):
+        """Effective config for whatever region a free-text location is in."""
+        return self.effective(self.find_region(location))
+
+
+def format_value(value):
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+def prompt_lines(config):
+    """World rules as "key: value" lines for a scene prompt."""
+    lines = []
+    for section in ("global", "rules"):
+        for key, value in (config.get(section) or {}).items():
+            lines.append(f"{key.replace('_', ' ')}: {format_value(value)}")
+    return lines
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver(world):
+    """Process-wide resolver for a Storyworld (a new one if the world changed)."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None or _resolver.world is not world:
+            _resolver = WorldResolver(world)
+        return _resolver
@@ -1,8 +1,36 @@
+#!/usr/bin/env python3
+"""
+Storyworld Setup
+================
+
+Creates the storyworld folders, README, .gitignore, metadata and sample
+files, then offers to add characters and scenes and push to GitHub.
+
+Safe to run again and again (run_storyworld.bat does on every start):
+
+- Files are compared by size and SHA-256 before writing; a file that already
+  has exactly this content is not touched, so its mtime stays and git sees
+  nothing to re-hash.
+- Existing files are never overwritten - your edits to README.md or the
+  samples are kept - unless you run with --force.
+- Only the paths this run actually wrote are staged for the commit.
+
+    python init_storyworld.py
+    python init_storyworld.py --force     # reset the init files to the templates
+    python init_storyworld.py --verbose   # also list files kept because they differ
+"""
+
 import os
+import sys
 import json
+import hashlib
+import argparse
 import subprocess
 from datetime import datetime
 
+import scene_store
+from storyworld_io import atomic_write_text
+
 # Folders to ensure exist
 FOLDERS = [
     "characters", "locations", "scenes", "arcs",
@@ -13,11 +41,65 @@ def ensure_folders():
     for folder in FOLDERS:
         os.makedirs(folder, exist_ok=True)
 
-def write_json(filename, data):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+KEPT = "kept"  # exists with other content, not forced
+
+# Paths written by this run; git_commit_push stages only these
+changed_paths = []
+
+# Everything the tools write locally: SQLite index, story bible snapshots,
+# migration journals and sync state (.storyworld_cache/), benchmark results
+GITIGNORE = """__pycache__/
+*.py[cod]
+.DS_Store
+.storyworld_cache/
+bench_results/
+"""
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_file(filename, text, force=False):
+    """Write text to filename only if that changes something; returns what happened."""
+    data = text.encode("utf-8")
+    try:
+        size = os.stat(filename).st_size
+    except FileNotFoundError:
+        status = CREATED
+    else:
+        # Different size means different content; only same-size files need hashing
+        if size == len(data) and file_hash(filename) == hashlib.sha256(data).hexdigest():
+            return UNCHANGED
+        if not force:
+            return KEPT
+        status = UPDATED
+    atomic_write_text(filename, text)
+    changed_paths.append(filename)
+    return status
+
+def write_json(filename, data, force=False):
+    return write_file(filename, json.dumps(data, indent=2), force)
+
+def report(results, verbose=False):
+    """Print what was written; unchanged and kept files are only counted (listed with verbose)."""
+    for filename, status in results.items():
+        if status == CREATED:
+            print(f"✅ Created {filename}")
+        elif status == UPDATED:
+            print(f"🔄 Updated {filename}")
+    kept = [filename for filename, status in results.items() if status == KEPT]
+    if kept and verbose:
+        print(f"📌 Kept existing {', '.join(kept)} - not the same as the template; --force overwrites")
+    if all(status in (UNCHANGED, KEPT) for status in results.values()):
+        print(f"✅ Storyworld already set up ({len(results)} files left as they are)")
 
-def init_repo():
+def init_repo(force=False):
     readme = """# They Burn Witches – Storyworld Repository
 
 This is a collaborative, JSON-driven story structure for the speculative fiction series by Gunnar Sandström.
@@ -30,11 +112,10 @@ This is a collaborative, JSON-driven story structure for the speculative fiction
 - `items/` – AI tools, symbolic objects, tech artifacts
 - `metadata/` – Versioning, contributors, logs
 """
-    with open("README.md", "w") as f:
-        f.write(readme)
-
-    with open(".gitignore", "w") as f:
-        f.write("__pycache__/\n*.pyc\n.DS_Store\n")
+    results = {
+        "README.md": write_file("README.md", readme, force),
+        ".gitignore": write_file(".gitignore", GITIGNORE, force),
+    }
 
     versioning = {
         "version": "0.1.0",
@@ -49,9 +130,12 @@ This is a collaborative, JSON-driven story structure for the speculative fiction
             }
         ]
     }
-    write_json("metadata/versioning.json", versioning)
+    # Versioning is kept up by hand after the first run (its dates always differ)
+    if not os.path.exists("metadata/versioning.json") or force:
+        results["metadata/versioning.json"] = write_json("metadata/versioning.json", versioning, force)
+    return results
 
-def create_sample_files():
+def create_sample_files(force=False):
     ann = {
         "name": "Ann Charlotte",
         "static_attributes": {
@@ -79,7 +163,7 @@ def create_sample_files():
             }
         ]
     }
-    write_json("characters/ann_charlotte.json", ann)
+    results = {"characters/ann_charlotte.json": write_json("characters/ann_charlotte.json", ann, force)}
 
     scene = {
         "scene_id": "034",
@@ -102,7 +186,11 @@ def create_sample_files():
             }
         ]
     }
-    write_json("scenes/034_ann_returns_stockholm.json", scene)
+    # The sample scene may have been converted to JSON Lines since
+    filename = "scenes/034_ann_returns_stockholm.json"
+    if not os.path.exists(filename[:-len(".json")] + scene_store.LINES_EXT) or force:
+        results[filename] = write_json(filename, scene, force)
+    return results
 
 def add_new_character():
     name = input("Character name: ").strip()
@@ -140,63 +228,83 @@ def add_new_character():
     }
 
     filename = f"characters/{name.lower().replace(' ', '_')}.json"
-    write_json(filename, char_data)
+    write_json(filename, char_data, force=True)
     print(f"✅ Character saved: {filename}")
 
 def add_new_scene():
     scene_id = input("Scene ID (e.g., 035): ").strip()
     title = input("Scene title: ").strip()
-    location = input("Location: ").strip()
-    char_1 = input("Character 1: ").strip()
-    char_2 = input("Character 2 (or leave blank): ").strip()
 
-    summary = input("One-line summary of the scene: ").strip()
+    # Scenes are JSON Lines: a header, then one line per line of dialogue
+    filename = f"scenes/{scene_id}_{title.lower().replace(' ', '_')}{scene_store.LINES_EXT}"
+    if os.path.exists(filename):
+        print(f"➕ Adding dialogue to existing scene: {filename}")
+    else:
+        location = input("Location: ").strip()
+        char_1 = input("Character 1: ").strip()
+        char_2 = input("Character 2 (or leave blank): ").strip()
+
+        summary = input("One-line summary of the scene: ").strip()
+
+        scene_data = {
+            "scene_id": scene_id,
+            "title": title,
+            "location": location,
+            "time": datetime.today().isoformat(),
+            "characters_present": [char_1] + ([char_2] if char_2 else []),
+            "summary": summary
+        }
+        scene_store.write_scene(filename, scene_data)
+        changed_paths.append(filename)
 
-    dialogue = []
+    # Each line is appended as soon as it's entered; the file is never rewritten
     while True:
         speaker = input("Speaker (or leave blank to stop): ").strip()
         if not speaker:
             break
         line = input("Line of dialogue: ").strip()
         tone = input("Tone (e.g., anxious, flirty): ").strip()
-        dialogue.append({"speaker": speaker, "line": line, "tone": tone})
-
-    scene_data = {
-        "scene_id": scene_id,
-        "title": title,
-        "location": location,
-        "time": datetime.today().isoformat(),
-        "characters_present": [char_1] + ([char_2] if char_2 else []),
-        "summary": summary,
-        "dialogue": dialogue
-    }
+        scene_store.append_dialogue(filename, [{"speaker": speaker, "line": line, "tone": tone}])
+        if filename not in changed_paths:
+            changed_paths.append(filename)
 
-    filename = f"scenes/{scene_id}_{title.lower().replace(' ', '_')}.json"
-    write_json(filename, scene_data)
     print(f"✅ Scene saved: {filename}")
 
 def git_commit_push():
-    subprocess.run(["git", "add", "."], check=True)
+    if not changed_paths:
+        print("✅ Nothing changed - nothing to commit.")
+        return
+    # Only what this run wrote, so git doesn't re-scan and re-hash the whole world
+    subprocess.run(["git", "add", "--", *dict.fromkeys(changed_paths)], check=True)
     subprocess.run(["git", "commit", "-m", "Updated storyworld files"], check=True)
     subprocess.run(["git", "push"], check=True)
+    changed_paths.clear()
     print("✅ Changes pushed to GitHub.")
 
-# MAIN
-print("📦 Initializing storyworld repo...")
-ensure_folders()
-init_repo()
-create_sample_files()
-
-# Optional interactive part
-while True:
-    choice = input("\nWhat would you like to do?\n[1] Add new character\n[2] Add new scene\n[3] Push to GitHub\n[Enter] Quit\n> ").strip()
-    if choice == "1":
-        add_new_character()
-    elif choice == "2":
-        add_new_scene()
-    elif choice == "3":
-        git_commit_push()
-    else:
-        break
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Set up the storyworld repository and add characters and scenes.")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing init files with the templates")
+    parser.add_argument("--verbose", action="store_true", help="Also list existing files kept as they are")
+    args = parser.parse_args(argv)
+
+    print("📦 Initializing storyworld repo...")
+    ensure_folders()
+    report({**init_repo(args.force), **create_sample_files(args.force)}, args.verbose)
+
+    # Optional interactive part
+    while True:
+        choice = input("\nWhat would you like to do?\n[1] Add new character\n[2] Add new scene\n[3] Push to GitHub\n[Enter] Quit\n> ").strip()
+        if choice == "1":
+            add_new_character()
+        elif choice == "2":
+            add_new_scene()
+        elif choice == "3":
+            git_commit_push()
+        else:
+            break
+
+    print("✨ All done.")
+    return 0
 
-print("✨ All done.")
+if __name__ == "__main__":
+    sys.exit(main())
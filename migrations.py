@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Storyworld Migrations
+=====================
+
+Versioned, idempotent migrations over all entity folders, run on a process
+pool:
+
+    python migrations.py --list             # show migrations and their status
+    python migrations.py --dry-run          # print a diff of what would change
+    python migrations.py                    # apply all pending migrations
+    python migrations.py --only 1 --rerun   # re-apply one migration everywhere
+
+Each migration is a function (filename, data) -> new data, or None when the
+file needs no change - so running it twice is harmless. Files are rewritten
+atomically (temp file + rename), never half-written.
+
+Progress is checkpointed to a journal in .storyworld_cache/, one line per
+finished file; if a run is interrupted, the next run skips what was done.
+Completed migrations are recorded in metadata/migrations.json.
+"""
+
+import os
+import sys
+import json
+import difflib
+import argparse
+from datetime import datetime
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from storyworld_io import atomic_write_text
+
+JOURNAL_FOLDER = ".storyworld_cache"
+APPLIED_FILE = os.path.join("metadata", "migrations.json")
+
+# Below this many files the pool start-up costs more than it saves
+MIN_FILES_FOR_POOL = 200
+
+MIGRATIONS = {}  # version -> {"version", "name", "folders", "apply"}
+
+
+def migration(version, folders, name):
+    """Register fn(filename, data) -> new data or None as migration `version`."""
+    def register(fn):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS[version] = {"version": version, "name": name, "folders": folders, "apply": fn}
+        return fn
+    return register
+
+
+# === MIGRATIONS ===
+
+@migration(1, ["characters"], "Add immutable character id from filename")
+def add_character_id(filename, data):
+    if "id" in data:
+        return None
+    # Add ID at the beginning of the data
+    updated = {"id": filename[:-len(".json")]}
+    updated.update(data)
+    return updated
+
+
+# === ENGINE ===
+
+def dump(data):
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def migrate_file(task):
+    """Apply one migration to one file (runs in a worker process).
+
+    Returns (filepath, status, detail): status is "changed", "unchanged" or
+    "error"; detail is the diff in dry-run mode or the error message.
+    """
+    version, filepath, dry_run = task
+    filename = os.path.basename(filepath)
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            original_text = f.read()
+        data = json.loads(original_text)
+        updated = MIGRATIONS[version]["apply"](filename, data)
+    except Exception as e:
+        return filepath, "error", str(e)
+
+    if updated is None:
+        return filepath, "unchanged", None
+
+    new_text = dump(updated)
+    if dry_run:
+        diff = "".join(difflib.unified_diff(
+            original_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+            fromfile=filepath, tofile=filepath,
+        ))
+        return filepath, "changed", diff
+
+    try:
+        atomic_write_text(filepath, new_text)
+    except OSError as e:
+        return filepath, "error", str(e)
+    return filepath, "changed", None
+
+
+def migration_files(root, folders):
+    files = []
+    for folder in folders:
+        folder_path = os.path.normpath(os.path.join(root, folder))
+        if os.path.isdir(folder_path):
+            files.extend(
+                os.path.join(folder_path, filename)
+                for filename in sorted(os.listdir(folder_path))
+                if filename.endswith(".json")
+            )
+    return files
+
+
+def load_applied(root="."):
+    path = os.path.join(root, APPLIED_FILE)
+    if not os.path.exists(path):
+        return {"applied": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def applied_versions(root="."):
+    return {entry["version"] for entry in load_applied(root)["applied"]}
+
+
+def record_applied(root, step, changed):
+    applied = load_applied(root)
+    applied["applied"] = [e for e in applied["applied"] if e["version"] != step["version"]]
+    applied["applied"].append({
+        "version": step["version"],
+        "name": step["name"],
+        "date": datetime.today().strftime("%Y-%m-%d"),
+        "files_changed": changed,
+    })
+    applied["applied"].sort(key=lambda e: e["version"])
+    os.makedirs(os.path.dirname(os.path.join(root, APPLIED_FILE)), exist_ok=True)
+    atomic_write_text(os.path.join(root, APPLIED_FILE), dump(applied))
+
+
+def journal_path(root, version):
+    return os.path.join(root, JOURNAL_FOLDER, f"migration-{version}.journal")
+
+
+def read_journal(path):
+    """Files already finished by an interrupted run."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        # A torn last line (crash mid-write) is simply redone
+        return {line[:-1] for line in f if line.endswith("\n")}
+
+
+def _open_journal(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "a", encoding="utf-8")
+
+
+def run_migration(step, root=".", jobs=None, dry_run=False, log=print):
+    """Run one migration over its folders; returns (changed, unchanged, errors)."""
+    files = migration_files(root, step["folders"])
+    journal = journal_path(root, step["version"])
+    done = set() if dry_run else read_journal(journal)
+    pending = [path for path in files if path not in done]
+    if done:
+        log(f"⏩ Resuming: {len(files) - len(pending)} of {len(files)} files already done")
+
+    tasks = [(step["version"], path, dry_run) for path in pending]
+    jobs = jobs or os.cpu_count() or 1
+    changed, unchanged, errors = 0, 0, []
+
+    use_pool = jobs > 1 and len(tasks) >= MIN_FILES_FOR_POOL
+    with ProcessPoolExecutor(max_workers=jobs) if use_pool else nullcontext() as pool, \
+            (nullcontext() if dry_run else _open_journal(journal)) as journal_file:
+        if pool:
+            results = pool.map(migrate_file, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+        else:
+            results = map(migrate_file, tasks)
+
+        for filepath, status, detail in results:
+            if status == "error":
+                errors.append((filepath, detail))
+                log(f"❌ {filepath} - {detail}")
+                continue
+            if status == "changed":
+                changed += 1
+                log(detail if dry_run else f"✅ {filepath}")
+            else:
+                unchanged += 1
+            if journal_file:
+                journal_file.write(filepath + "\n")
+                journal_file.flush()
+
+    # Keep the journal if anything failed, so a re-run retries only those files
+    if not dry_run and not errors:
+        os.remove(journal)
+        record_applied(root, step, changed)
+    return changed, unchanged, errors
+
+
+def run_migrations(root=".", only=None, rerun=False, jobs=None, dry_run=False, log=print):
+    """Run every pending migration (or just `only`) in version order."""
+    applied = applied_versions(root)
+    steps = [MIGRATIONS[v] for v in sorted(MIGRATIONS) if only is None or v == only]
+    if not rerun:
+        steps = [step for step in steps if step["version"] not in applied]
+
+    if not steps:
+        log("✨ Nothing to migrate.")
+        return True
+
+    ok = True
+    for step in steps:
+        log(f"🔄 Migration {step['version']}: {step['name']}{' (dry run)' if dry_run else ''}")
+        changed, unchanged, errors = run_migration(step, root, jobs, dry_run, log)
+        log(f"📊 Changed: {changed}   Unchanged: {unchanged}   Errors: {len(errors)}")
+        if errors:
+            ok = False
+            log("⚠️  Stopping: fix the errors above and run again to resume.")
+            break
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run storyworld data migrations.")
+    parser.add_argument("--root", default=".", help="Storyworld repository root (default: current folder)")
+    parser.add_argument("--only", type=int, help="Run only this migration version")
+    parser.add_argument("--rerun", action="store_true", help="Run even if already recorded as applied")
+    parser.add_argument("--dry-run", action="store_true", help="Show a diff instead of writing files")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--list", action="store_true", help="List migrations and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        applied = applied_versions(args.root)
+        for version in sorted(MIGRATIONS):
+            step = MIGRATIONS[version]
+            status = "✅ applied" if version in applied else "⏳ pending"
+            print(f"{version:>4}  {status}  {step['name']}  ({', '.join(step['folders'])})")
+        return 0
+
+    ok = run_migrations(args.root, args.only, args.rerun, args.jobs, args.dry_run)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Name Conflict Index
+===================
+
+Persistent index of names that readers (or co-writing AIs) could mix up -
+the "Voss problem". Every character is filed under a handful of keys:
+
+- First Name / Last Name: the first and last word of the name
+- Name or Alias: the full name and each of the other_names
+- Sounds Alike: Soundex code of each name word ("Voss" / "Vos" / "Foss")
+- Similar Spelling: each name word with one letter dropped, so names one
+  typo apart ("Freja" / "Freya") share a key
+
+A key held by two or more characters is a conflict. Characters are added,
+updated and removed one at a time, touching only their own keys, so the
+index never has to rescan the whole cast, and looking up one character's
+conflicts only visits that character's keys.
+"""
+
+import re
+import threading
+from itertools import combinations
+from collections import defaultdict
+
+from search_index import fold
+
+FIRST_NAME = "First Name"
+LAST_NAME = "Last Name"
+NAME_OR_ALIAS = "Name or Alias"
+SOUNDS_ALIKE = "Sounds Alike"
+SIMILAR_SPELLING = "Similar Spelling"
+
+# Kinds that only count as a conflict when the spellings actually differ;
+# identical spellings are already reported as First/Last Name conflicts
+NEAR_MATCH_KINDS = {SOUNDS_ALIKE, SIMILAR_SPELLING}
+
+# Strongest first: a group is only reported under a weaker kind if a stronger
+# one doesn't already cover all of its pairs (Eric / Erik is one letter apart,
+# so it isn't listed as sounding alike as well)
+KIND_ORDER = [NAME_OR_ALIAS, FIRST_NAME, LAST_NAME, SIMILAR_SPELLING, SOUNDS_ALIKE]
+
+HONORIFICS = {"dr", "mr", "mrs", "ms", "mx", "prof", "sir", "lady"}
+WORD_RE = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+
+MIN_SOUNDEX_LEN = 3
+MIN_SIMILAR_LEN = 4
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(word):
+    """American Soundex code, e.g. 'Voss' -> 'V200'."""
+    word = fold(word)
+    word = "".join(c for c in word if c.isalpha())
+    if not word:
+        return ""
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0], "")
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def name_words(name):
+    """Words of a name without honorifics or punctuation ('Dr. Eric Nilsson' -> Eric, Nilsson)."""
+    words = WORD_RE.findall(str(name))
+    return [w for w in words if fold(w) not in HONORIFICS]
+
+
+def split_other_names(value):
+    """other_names may be a list (JSON) or a comma-separated string (CSV)."""
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def conflict_keys(name, other_names=()):
+    """Return {(kind, key): surface spelling} for one character."""
+    keys = {}
+    words = name_words(name)
+    if words:
+        keys[(FIRST_NAME, fold(words[0]))] = words[0]
+        if len(words) > 1:
+            keys[(LAST_NAME, fold(words[-1]))] = words[-1]
+
+    for full_name in [name, *split_other_names(other_names)]:
+        full_name = " ".join(str(full_name).split())
+        if full_name:
+            keys[(NAME_OR_ALIAS, fold(full_name))] = full_name
+
+    for word in words:
+        folded = fold(word)
+        if len(folded) >= MIN_SOUNDEX_LEN:
+            keys[(SOUNDS_ALIKE, soundex(word))] = word
+        if len(folded) >= MIN_SIMILAR_LEN - 1:
+            # The word itself, so a one-letter-longer name's variant meets it
+            keys[(SIMILAR_SPELLING, folded)] = word
+        if len(folded) >= MIN_SIMILAR_LEN:
+            for i in range(len(folded)):
+                keys[(SIMILAR_SPELLING, folded[:i] + folded[i + 1:])] = word
+    return keys
+
+
+class ConflictIndex:
+    """Incrementally maintained index of name collisions between characters."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = {}                   # character id -> {(kind, key): surface}
+        self._names = {}                  # character id -> display name
+        self._buckets = defaultdict(dict) # (kind, key) -> {character id: surface}
+        self._conflicted = set()          # keys whose bucket is a conflict
+        self._signatures = {}             # character id -> (name, other_names) last indexed
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _is_conflict(self, bucket_key):
+        bucket = self._buckets.get(bucket_key)
+        if not bucket or len(bucket) < 2:
+            return False
+        if bucket_key[0] in NEAR_MATCH_KINDS:
+            return len({fold(s) for s in bucket.values()}) > 1
+        return True
+
+    def _touch(self, bucket_key):
+        if self._is_conflict(bucket_key):
+            self._conflicted.add(bucket_key)
+        else:
+            self._conflicted.discard(bucket_key)
+            if not self._buckets.get(bucket_key):
+                self._buckets.pop(bucket_key, None)
+
+    def upsert(self, char_id, name, other_names=()):
+        """Add or update one character; only keys that changed are touched."""
+        signature = (name, tuple(split_other_names(other_names)))
+        with self._lock:
+            if self._signatures.get(char_id) == signature:
+                return False
+            new_keys = conflict_keys(name, other_names)
+            old_keys = self._keys.get(char_id, {})
+
+            for bucket_key in old_keys.keys() - new_keys.keys():
+                self._buckets[bucket_key].pop(char_id, None)
+                self._touch(bucket_key)
+            for bucket_key, surface in new_keys.items():
+                if old_keys.get(bucket_key) != surface:
+                    self._buckets[bucket_key][char_id] = surface
+                    self._touch(bucket_key)
+
+            self._keys[char_id] = new_keys
+            self._names[char_id] = name
+            self._signatures[char_id] = signature
+            return True
+
+    def remove(self, char_id):
+        with self._lock:
+            for bucket_key in self._keys.pop(char_id, {}):
+                self._buckets[bucket_key].pop(char_id, None)
+                self._touch(bucket_key)
+            self._names.pop(char_id, None)
+            self._signatures.pop(char_id, None)
+
+    def _describe(self, bucket_key, members=None):
+        kind, key = bucket_key
+        bucket = self._buckets[bucket_key]
+        members = bucket if members is None else members
+        surfaces = sorted({bucket[m] for m in members}, key=fold)
+        return {
+            "type": kind,
+            "name": " / ".join(surfaces),
+            "characters": [self._names[m] for m in members],
+        }
+
+    def _report(self, candidates):
+        """Describe [(bucket_key, members)], strongest kind first, without repeats.
+
+        A group is skipped when stronger (or earlier) groups already report
+        every pair of characters in it.
+        """
+        results = []
+        covered = set()
+        for bucket_key, members in sorted(candidates, key=lambda c: (KIND_ORDER.index(c[0][0]), c[0][1])):
+            pairs = {frozenset(pair) for pair in combinations(members, 2)}
+            if pairs <= covered:
+                continue  # e.g. one typo shared via several dropped letters
+            covered |= pairs
+            results.append(self._describe(bucket_key, members))
+        return results
+
+    def conflicts(self):
+        """All current conflicts, each set of characters under its strongest kind."""
+        with self._lock:
+            return self._report([
+                (bucket_key, tuple(sorted(self._buckets[bucket_key], key=str)))
+                for bucket_key in self._conflicted
+            ])
+
+    def conflicts_for(self, char_id):
+        """Conflicts involving one character (only visits its own keys)."""
+        with self._lock:
+            candidates = []
+            for bucket_key in self._keys.get(char_id, {}):
+                if bucket_key not in self._conflicted:
+                    continue
+                others = tuple(sorted((m for m in self._buckets[bucket_key] if m != char_id), key=str))
+                candidates.append((bucket_key, (char_id, *others)))
+            return self._report(candidates)
+
+    def conflicts_among(self, char_ids):
+        """Conflicts between the given characters only, e.g. one scene's cast."""
+        with self._lock:
+            buckets = defaultdict(list)
+            for char_id in char_ids:
+                for bucket_key in self._keys.get(char_id, {}):
+                    buckets[bucket_key].append(char_id)
+
+            candidates = []
+            for bucket_key, members in buckets.items():
+                if len(members) < 2:
+                    continue
+                if bucket_key[0] in NEAR_MATCH_KINDS and len(
+                        {fold(self._buckets[bucket_key][m]) for m in members}) < 2:
+                    continue
+                candidates.append((bucket_key, members))
+            return self._report(candidates)
+
+    def sync(self, characters):
+        """Bring the index in line with {char_id: (name, other_names)}.
+
+        Unchanged characters cost one tuple comparison; removed ones are dropped.
+        """
+        with self._lock:
+            changed = 0
+            for char_id, (name, other_names) in characters.items():
+                changed += self.upsert(char_id, name, other_names)
+            for char_id in [c for c in self._keys if c not in characters]:
+                self.remove(char_id)
+                changed += 1
+            return changed
+
+
+def bible_characters(df):
+    """{char_id: (name, other_names)} from the story bible DataFrame.
+
+    Characters are identified by name (plus a counter for repeated names),
+    so re-uploading an edited CSV only re-indexes the rows that changed.
+    """
+    if "Name" not in df.columns:
+        return {}
+    other_names = df["Other Names"] if "Other Names" in df.columns else [None] * len(df)
+    characters = {}
+    for name, aliases in zip(df["Name"], other_names):
+        if not isinstance(name, str) or not name.strip():
+            continue
+        char_id = name
+        n = 1
+        while char_id in characters:
+            n += 1
+            char_id = f"{name} #{n}"
+        characters[char_id] = (name, aliases if isinstance(aliases, str) else None)
+    return characters
+
+
+def json_characters(items):
+    """{filename: (name, other_names)} from a loaded characters/ folder."""
+    return {
+        filename: (data.get("name", filename), data.get("other_names") or [])
+        for filename, data in items.items()
+        if "error" not in data
+    }
+
+
+def format_conflict(conflict):
+    """One warning line for a conflict, as shown in the apps."""
+    names = ", ".join(conflict["characters"])
+    if conflict["type"] == FIRST_NAME:
+        return f"⚠️ Multiple characters with first name '{conflict['name']}': {names}"
+    if conflict["type"] == LAST_NAME:
+        return f"⚠️ Multiple characters with last name '{conflict['name']}': {names}"
+    if conflict["type"] == NAME_OR_ALIAS:
+        return f"⚠️ Characters share the name or alias '{conflict['name']}': {names}"
+    if conflict["type"] == SOUNDS_ALIKE:
+        return f"⚠️ Names that sound alike ({conflict['name']}): {names}"
+    return f"⚠️ Names one letter apart ({conflict['name']}): {names}"
+
+
+# Shared by every Streamlit session running in this process (characters/ folder)
+_index = ConflictIndex()
+
+
+def get_index():
+    return _index
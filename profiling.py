@@ -0,0 +1,208 @@
+"""
+Rerun Profiling
+===============
+
+Lightweight timing spans for the Streamlit apps, switched on with
+"profiling": true in streamlit_app_settings.json.
+
+Each session keeps a Recorder. A script run is bracketed by begin_run() and
+end_run(); inside it, spans time the interesting parts:
+
+    with profiler.span("load.characters"):
+        ...
+
+Spans nest, cost a couple of microseconds, and do nothing at all outside a
+recorded run. The last HISTORY runs are kept for percentiles, can be
+exported as JSON Lines for offline analysis, and a single run can be
+captured with cProfile (or pyinstrument, if installed).
+"""
+
+import io
+import os
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import app_settings
+
+EXPORT_FOLDER = os.path.join(".storyworld_cache", "profiles")
+HISTORY = 200
+PROFILE_LINES = 40
+
+
+def enabled(settings_file=app_settings.SETTINGS_FILE):
+    """True if "profiling" is switched on in the app settings."""
+    return bool(app_settings.get_setting("profiling", settings_file))
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Timing spans for the runs of one session."""
+
+    def __init__(self, history=HISTORY):
+        self.runs = deque(maxlen=history)
+        self.profile_next = False
+        self.profile_report = None
+        self._current = None
+        self._stack = []
+        self._run_start = 0.0
+        self._profiler = None
+
+    def begin_run(self, label=""):
+        """Start recording a script run (an unfinished previous run is dropped)."""
+        self._current = {"started": datetime.now().isoformat(timespec="seconds"), "label": label, "spans": []}
+        self._stack = []
+        if self.profile_next:
+            self._start_profiler()
+        self._run_start = time.perf_counter()
+
+    def tag(self, label):
+        if self._current is not None:
+            self._current["label"] = label
+
+    def end_run(self):
+        """Finish the current run and keep it in the history; returns it."""
+        if self._current is None:
+            return None
+        while self._stack:
+            self.pop()
+        run = self._current
+        run["total_ms"] = (time.perf_counter() - self._run_start) * 1000
+        self.runs.append(run)
+        self._current = None
+        if self._profiler is not None:
+            self._stop_profiler()
+        return run
+
+    def push(self, name):
+        if self._current is not None:
+            self._stack.append((name, time.perf_counter()))
+
+    def pop(self):
+        if self._current is None or not self._stack:
+            return
+        name, start = self._stack.pop()
+        end = time.perf_counter()
+        self._current["spans"].append({
+            "name": name,
+            "start_ms": (start - self._run_start) * 1000,
+            "ms": (end - start) * 1000,
+            "depth": len(self._stack),
+        })
+
+    @contextmanager
+    def span(self, name):
+        self.push(name)
+        try:
+            yield
+        finally:
+            self.pop()
+
+    # --- cProfile / pyinstrument capture ---
+
+    def _start_profiler(self):
+        try:
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+            self._profiler.start()
+        except ImportError:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stop_profiler(self):
+        profiler, self._profiler = self._profiler, None
+        self.profile_next = False
+        if hasattr(profiler, "disable"):  # cProfile
+            import pstats
+            profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.profile_report = stream.getvalue()
+        else:
+            profiler.stop()
+            self.profile_report = profiler.output_text()
+
+    # --- Reporting ---
+
+    def last_run(self):
+        return self.runs[-1] if self.runs else None
+
+    def stats(self):
+        """[{"name", "runs", "last_ms", "p50_ms", "p90_ms", "p99_ms"}] per span name.
+
+        Spans with the same name in one run are added up; "total" is the run itself.
+        """
+        per_name = {}
+        for run in self.runs:
+            totals = {"total": run["total_ms"]}
+            for span in run["spans"]:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["ms"]
+            for name, ms in totals.items():
+                per_name.setdefault(name, []).append(ms)
+
+        rows = []
+        for name, values in per_name.items():
+            ordered = sorted(values)
+            rows.append({
+                "name": name,
+                "runs": len(values),
+                "last_ms": round(values[-1], 2),
+                "p50_ms": round(percentile(ordered, 50), 2),
+                "p90_ms": round(percentile(ordered, 90), 2),
+                "p99_ms": round(percentile(ordered, 99), 2),
+            })
+        return sorted(rows, key=lambda row: -row["p50_ms"])
+
+    def export(self, path=None):
+        """Write the recorded runs as JSON Lines; returns the file path."""
+        path = path or os.path.join(EXPORT_FOLDER, f"spans-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for run in self.runs:
+                f.write(json.dumps(run) + "\n")
+        return path
+
+
+def get_recorder(session_state):
+    """The Recorder kept in a Streamlit session's state."""
+    if "profiler" not in session_state:
+        session_state.profiler = Recorder()
+    return session_state.profiler
+
+
+def show_panel(recorder):
+    """Sidebar panel with the last run's spans, percentiles, capture and export."""
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Profiling"):
+        run = recorder.last_run()
+        if run is None:
+            st.caption("No runs recorded yet.")
+        else:
+            st.caption(f"Last rerun ({run['label'] or 'app'}): {run['total_ms']:.1f} ms")
+            st.text("\n".join(
+                f"{'  ' * span['depth']}{span['name']:<{28 - 2 * span['depth']}} {span['ms']:>8.1f} ms"
+                for span in sorted(run["spans"], key=lambda s: s["start_ms"])
+            ) or "No spans.")
+            st.caption(f"Over the last {len(recorder.runs)} reruns:")
+            st.dataframe(recorder.stats(), hide_index=True)
+
+        if st.button("🔬 Profile next rerun"):
+            recorder.profile_next = True
+            st.rerun()
+        if recorder.profile_report:
+            st.download_button("⬇️ Download profile", recorder.profile_report, file_name="rerun_profile.txt")
+            st.code(recorder.profile_report[:5000], language=None)
+
+        if st.button("💾 Export spans"):
+            st.success(f"✅ Saved to {recorder.export()}")
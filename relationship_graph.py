@@ -0,0 +1,195 @@
+"""
+Relationship Graph
+==================
+
+Joins the two places relationship data lives - relationships/*.json
+("between", "static_traits", "dynamic_states") and each character's
+"relationships" dict - into one in-memory graph.
+
+- Adjacency lists: neighbours of a character are one dict lookup away.
+- Time-indexed edges: each edge keeps its dynamic_states sorted by time, so
+  "trust/tension/closeness between A and B in 2030" is a binary search.
+- Paths and cliques: shortest path is a breadth-first search; cliques within
+  a group use Bron-Kerbosch with pivoting on that group's subgraph.
+
+Characters are keyed by their folded name ("Ann Charlotte" -> "ann charlotte");
+the graph is rebuilt only when the characters/ or relationships/ files change.
+"""
+
+import bisect
+import threading
+from collections import deque
+
+from search_index import fold
+from timeline import time_key
+
+
+class Edge:
+    """Everything known about the relationship between two characters."""
+
+    __slots__ = ("names", "descriptions", "static_traits", "_keys", "_states")
+
+    def __init__(self, names):
+        self.names = names          # (display name a, display name b)
+        self.descriptions = {}      # display name -> how they see the other one
+        self.static_traits = {}
+        self._keys = []             # sorted time keys
+        self._states = []           # (time label, state dict), same order
+
+    def add_state(self, label, state, position):
+        key = time_key(label, position)
+        i = bisect.bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._states.insert(i, (label, state))
+
+    @property
+    def states(self):
+        return list(self._states)
+
+    def state_at(self, label):
+        """Latest state at or before time label, or None if it starts later."""
+        key = time_key(label, float("inf"))
+        i = bisect.bisect_right(self._keys, key)
+        return self._states[i - 1] if i else None
+
+    def latest_state(self):
+        return self._states[-1] if self._states else None
+
+
+class RelationshipGraph:
+    """Undirected graph of characters with time-indexed edges."""
+
+    def __init__(self):
+        self._names = {}        # key -> display name
+        self._adjacency = {}    # key -> {neighbour key: Edge}
+        self._groups = {}       # group -> set of keys
+
+    def _node(self, name):
+        key = fold(name).strip()
+        if key not in self._names:
+            self._names[key] = name
+            self._adjacency[key] = {}
+        return key
+
+    def _edge(self, a, b):
+        ka, kb = self._node(a), self._node(b)
+        edge = self._adjacency[ka].get(kb)
+        if edge is None:
+            edge = Edge((self._names[ka], self._names[kb]))
+            self._adjacency[ka][kb] = edge
+            self._adjacency[kb][ka] = edge
+        return edge
+
+    @classmethod
+    def build(cls, characters, relationships):
+        """Build from loaded {filename: data} of characters/ and relationships/."""
+        graph = cls()
+        for data in characters.values():
+            if "error" in data or not data.get("name"):
+                continue
+            key = graph._node(data["name"])
+            for group in data.get("groups") or []:
+                graph._groups.setdefault(group, set()).add(key)
+            for other, description in (data.get("relationships") or {}).items():
+                if fold(other).strip() != key:
+                    graph._edge(data["name"], other).descriptions[data["name"]] = description
+
+        for data in relationships.values():
+            if "error" in data:
+                continue
+            relationship = data.get("relationship", data)
+            between = relationship.get("between") or []
+            for i, a in enumerate(between):
+                for b in between[i + 1:]:
+                    edge = graph._edge(a, b)
+                    edge.static_traits.update(relationship.get("static_traits") or {})
+                    for position, state in enumerate(relationship.get("dynamic_states") or []):
+                        values = {k: v for k, v in state.items() if k != "time"}
+                        edge.add_state(state.get("time", ""), values, position)
+        return graph
+
+    # --- Queries ---
+
+    def names(self):
+        return sorted(self._names.values(), key=fold)
+
+    def groups(self):
+        return sorted(self._groups)
+
+    def __contains__(self, name):
+        return fold(name).strip() in self._adjacency
+
+    def neighbours(self, name):
+        """[(neighbour display name, Edge)] for one character."""
+        key = fold(name).strip()
+        return [(self._names[k], edge) for k, edge in self._adjacency.get(key, {}).items()]
+
+    def edge(self, a, b):
+        return self._adjacency.get(fold(a).strip(), {}).get(fold(b).strip())
+
+    def edge_state(self, a, b, time_label):
+        """(time label, state) of the a-b relationship at time_label, or None."""
+        edge = self.edge(a, b)
+        return edge.state_at(time_label) if edge else None
+
+    def shortest_path(self, a, b):
+        """Display names along the shortest chain of relationships, or None."""
+        start, goal = fold(a).strip(), fold(b).strip()
+        if start not in self._adjacency or goal not in self._adjacency:
+            return None
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(self._names[node])
+                    node = previous[node]
+                return path[::-1]
+            for neighbour in self._adjacency[node]:
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        return None
+
+    def cliques(self, group=None, min_size=3):
+        """Maximal groups where everyone is related to everyone else.
+
+        Limited to the members of group when one is given.
+        """
+        nodes = self._groups.get(group, set()) if group else set(self._adjacency)
+        adjacency = {n: set(self._adjacency[n]) & nodes for n in nodes}
+        found = []
+
+        def expand(r, p, x):
+            if not p and not x:
+                if len(r) >= min_size:
+                    found.append(r)
+                return
+            pivot = max(p | x, key=lambda n: len(adjacency[n] & p))
+            for node in list(p - adjacency[pivot]):
+                expand(r | {node}, p & adjacency[node], x & adjacency[node])
+                p = p - {node}
+                x = x | {node}
+
+        expand(set(), set(nodes), set())
+        cliques = [sorted((self._names[n] for n in clique), key=fold) for clique in found]
+        return sorted(cliques, key=lambda c: (-len(c), c))
+
+
+_graph = None
+_graph_sources = (None, None)
+_graph_lock = threading.Lock()
+
+
+def get_graph(world):
+    """Graph for a Storyworld, rebuilt only if its characters or relationships changed."""
+    global _graph, _graph_sources
+    characters = world.items("characters")
+    relationships = world.items("relationships")
+    with _graph_lock:
+        if _graph is None or _graph_sources[0] is not characters or _graph_sources[1] is not relationships:
+            _graph = RelationshipGraph.build(characters, relationships)
+            _graph_sources = (characters, relationships)
+        return _graph
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Scene Builder
+=============
+
+The parts of the Character Selector's scene builder that don't need
+Streamlit: turning selected story bible rows into scene characters, and
+rendering the scene output / AI prompt text, including the effective world
+rules of the scene's location (see effective_world). Kept importable so scripts and
+benchmarks run the same code as the app.
+
+The output is rendered as a list of parts, joined once per scene. Many
+planned scenes can be built and written in one go, streamed scene by scene
+to a text, JSON Lines or zip file:
+
+    python scene_builder.py story_bible.csv planned_scenes.csv -o scenes.zip
+
+A scene spec has group, location, characters, concept and theme. In a CSV
+the characters are one column separated by ";".
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import argparse
+import zipfile
+from datetime import datetime
+
+from name_conflicts import format_conflict
+
+SPEC_FIELDS = ["group", "location", "characters", "concept", "theme"]
+BATCH_FORMATS = ["zip", "txt", "jsonl"]
+REGION_PROMPT_FIELDS = ["tone", "tech_level", "elevation", "infrastructure", "problems", "youth_trends"]
+SCENE_SEPARATOR = "\n" + "=" * 60 + "\n\n"
+
+WORLD_NOTE = "Keep to the world rules above; the region's values override the world defaults.\n"
+CONFLICT_NOTE = "NOTE: Be careful with name conflicts - use full names or distinctive descriptors when multiple characters share first names.\n"
+
+
+def scene_character(char_name, char_row):
+    """One scene character dict from a story bible row (Series or dict)."""
+    return {
+        'name': char_name,
+        'role': char_row.get('Role', 'No role'),
+        'groups': char_row.get('Groups', 'No group'),
+        'personality': char_row.get('Personality', 'No personality data'),
+        'dialogue_style': char_row.get('Dialogue Style', 'No dialogue style data')
+    }
+
+
+def build_scene_characters(name_index, selected_characters):
+    """Scene character dicts for the selected names.
+
+    name_index is the story bible indexed by Name (see get_name_index), or a
+    {name: scene character} dict from character_lookup().
+    """
+    if isinstance(name_index, dict):
+        return [dict(name_index[char_name]) for char_name in selected_characters]
+    return [scene_character(char_name, name_index.loc[char_name]) for char_name in selected_characters]
+
+
+def character_lookup(name_index):
+    """{name: scene character} for every row of the name index.
+
+    Converting once avoids a pandas .loc per character when building many scenes.
+    """
+    return {
+        char_name: scene_character(char_name, row)
+        for char_name, row in name_index.to_dict("index").items()
+    }
+
+
+def render_scene(scene_data, parts, timestamp):
+    """Append the scene output for scene_data to the list parts."""
+    characters = scene_data.get('characters', [])
+    concept = scene_data.get('concept', 'No concept provided')
+    conflicts = scene_data.get('conflicts')
+    world = scene_data.get('world')
+
+    parts.append(f"""=== SCENE BUILDER OUTPUT ===
+Generated: {timestamp}
+
+GROUP: {scene_data.get('group', 'Not specified')}
+LOCATION: {scene_data.get('location', 'Not specified')}
+
+CHARACTERS IN SCENE:
+""")
+    parts.extend(f"""• {char.get('name', 'Unknown')} ({char.get('role', 'No role')})
+  Groups: {char.get('groups', 'No group')}
+  Personality: {char.get('personality', 'No personality data')}
+  Dialogue Style: {char.get('dialogue_style', 'No dialogue style data')}
+
+""" for char in characters)
+    parts.append(f"""SCENE CONCEPT:
+{concept}
+
+""")
+    if conflicts:
+        parts.append(f"""NAME CONFLICTS TO WATCH:
+{chr(10).join(conflicts)}
+
+""")
+    if world:
+        render_world(world, parts)
+    parts.append(f"""=== AI PROMPT SUGGESTION ===
+Write a scene with the following characters in {scene_data.get('location', 'an unspecified location')}:
+""")
+    parts.extend(f"- {char.get('name', 'Unknown')}: {char.get('personality', 'No personality data')}\n"
+                 for char in characters)
+    parts.append(f"""
+Scene concept: {concept}
+
+""")
+    if world:
+        parts.append(WORLD_NOTE)
+    if conflicts:
+        parts.append(CONFLICT_NOTE)
+    return parts
+
+
+def render_world(world, parts):
+    """Append the effective world rules (see effective_world) for a scene's location."""
+    from effective_world import format_value, prompt_lines
+    region = world.get('region') or {}
+    parts.append(f"WORLD RULES: {world.get('world_name', 'Unnamed world')}, {world.get('time_period', 'any time')}\n")
+    if region.get('region_name'):
+        parts.append(f"REGION: {region['region_name']}\n")
+        parts.extend(f"  {key.replace('_', ' ').title()}: {format_value(region[key])}\n"
+                     for key in REGION_PROMPT_FIELDS if region.get(key))
+    parts.extend(f"- {line}\n" for line in prompt_lines(world))
+    parts.append("\n")
+
+
+def generate_scene_output(scene_data, timestamp=None):
+    """Generate formatted scene output"""
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return "".join(render_scene(scene_data, [], timestamp))
+
+
+# === BATCHES ===
+
+def load_scene_specs(source, filename=None):
+    """Scene specs from a .csv or .json file (a path, or bytes plus filename).
+
+    JSON is a list of spec objects. CSV has a column per spec field
+    (case-insensitive), with the characters separated by ";".
+    """
+    if isinstance(source, bytes):
+        text = source.decode("utf-8-sig")
+    else:
+        filename = filename or source
+        with open(source, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+
+    if (filename or "").lower().endswith(".json"):
+        specs = json.loads(text)
+        if not isinstance(specs, list):
+            raise ValueError("Scene specs JSON must be a list of scenes")
+    else:
+        specs = [
+            {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    for i, spec in enumerate(specs, 1):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Scene {i} must be an object, not {type(spec).__name__}")
+        characters = spec.get("characters") or []
+        if isinstance(characters, str):
+            characters = [name.strip() for name in characters.split(";") if name.strip()]
+        elif not isinstance(characters, list) or not all(isinstance(name, str) for name in characters):
+            raise ValueError(f"Scene {i}: characters must be a list of names or a \";\"-separated string")
+        spec["characters"] = characters
+    return specs
+
+
+def build_scenes(name_index, specs, conflict_index=None, timestamp=None, world_rules=None):
+    """Yield scene data dicts (as the app builds them) for a list of specs.
+
+    Names missing from the story bible are left out of the cast and listed
+    under 'unknown_characters'. With a ConflictIndex, each scene gets its
+    cast's name conflicts; with world_rules (location -> effective world
+    config, e.g. WorldResolver.for_location), its world rules.
+    """
+    lookup = name_index if isinstance(name_index, dict) else character_lookup(name_index)
+    timestamp = timestamp or datetime.now().isoformat()
+    for spec in specs:
+        names = spec.get("characters") or []
+        known = [name for name in names if name in lookup]
+        conflicts = []
+        if conflict_index is not None:
+            conflicts = [format_conflict(conflict) for conflict in conflict_index.conflicts_among(known)]
+        scene_data = {
+            'group': spec.get("group") or 'Any Group',
+            'location': spec.get("location") or '',
+            'characters': build_scene_characters(lookup, known),
+            'concept': spec.get("concept") or '',
+            'theme': spec.get("theme") or '',
+            'conflicts': conflicts,
+            'timestamp': timestamp,
+        }
+        if world_rules is not None:
+            scene_data['world'] = world_rules(scene_data['location'])
+        unknown = [name for name in names if name not in lookup]
+        if unknown:
+            scene_data['unknown_characters'] = unknown
+        yield scene_data
+
+
+def write_batch(scenes, out, fmt="zip"):
+    """Stream rendered scenes to out (a path or binary file); returns the count.
+
+    fmt "zip" writes scene_NNN.txt and scene_NNN.json per scene, "txt" all
+    outputs one after another, "jsonl" one scene data object per line.
+    """
+    if fmt not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format {fmt!r}; expected one of {BATCH_FORMATS}")
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as f:
+            return write_batch(scenes, f, fmt)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    count = 0
+    if fmt == "zip":
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+            for count, scene_data in enumerate(scenes, 1):
+                zf.writestr(f"scene_{count:03d}.txt", generate_scene_output(scene_data, timestamp))
+                zf.writestr(f"scene_{count:03d}.json", json.dumps(scene_data, indent=2, ensure_ascii=False))
+        return count
+
+    for count, scene_data in enumerate(scenes, 1):
+        if fmt == "txt":
+            parts = [SCENE_SEPARATOR] if count > 1 else []
+            text = "".join(render_scene(scene_data, parts, timestamp))
+        else:
+            text = json.dumps(scene_data, ensure_ascii=False) + "\n"
+        out.write(text.encode("utf-8"))
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build scene outputs for a batch of planned scenes.")
+    parser.add_argument("bible", help="Story bible CSV")
+    parser.add_argument("specs", help="Scene specs (.csv or .json)")
+    parser.add_argument("-o", "--output", default="scenes.zip", help="Output file (default: scenes.zip)")
+    parser.add_argument("--format", choices=BATCH_FORMATS, help="Output format (default: from the file extension)")
+    args = parser.parse_args(argv)
+
+    from story_bible import load_story_bible_file
+    from name_conflicts import ConflictIndex, bible_characters
+    from storyworld import Storyworld
+    from effective_world import get_resolver
+
+    df = load_story_bible_file(args.bible)
+    name_index = df.dropna(subset=['Name']).drop_duplicates('Name').set_index('Name', drop=False)
+    conflict_index = ConflictIndex()
+    conflict_index.sync(bible_characters(df))
+
+    specs = load_scene_specs(args.specs)
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    unknown = set()
+
+    def scenes():
+        for scene_data in build_scenes(character_lookup(name_index), specs, conflict_index,
+                                   world_rules=get_resolver(Storyworld()).for_location):
+            unknown.update(scene_data.get('unknown_characters', ()))
+            yield scene_data
+
+    count = write_batch(scenes(), args.output, fmt if fmt in BATCH_FORMATS else "zip")
+    if unknown:
+        print(f"⚠️ Not in the story bible: {', '.join(sorted(unknown))}")
+    print(f"✅ {count} scenes written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
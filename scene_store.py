@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Scene Store
+===========
+
+Line-based scene files, so long scenes never have to be loaded in full.
+
+A scene can be a classic scenes/<id>_<title>.json document, or a JSON Lines
+file scenes/<id>_<title>.jsonl:
+
+    {"scene_id": "035", "title": "...", "location": "...", ...}   <- header
+    {"speaker": "Mary", "line": "...", "tone": "playful"}          <- dialogue
+    {"speaker": "Ann", "line": "...", "tone": "curious"}           <- dialogue
+
+- Listing scenes reads only the header line of each .jsonl file.
+- Dialogue is streamed: a byte-offset index of the lines lets a page of
+  dialogue be read with one seek, without parsing the rest.
+- New dialogue is appended to the end of the file, never rewritten; the
+  offset index is extended instead of rebuilt.
+
+Both formats are listed as SceneHeader dicts (the scene without "dialogue")
+with the same lazy dialogue API. Convert existing scenes with:
+
+    python scene_store.py              # every scenes/*.json
+    python scene_store.py scenes/034_ann_returns_stockholm.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from array import array
+from itertools import islice
+
+import storyworld_cache
+from storyworld_io import atomic_write_text, file_version
+
+SCENE_FOLDER = "scenes"
+LINES_EXT = ".jsonl"
+
+
+def is_scene_file(filename):
+    return filename.endswith(".json") or filename.endswith(LINES_EXT)
+
+
+def dump_line(data):
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+class SceneHeader(dict):
+    """A scene without its dialogue; the dialogue is read on demand."""
+
+    def __init__(self, path, fields, cache=None):
+        super().__init__(fields)
+        self.path = path
+        self.cache = cache
+
+    @property
+    def dialogue_count(self):
+        return dialogue_count(self.path, self.cache)
+
+    def iter_dialogue(self, start=0, stop=None):
+        return iter_dialogue(self.path, start, stop, self.cache)
+
+
+# === LINE INDEX (.jsonl) ===
+
+class _LineIndex:
+    __slots__ = ("version", "header_line", "offsets", "end", "appended")
+
+    def __init__(self, version, header_line, offsets, end):
+        self.version = version
+        self.header_line = header_line
+        self.offsets = offsets      # byte offset of every dialogue line
+        self.end = end              # bytes indexed so far
+        self.appended = None        # file version after our own append_dialogue()
+
+
+_line_indexes = {}  # path -> _LineIndex
+_lock = threading.Lock()
+
+
+def _line_index(path):
+    path = os.path.normpath(path)
+    version = file_version(path)
+    with _lock:
+        index = _line_indexes.get(path)
+        if index is not None and index.version == version:
+            return index
+
+        with open(path, "rb") as f:
+            header_line = f.readline()
+            pos = len(header_line)
+            offsets = array("q")
+            # Only our own append_dialogue() is known to have left the indexed bytes
+            # alone; anything else (git pull, an editor) may have rewritten them
+            if (index is not None and index.appended == version
+                    and header_line == index.header_line):
+                f.seek(index.end - 1)
+                if f.read(1) == b"\n":
+                    offsets = array("q", index.offsets)
+                    pos = index.end
+            f.seek(pos)
+            for line in f:
+                if line.strip():
+                    offsets.append(pos)
+                pos += len(line)
+
+        index = _line_indexes[path] = _LineIndex(version, header_line, offsets, pos)
+        return index
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"error": str(e)}
+
+
+# === READING ===
+
+def read_header(path, cache=None):
+    """The scene without its dialogue, as a SceneHeader ({"error": ...} if unreadable)."""
+    if path.endswith(LINES_EXT):
+        try:
+            header = _parse_line(_line_index(path).header_line or b"{}")
+        except OSError as e:
+            return {"error": str(e)}
+    else:
+        header = (cache or storyworld_cache.get_cache()).load_file(path)
+    if "error" in header or not isinstance(header, dict):
+        return header if isinstance(header, dict) else {"error": "Scene is not a JSON object"}
+    return SceneHeader(path, {k: v for k, v in header.items() if k != "dialogue"}, cache)
+
+
+def dialogue_count(path, cache=None):
+    if path.endswith(LINES_EXT):
+        return len(_line_index(path).offsets)
+    data = (cache or storyworld_cache.get_cache()).load_file(path)
+    return len(data.get("dialogue") or [])
+
+
+def iter_dialogue(path, start=0, stop=None, cache=None):
+    """Yield dialogue entries start..stop lazily."""
+    if not path.endswith(LINES_EXT):
+        data = (cache or storyworld_cache.get_cache()).load_file(path)
+        yield from islice(data.get("dialogue") or [], start, stop)
+        return
+
+    offsets = _line_index(path).offsets
+    if start >= len(offsets):
+        return
+    remaining = (stop if stop is not None else len(offsets)) - start
+    with open(path, "rb") as f:
+        f.seek(offsets[start])
+        for line in f:
+            if remaining <= 0:
+                break
+            if line.strip():
+                remaining -= 1
+                yield _parse_line(line)
+
+
+def read_scene(path, cache=None):
+    """The whole scene, dialogue included."""
+    header = read_header(path, cache)
+    if "error" in header:
+        return header
+    scene = dict(header)
+    scene["dialogue"] = list(iter_dialogue(path, cache=cache))
+    return scene
+
+
+_headers = {}  # path -> (version, SceneHeader)
+
+
+def clear_caches():
+    """Forget every cached scene header and line index, as in a fresh process."""
+    with _lock:
+        _headers.clear()
+        _line_indexes.clear()
+
+
+def cached_header(path, cache=None, stat=None):
+    """read_header(), but the same object again while the file is unchanged."""
+    path = os.path.normpath(path)
+    stat = stat or os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _headers.get(path)
+    if cached is None or cached[0] != version:
+        cached = _headers[path] = (version, read_header(path, cache))
+    return cached[1]
+
+
+def load_scene_headers(folder=SCENE_FOLDER, cache=None):
+    """{filename: SceneHeader} for every scene in folder, in either format.
+
+    Unchanged files return the same header object as last time.
+    """
+    folder = os.path.normpath(folder)
+    headers = {}
+    seen = set()
+    if os.path.exists(folder):
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not is_scene_file(entry.name) or not entry.is_file():
+                    continue
+                headers[entry.name] = cached_header(entry.path, cache, entry.stat())
+                seen.add(entry.path)
+
+    prefix = os.path.join(folder, "")
+    for path in [p for p in _headers if p.startswith(prefix) and p not in seen]:
+        del _headers[path]
+    return headers
+
+
+# === WRITING ===
+
+def write_scene(path, scene):
+    """Write a whole scene as JSON Lines (atomically)."""
+    header = {k: v for k, v in scene.items() if k != "dialogue"}
+    lines = [dump_line(header)] + [dump_line(entry) for entry in scene.get("dialogue") or []]
+    atomic_write_text(path, "".join(lines))
+
+
+def append_dialogue(path, entries):
+    """Append dialogue entries to a .jsonl scene without rewriting it."""
+    data = "".join(dump_line(entry) for entry in entries).encode("utf-8")
+    with _lock, open(path, "ab") as f:
+        index = _line_indexes.get(os.path.normpath(path))
+        before = file_version(path)
+        # A line torn by a crash gets its own line back before we add ours
+        if f.tell() > 0:
+            with open(path, "rb") as check:
+                check.seek(-1, os.SEEK_END)
+                if check.read(1) != b"\n":
+                    data = b"\n" + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        if index is not None and index.version == before:
+            # Up to date before we wrote, so the next read only indexes our lines
+            index.appended = file_version(path)
+
+
+def convert_to_lines(path):
+    """Rewrite a .json scene as .jsonl; returns the new path."""
+    with open(path, "r", encoding="utf-8") as f:
+        scene = json.load(f)
+    new_path = path[:-len(".json")] + LINES_EXT
+    write_scene(new_path, scene)
+    os.remove(path)
+    return new_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert scene JSON files to JSON Lines.")
+    parser.add_argument("files", nargs="*", help="Scene files (default: every scenes/*.json)")
+    args = parser.parse_args(argv)
+
+    files = args.files or [
+        os.path.join(SCENE_FOLDER, filename)
+        for filename in sorted(os.listdir(SCENE_FOLDER)) if filename.endswith(".json")
+    ]
+    for path in files:
+        try:
+            print(f"✅ {path} -> {convert_to_lines(path)}")
+        except Exception as e:
+            print(f"❌ {path} - {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
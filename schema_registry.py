@@ -0,0 +1,195 @@
+"""
+Schema Registry
+===============
+
+Compiles every schema in schemas/ into a ready-to-use validator once per
+process, instead of letting jsonschema.validate() re-check the schema and
+build a new validator on every call.
+
+Local $refs (e.g. world-schema.json -> ./region-schema.json) are resolved
+against the schemas/ folder on disk, and the validators are rebuilt only
+when a schema file changes. Like jsonschema.validate(), "format" keywords
+(the character birthdate "date") are not enforced: the explorer's template
+leaves birthdate empty. jsonschema itself is imported only when the schemas
+are first compiled, so importing this module costs nothing at app startup.
+"""
+
+import os
+import json
+import pathlib
+import threading
+from urllib.parse import urlparse
+
+SCHEMAS_FOLDER = "schemas"
+
+# Schema type -> file name, as used by the apps and the validate CLI
+SCHEMA_FILES = {
+    "character": "character-schema.json",
+    "region": "region-schema.json",
+    "world": "world-schema.json",
+}
+
+
+class SchemaRegistry:
+    """Compiled validators for the schemas in one folder."""
+
+    def __init__(self, folder=SCHEMAS_FOLDER, schema_files=None):
+        self.folder = folder
+        self.schema_files = dict(schema_files or SCHEMA_FILES)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._schemas = {}      # schema type -> raw schema
+        self._validators = {}   # schema type -> compiled validator
+        self._errors = {}       # schema type -> load/compile error message
+        self.builds = 0
+
+    def _folder_signature(self):
+        """(name, mtime, size) of every schema file; changes trigger a rebuild."""
+        if not os.path.isdir(self.folder):
+            return ()
+        signature = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(signature))
+
+    def refresh(self):
+        """Rebuild the validators if any schema file changed since last time."""
+        signature = self._folder_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature != self._signature:
+                self._build()
+                self._signature = signature
+        return True
+
+    def _file_uri(self, filename):
+        return pathlib.Path(os.path.abspath(os.path.join(self.folder, filename))).as_uri()
+
+    def _read_folder(self):
+        """Load every schema file in the folder, keyed by its file URI."""
+        documents = {}
+        errors = {}
+        if not os.path.isdir(self.folder):
+            return documents, errors
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, filename), "r", encoding="utf-8") as f:
+                    documents[self._file_uri(filename)] = json.load(f)
+            except Exception as e:
+                errors[filename] = str(e)
+        return documents, errors
+
+    def _build(self):
+        from jsonschema.validators import validator_for
+        try:
+            from referencing import Registry, Resource
+            from referencing.exceptions import NoSuchResource
+            from referencing.jsonschema import DRAFT7
+        except ImportError:  # jsonschema < 4.18
+            Registry = None
+            from jsonschema import RefResolver
+
+        documents, read_errors = self._read_folder()
+        schemas = {}
+        validators = {}
+        errors = {}
+
+        if Registry is not None:
+            def retrieve(uri):
+                # Pick up schemas referenced by URI that weren't in the folder listing
+                from urllib.request import url2pathname
+                path = url2pathname(urlparse(uri).path)
+                if not uri.startswith("file:") or not os.path.isfile(path):
+                    raise NoSuchResource(ref=uri)
+                with open(path, "r", encoding="utf-8") as f:
+                    return Resource.from_contents(json.load(f), default_specification=DRAFT7)
+
+            registry = Registry(retrieve=retrieve).with_resources(
+                (uri, Resource.from_contents(doc, default_specification=DRAFT7))
+                for uri, doc in documents.items()
+            )
+
+        for schema_type, filename in self.schema_files.items():
+            if filename in read_errors:
+                errors[schema_type] = read_errors[filename]
+                continue
+            uri = self._file_uri(filename)
+            if uri not in documents:
+                continue
+
+            schema = documents[uri]
+            try:
+                cls = validator_for(schema)
+                cls.check_schema(schema)
+                # Give the schema its file URI as base so "./other.json" refs
+                # resolve inside schemas/
+                rooted = schema if "$id" in schema else dict(schema, **{"$id": uri})
+                if Registry is not None:
+                    validator = cls(rooted, registry=registry)
+                else:
+                    resolver = RefResolver(base_uri=uri, referrer=schema, store=documents)
+                    validator = cls(schema, resolver=resolver)
+            except Exception as e:
+                errors[schema_type] = str(e)
+                continue
+
+            schemas[schema_type] = schema
+            validators[schema_type] = validator
+
+        self._schemas = schemas
+        self._validators = validators
+        self._errors = errors
+        self.builds += 1
+
+    def schema(self, schema_type):
+        return self._schemas.get(schema_type)
+
+    def schema_types(self):
+        return list(self._validators)
+
+    def load_errors(self):
+        """Schema types that could not be loaded or compiled, with the reason."""
+        return dict(self._errors)
+
+    def get_validator(self, schema_type):
+        return self._validators.get(schema_type)
+
+    def iter_errors(self, data, schema_type):
+        """Yield every validation error for data (not just the first)."""
+        validator = self._validators.get(schema_type)
+        if validator is None:
+            return iter(())
+        return validator.iter_errors(_plain(data))
+
+    def validate(self, data, schema_type):
+        """Validate data, returning (is_valid, message) like the app expects."""
+        validator = self._validators.get(schema_type)
+        if validator is None:
+            return True, "No schema available for validation"
+
+        from jsonschema.exceptions import best_match
+        error = best_match(validator.iter_errors(_plain(data)))
+        if error is None:
+            return True, "✅ Valid schema"
+        return False, f"❌ Schema validation error: {error.message}"
+
+
+def _plain(data):
+    # jsonschema wants dicts and lists: convert compact entity models back
+    return data.to_dict() if hasattr(data, "to_dict") else data
+
+
+# One registry per process, shared by all Streamlit sessions
+_registry = SchemaRegistry()
+
+
+def get_registry():
+    """Return the process-wide registry, rebuilt if a schema file changed."""
+    _registry.refresh()
+    return _registry
@@ -0,0 +1,343 @@
+"""
+Storyworld Search Index
+=======================
+
+In-memory inverted index over characters, scenes, locations and the story
+bible CSV. Text is split into lower-cased, accent-folded tokens ("Ängby" is
+found by "angby"), and each token points at the documents it appears in.
+
+Queries match every term by exact token, by prefix ("lund" -> "lundqvist")
+and, when that finds nothing, by one-typo fuzzy match ("lindstorm"). Fuzzy
+lookups use a deletion index (every token with one letter removed), so they
+never scan the vocabulary.
+
+Documents are replaced in place when a file is saved; sync_folder() only
+re-indexes files the JSON cache actually re-parsed.
+"""
+
+import re
+import bisect
+import heapq
+import threading
+import unicodedata
+from collections import defaultdict
+from collections.abc import Mapping
+
+TOKEN_RE = re.compile(r"\w+")
+
+# How much a match in each field counts towards the score
+FIELD_WEIGHTS = {
+    "name": 5,
+    "other_names": 4,
+    "groups": 3,
+    "title": 4,
+    "role": 2,
+}
+DEFAULT_WEIGHT = 1
+
+# Score multipliers by how the query term matched the token
+EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.3
+
+MIN_PREFIX_LEN = 2
+MIN_FUZZY_LEN = 4
+MAX_PREFIX_EXPANSION = 64
+
+# New tokens are merged into the sorted vocabulary one by one up to this
+# many; bulk loads re-sort it once instead
+VOCAB_INSORT_LIMIT = 1000
+
+
+def fold(text):
+    """Lower-case and strip accents so 'Ängby' and 'angby' match."""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def _deletes(token):
+    """Every variant of token with one character removed."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _within_one_edit(a, b):
+    """True if a and b differ by at most one insert, delete, substitution or swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _flatten(value):
+    """Yield all strings inside nested lists/dicts."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    elif value is not None:
+        yield str(value)
+
+
+class SearchIndex:
+    """Token -> documents index with prefix and fuzzy lookup."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)   # token -> {doc_id: weight}
+        self._doc_tokens = {}                # doc_id -> set of tokens
+        self._docs = {}                      # doc_id -> {"kind", "title", "source"}
+        self._vocab = []                     # sorted tokens, for prefix lookups
+        self._vocab_pending = []             # tokens not yet merged into _vocab
+        self._vocab_stale = 0                # dropped tokens still in _vocab
+        self._deletes = defaultdict(set)     # token minus one char -> tokens
+        self._sources = {}                   # doc_id -> object last indexed
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, kind, title, fields, source=None):
+        """Index (or re-index) one document.
+
+        fields maps a field name to a string or nested list/dict of strings.
+        """
+        weights = defaultdict(int)
+        for field, value in fields.items():
+            field_weight = FIELD_WEIGHTS.get(field, DEFAULT_WEIGHT)
+            for text in _flatten(value):
+                for token in tokenize(text):
+                    weights[token] += field_weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for token, weight in weights.items():
+                postings = self._postings[token]
+                if not postings:
+                    self._add_token(token)
+                postings[doc_id] = weight
+            self._doc_tokens[doc_id] = set(weights)
+            self._docs[doc_id] = {"kind": kind, "title": title}
+            self._sources[doc_id] = source
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        for token in self._doc_tokens.pop(doc_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                self._drop_token(token)
+        self._docs.pop(doc_id, None)
+        self._sources.pop(doc_id, None)
+
+    def _add_token(self, token):
+        self._vocab_pending.append(token)
+        for variant in _deletes(token):
+            self._deletes[variant].add(token)
+
+    def _drop_token(self, token):
+        # Left in _vocab until the next re-sort; prefix scans skip it
+        self._vocab_stale += 1
+        for variant in _deletes(token):
+            tokens = self._deletes.get(variant)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._deletes[variant]
+
+    def _sorted_vocab(self):
+        pending = self._vocab_pending
+        if pending or self._vocab_stale:
+            if len(pending) <= VOCAB_INSORT_LIMIT and self._vocab_stale * 4 <= len(self._vocab):
+                for token in pending:
+                    i = bisect.bisect_left(self._vocab, token)
+                    if i == len(self._vocab) or self._vocab[i] != token:
+                        self._vocab.insert(i, token)
+            else:
+                self._vocab = sorted(self._postings)
+                self._vocab_stale = 0
+            self._vocab_pending = []
+        return self._vocab
+
+    def _expand(self, term):
+        """Return {token: match multiplier} for one query term."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = EXACT
+
+        if len(term) >= MIN_PREFIX_LEN:
+            vocab = self._sorted_vocab()
+            i = bisect.bisect_left(vocab, term)
+            while (i < len(vocab) and vocab[i].startswith(term)
+                   and len(matches) < MAX_PREFIX_EXPANSION):
+                if vocab[i] in self._postings:
+                    matches.setdefault(vocab[i], PREFIX)
+                i += 1
+
+        if not matches and len(term) >= MIN_FUZZY_LEN:
+            candidates = set(self._deletes.get(term, ()))
+            for variant in _deletes(term):
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._deletes.get(variant, ()))
+            for token in candidates:
+                if _within_one_edit(term, token):
+                    matches[token] = FUZZY
+        return matches
+
+    def search(self, query, limit=20, kinds=None):
+        """Return [(doc_id, score, doc_info)] for documents matching every term."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token, multiplier in self._expand(term).items():
+                    for doc_id, weight in self._postings[token].items():
+                        score = weight * multiplier
+                        if score > term_scores.get(doc_id, 0):
+                            term_scores[doc_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+                if not scores:
+                    return []
+
+            if kinds is not None:
+                scores = {d: s for d, s in scores.items() if self._docs[d]["kind"] in kinds}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(doc_id, score, self._docs[doc_id]) for doc_id, score in best]
+
+    def sync_folder(self, folder, kind, items):
+        """Bring documents for one loaded folder ({filename: data}) up to date.
+
+        Files whose data object is the one already indexed (a cache hit) are
+        skipped; deleted files are removed.
+        """
+        extract = EXTRACTORS[kind]
+        prefix = f"{folder}/"
+        with self._lock:
+            seen = set()
+            for filename, data in items.items():
+                doc_id = prefix + filename
+                seen.add(doc_id)
+                if self._sources.get(doc_id) is data:
+                    continue
+                if "error" in data:
+                    self.remove(doc_id)
+                    continue
+                title, fields = extract(data, filename)
+                self.add(doc_id, kind, title, fields, source=data)
+
+            stale = [d for d in self._docs if d.startswith(prefix) and d not in seen]
+            for doc_id in stale:
+                self._remove(doc_id)
+            self._sorted_vocab()
+
+
+def character_fields(data, filename):
+    static = data.get("static_attributes") or {}
+    return data.get("name", filename), {
+        "name": data.get("name", ""),
+        "other_names": data.get("other_names", []),
+        "groups": data.get("groups", []),
+        "role": static.get("role", ""),
+        "personality": data.get("personality", ""),
+        "background": data.get("background", ""),
+    }
+
+
+def scene_fields(data, filename):
+    # Scene headers stream their dialogue from disk instead of holding it
+    dialogue = data.iter_dialogue() if hasattr(data, "iter_dialogue") else data.get("dialogue") or []
+    return data.get("title", filename), {
+        "title": data.get("title", ""),
+        "name": data.get("characters_present", []),
+        "location": data.get("location", ""),
+        "summary": data.get("summary", ""),
+        "tags": data.get("tags", []),
+        "dialogue": [entry.get("line", "") for entry in dialogue if isinstance(entry, dict)],
+    }
+
+
+def location_fields(data, filename):
+    return data.get("region_name", filename), {
+        "name": data.get("region_name", ""),
+        "tone": data.get("tone", ""),
+        "tech_level": data.get("tech_level", ""),
+        "problems": data.get("problems", []),
+        "infrastructure": data.get("infrastructure", []),
+        "youth_trends": data.get("youth_trends", []),
+        "notes": data.get("notes", ""),
+    }
+
+
+EXTRACTORS = {
+    "character": character_fields,
+    "scene": scene_fields,
+    "location": location_fields,
+}
+
+# Story bible CSV column -> index field
+BIBLE_COLUMNS = {
+    "Name": "name",
+    "Other Names": "other_names",
+    "Groups": "groups",
+    "Role": "role",
+    "Personality": "personality",
+    "Background": "background",
+    "Dialogue Style": "dialogue_style",
+}
+
+
+def build_bible_index(df):
+    """Index every row of the story bible DataFrame; doc ids are row labels."""
+    index = SearchIndex()
+    columns = [c for c in BIBLE_COLUMNS if c in df.columns]
+    for label, *values in df[columns].itertuples(name=None):
+        fields = {
+            BIBLE_COLUMNS[column]: value
+            for column, value in zip(columns, values)
+            if isinstance(value, str)
+        }
+        index.add(label, "bible", fields.get("name", str(label)), fields)
+    index._sorted_vocab()
+    return index
+
+
+# Shared by every Streamlit session running in this process
+_index = SearchIndex()
+
+
+def get_index():
+    return _index
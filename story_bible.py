@@ -0,0 +1,121 @@
+"""
+Story Bible Loader
+==================
+
+Loads the story bible CSV (e.g. Ann_series_story_bible_Characters.csv) into a
+typed DataFrame, once per distinct file content.
+
+- Parsed frames are cached in memory by the SHA-256 of the CSV bytes, so a
+  Streamlit rerun with the same upload costs one hash instead of a parse.
+- Column headers are cleaned up: surrounding whitespace is stripped and
+  headers that then collide ("Relationships" / "Relationships ") get a
+  numbered suffix ("Relationships 2").
+- Low-cardinality columns (Role, Groups, Pronouns) become categoricals.
+- Each parsed frame is also written as a pickled snapshot under
+  .storyworld_cache/, so a fresh process reloads a known bible without
+  re-parsing the CSV.
+
+Returned frames are shared - treat them as read-only. pandas is imported on
+first parse, so normalize_headers() is cheap to import (see bible_sync).
+"""
+
+import io
+import os
+import hashlib
+import threading
+
+SNAPSHOT_FOLDER = ".storyworld_cache"
+SNAPSHOT_PREFIX = "bible-"
+KEEP_SNAPSHOTS = 5
+MEMORY_CACHE_SIZE = 4
+
+CATEGORY_COLUMNS = ["Role", "Groups", "Pronouns"]
+
+_cache = {}  # sha256 -> DataFrame, oldest first
+_lock = threading.Lock()
+
+
+def normalize_headers(columns):
+    """Strip whitespace from headers and number any that then collide."""
+    seen = {}
+    normalized = []
+    for column in columns:
+        name = str(column).strip()
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        normalized.append(name if count == 1 else f"{name} {count}")
+    return normalized
+
+
+def parse_story_bible(data):
+    """Parse CSV bytes into a typed DataFrame (no caching)."""
+    import pandas as pd
+    df = pd.read_csv(io.BytesIO(data))
+    df.columns = normalize_headers(df.columns)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def _snapshot_path(digest):
+    return os.path.join(SNAPSHOT_FOLDER, f"{SNAPSHOT_PREFIX}{digest}.pkl")
+
+
+def _write_snapshot(digest, df):
+    os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+    path = _snapshot_path(digest)
+    tmp_path = f"{path}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+    # Keep only the most recent snapshots
+    snapshots = sorted(
+        (entry for entry in os.scandir(SNAPSHOT_FOLDER)
+         if entry.name.startswith(SNAPSHOT_PREFIX) and entry.name.endswith(".pkl")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in snapshots[KEEP_SNAPSHOTS:]:
+        os.remove(entry.path)
+
+
+def _read_snapshot(digest):
+    path = _snapshot_path(digest)
+    if not os.path.exists(path):
+        return None
+    import pandas as pd
+    try:
+        return pd.read_pickle(path)
+    except Exception:
+        # Corrupt or written by an incompatible pandas - re-parse instead
+        return None
+
+
+def load_story_bible(data):
+    """Return the typed DataFrame for CSV bytes, parsing only unseen content."""
+    digest = hashlib.sha256(data).hexdigest()
+
+    with _lock:
+        df = _cache.get(digest)
+    if df is not None:
+        return df
+
+    df = _read_snapshot(digest)
+    if df is None:
+        df = parse_story_bible(data)
+        try:
+            _write_snapshot(digest, df)
+        except OSError:
+            pass  # Read-only checkout: the in-memory cache still works
+
+    with _lock:
+        _cache[digest] = df
+        while len(_cache) > MEMORY_CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+    return df
+
+
+def load_story_bible_file(path):
+    with open(path, "rb") as f:
+        return load_story_bible(f.read())
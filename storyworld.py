@@ -0,0 +1,306 @@
+"""
+Storyworld Repository
+=====================
+
+One shared, indexed view of the whole storyworld: characters, locations,
+scenes, relationships and metadata/versioning.json.
+
+Files are read through the mtime-keyed JSON cache (storyworld_cache), so a
+refresh only re-parses files that changed on disk, and the lookup indexes
+(by id, by name or alias, by group, scenes per character...) are rebuilt
+lazily - only for folders whose contents changed, and only when a lookup
+actually needs them. Scenes are kept as headers (see scene_store); their
+dialogue is streamed from disk on demand.
+
+The Streamlit apps share one instance per process through st.cache_resource;
+scripts simply create their own:
+
+    world = Storyworld()
+    world.character("Elin_Voss_The_aging_guerrilla_coach")
+    world.find_characters("Coach V")
+"""
+
+import os
+import threading
+from collections import defaultdict
+
+import storyworld_cache
+import scene_store
+from search_index import fold
+
+CHAR_FOLDER = "characters"
+LOCATION_FOLDER = "locations"
+SCENE_FOLDER = "scenes"
+RELATIONSHIP_FOLDER = "relationships"
+METADATA_FILE = os.path.join("metadata", "versioning.json")
+
+FOLDERS = [CHAR_FOLDER, LOCATION_FOLDER, SCENE_FOLDER, RELATIONSHIP_FOLDER]
+
+# The explorer's "Create New Character" placeholder: every field the character schema requires
+NEW_CHARACTER_FILE = "new_character.json"
+CHARACTER_TEMPLATE = {
+    "id": "new_character",
+    "name": "New Character",
+    "pronouns": "they/them",
+    "groups": [],
+    "other_names": [],
+    "personality": "",
+    "background": "",
+    "physical_description": "",
+    "dialogue_style": "",
+    "relationships": {},
+    "static_attributes": {
+        "birthdate": "",
+        "role": "",
+        "nationality": "",
+        "augmentation_level": "",
+        "economic_viability_rating": 5
+    },
+    "dynamic_attributes": []
+}
+
+
+def character_id(filename, data):
+    """The immutable character id; falls back to the filename for old files."""
+    return data.get("id") or filename[:-len(".json")]
+
+
+class Storyworld:
+    """Indexed in-memory graph of the storyworld JSON files."""
+
+    def __init__(self, root=".", cache=None):
+        self.root = root
+        self.cache = cache or storyworld_cache.get_cache()
+        self._lock = threading.RLock()
+        self._items = {}       # folder -> {filename: data}
+        self._dirty = set(FOLDERS)
+        self._indexes = {}     # folder -> built indexes, dropped when the folder changes
+        self._metadata = None
+
+    def path(self, folder, filename=None):
+        if filename is None:
+            return os.path.join(self.root, folder)
+        return os.path.join(self.root, folder, filename)
+
+    # --- Loading ---
+
+    def invalidate(self, folder=None):
+        """Mark one folder (or everything) as possibly changed.
+
+        Nothing is read until the next lookup touches the folder.
+        """
+        with self._lock:
+            if folder is None:
+                self._dirty.update(FOLDERS)
+                self._metadata = None
+            else:
+                self._dirty.add(folder)
+
+    def refresh(self, folder=None):
+        """Re-check folders on disk; returns the folders whose contents changed."""
+        changed = []
+        with self._lock:
+            for name in [folder] if folder else FOLDERS:
+                items = self._load(name)
+                previous = self._items.get(name)
+                self._dirty.discard(name)
+                # The cache hands back the same objects for unchanged files
+                if (previous is None or previous.keys() != items.keys()
+                        or any(previous[f] is not data for f, data in items.items())):
+                    self._items[name] = items
+                    self._indexes.pop(name, None)
+                    changed.append(name)
+            if folder is None:
+                self._metadata = None
+        return changed
+
+    def _load(self, folder):
+        if folder == SCENE_FOLDER:
+            # Scene headers only; dialogue is streamed from disk when needed
+            return scene_store.load_scene_headers(self.path(folder), self.cache)
+        return self.cache.load_folder(self.path(folder))
+
+    def items(self, folder):
+        """{filename: data} for a folder, as loaded from disk."""
+        with self._lock:
+            if folder in self._dirty or folder not in self._items:
+                self.refresh(folder)
+            return self._items[folder]
+
+    def _load_file(self, folder, filename):
+        path = self.path(folder, filename)
+        if folder == SCENE_FOLDER:
+            return scene_store.cached_header(path, self.cache)
+        return self.cache.load_file(path)
+
+    def apply_changes(self, folder, filenames):
+        """Re-read only these files of a folder, e.g. after a file watcher event."""
+        with self._lock:
+            if folder == os.path.dirname(METADATA_FILE):
+                self._metadata = None
+                return
+            items = self._items.get(folder)
+            if items is None or folder in self._dirty:
+                return  # Read in full on the next lookup anyway
+            # A new dict, so anything keyed on the old one sees the change
+            items = dict(items)
+            for filename in filenames:
+                try:
+                    items[filename] = self._load_file(folder, filename)
+                except FileNotFoundError:
+                    items.pop(filename, None)
+                    self.cache.invalidate(self.path(folder, filename))
+            self._items[folder] = items
+            self._indexes.pop(folder, None)
+
+    def put(self, folder, filename, data):
+        """Record data just saved to folder/filename without re-reading the folder."""
+        with self._lock:
+            if folder == SCENE_FOLDER:
+                self._dirty.add(folder)
+                return
+            items = self._items.get(folder)
+            if items is not None:
+                # A new dict, as in apply_changes(), so graphs and timelines keyed on it rebuild
+                items = dict(items)
+                items[filename] = data
+                self._items[folder] = items
+                self._indexes.pop(folder, None)
+
+    def _index(self, folder, build):
+        with self._lock:
+            items = self.items(folder)
+            index = self._indexes.get(folder)
+            if index is None:
+                index = self._indexes[folder] = build(items)
+            return index
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            path = os.path.join(self.root, METADATA_FILE)
+            self._metadata = self.cache.load_file(path) if os.path.exists(path) else {}
+        return self._metadata
+
+    # --- Characters ---
+
+    def _build_character_index(self, items):
+        by_id = {}
+        filenames = {}
+        by_name = defaultdict(list)
+        by_group = defaultdict(list)
+        for filename, data in items.items():
+            if "error" in data:
+                continue
+            char_id = character_id(filename, data)
+            by_id[char_id] = data
+            filenames[char_id] = filename
+            for name in [data.get("name", ""), *(data.get("other_names") or [])]:
+                if name:
+                    by_name[fold(name)].append(char_id)
+            for group in data.get("groups") or []:
+                by_group[group].append(char_id)
+        return {"by_id": by_id, "filenames": filenames,
+                "by_name": dict(by_name), "by_group": dict(by_group)}
+
+    def _characters(self):
+        return self._index(CHAR_FOLDER, self._build_character_index)
+
+    def characters(self):
+        """{character id: data} for every readable character file."""
+        return self._characters()["by_id"]
+
+    def character(self, char_id):
+        return self._characters()["by_id"].get(char_id)
+
+    def character_filename(self, char_id):
+        return self._characters()["filenames"].get(char_id)
+
+    def find_characters(self, name):
+        """Ids of characters whose name or one of whose other_names is name."""
+        return list(self._characters()["by_name"].get(fold(name), []))
+
+    def groups(self):
+        return sorted(self._characters()["by_group"])
+
+    def characters_in_group(self, group):
+        return list(self._characters()["by_group"].get(group, []))
+
+    # --- Locations ---
+
+    def _build_location_index(self, items):
+        return {
+            "by_name": {
+                fold(data.get("region_name", filename)): data
+                for filename, data in items.items() if "error" not in data
+            }
+        }
+
+    def locations(self):
+        """{region name: data}, keyed by the folded region name."""
+        return self._index(LOCATION_FOLDER, self._build_location_index)["by_name"]
+
+    def location(self, region_name):
+        return self.locations().get(fold(region_name))
+
+    def location_names(self):
+        return sorted(data["region_name"] for data in self.locations().values() if data.get("region_name"))
+
+    # --- Scenes ---
+
+    def _build_scene_index(self, items):
+        by_id = {}
+        by_character = defaultdict(list)
+        for filename, data in items.items():
+            if "error" in data:
+                continue
+            scene_id = str(data.get("scene_id", os.path.splitext(filename)[0]))
+            by_id[scene_id] = data
+            for name in data.get("characters_present") or []:
+                by_character[fold(name)].append(scene_id)
+        return {"by_id": by_id, "by_character": dict(by_character)}
+
+    def scenes(self):
+        return self._index(SCENE_FOLDER, self._build_scene_index)["by_id"]
+
+    def scene(self, scene_id):
+        return self.scenes().get(str(scene_id))
+
+    def scenes_with(self, name):
+        """Ids of scenes listing name in characters_present."""
+        index = self._index(SCENE_FOLDER, self._build_scene_index)
+        return list(index["by_character"].get(fold(name), []))
+
+    # --- Relationships ---
+
+    def _build_relationship_index(self, items):
+        by_name = defaultdict(list)
+        relationships = []
+        for filename, data in items.items():
+            if "error" in data:
+                continue
+            relationship = data.get("relationship", data)
+            relationships.append(relationship)
+            for name in relationship.get("between") or []:
+                by_name[fold(name)].append(relationship)
+        return {"all": relationships, "by_name": dict(by_name)}
+
+    def relationships(self):
+        return self._index(RELATIONSHIP_FOLDER, self._build_relationship_index)["all"]
+
+    def relationships_of(self, name):
+        index = self._index(RELATIONSHIP_FOLDER, self._build_relationship_index)
+        return list(index["by_name"].get(fold(name), []))
+
+
+_world = None
+_world_lock = threading.Lock()
+
+
+def get_storyworld(root="."):
+    """Process-wide Storyworld for scripts that don't use Streamlit."""
+    global _world
+    with _world_lock:
+        if _world is None or _world.root != root:
+            _world = Storyworld(root)
+        return _world
@@ -1,194 +1,281 @@
 import os
+import copy
 import json
 import streamlit as st
-import jsonschema
-from jsonschema import validate, ValidationError
+import storyworld_cache
+import storyworld
+import storyworld_io
+import storyworld_models
+import schema_registry
+import search_index
+import name_conflicts
+import cross_references
+import scene_store
+import app_settings
+import profiling
+# Imported by the sections that need them: relationship_graph, timeline,
+# storyworld_db (only with "sqlite_index"), storyworld_watch (only with "watch_files")
 
 CHAR_FOLDER = "characters"
 SCENE_FOLDER = "scenes"
 LOCATION_FOLDER = "locations"
 SCHEMAS_FOLDER = "schemas"
-SETTINGS_FILE = "streamlit_app_settings.json"
-
-# --- Load UI settings ---
-settings = {
-    "show_download": True,
-    "json_indent": 2,
-    "enable_editing": True,
-    "validate_schema": True
-}
-if os.path.exists(SETTINGS_FILE):
-    with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-        try:
-            user_settings = json.load(f)
-            settings.update(user_settings)
-        except:
-            st.warning("⚠️ Couldn't load settings — using defaults.")
-
-# --- Load schemas ---
-schemas = {}
-if os.path.exists(SCHEMAS_FOLDER):
-    schema_files = {
-        "character": "character-schema.json",
-        "region": "region-schema.json",
-    }
-
-    for schema_type, filename in schema_files.items():
-        schema_path = os.path.join(SCHEMAS_FOLDER, filename)
-        if os.path.exists(schema_path):
-            with open(schema_path, "r", encoding="utf-8") as f:
-                try:
-                    schemas[schema_type] = json.load(f)
-                except Exception as e:
-                    st.sidebar.warning(f"⚠️ Couldn't load {schema_type} schema: {e}")
 
+# Paint the page first; everything below loads lazily
 st.set_page_config(page_title="They Burn Witches", layout="wide")
 
 st.title("🧙‍♀️ They Burn Witches: Storyworld Explorer")
 
-section = st.sidebar.radio("Choose section", ["Characters", "Scenes", "Locations"])
+# --- Load UI settings ---
+# Parsed once per process (again only if the file changes)
+settings, settings_error = app_settings.load_settings()
+if settings_error:
+    st.warning("⚠️ Couldn't load settings — using defaults.")
+
+# --- Per-rerun timing spans (no-ops unless this run is recorded) ---
+profiler = profiling.get_recorder(st.session_state)
+if settings["profiling"]:
+    profiler.begin_run()
+
+# --- Schemas ---
+# Compiled once per process, on the first validation; rebuilt when a file in schemas/ changes
+schema_warnings_shown = False
+
+def get_schemas():
+    global schema_warnings_shown
+    with profiler.span("load.schemas"):
+        schemas = schema_registry.get_registry()
+    if not schema_warnings_shown:
+        for schema_type, error in schemas.load_errors().items():
+            st.sidebar.warning(f"⚠️ Couldn't load {schema_type} schema: {error}")
+        schema_warnings_shown = True
+    return schemas
+
+section = st.sidebar.radio("Choose section", ["Characters", "Scenes", "Locations", "Relationships", "Timeline", "Search"])
+profiler.tag(section)
+
+def show_cache_stats():
+    """Show how well the file cache is doing in the sidebar"""
+    stats = storyworld_cache.cache_stats()
+    st.sidebar.caption(
+        f"🗃️ File cache: {stats['hits']} hits · {stats['misses']} misses · "
+        f"{stats['entries']} files"
+    )
+    if watcher:
+        st.sidebar.caption(f"👀 Watching files ({watcher.mode}) · {watcher.batches} updates applied")
+
+@st.cache_resource
+def get_storyworld():
+    """One loaded storyworld shared by every session of this app"""
+    return storyworld.Storyworld()
+
+world = get_storyworld()
+
+# Characters and locations kept as compact slotted objects instead of dicts
+if storyworld_cache.use_compact_models(settings["compact_models"]):
+    world.invalidate()
+
+# Optional SQLite index for filters, joins and counts; re-reads only changed files
+db = None
+if settings["sqlite_index"]:
+    import storyworld_db
+    db = storyworld_db.get_db()
+
+watcher = None
+if settings["watch_files"]:
+    # Changed files are applied in the background and open sessions rerun
+    import storyworld_watch
+    watcher = storyworld_watch.get_watcher(world, db)
+    storyworld_watch.auto_refresh(watcher)
+else:
+    # Folders are re-checked on disk the first time this run touches them
+    world.invalidate()
+    if db:
+        with profiler.span("load.db_sync"):
+            db.sync()
 
 def load_json_files(folder):
-    items = {}
-    if not os.path.exists(folder):
-        return items
-    for filename in os.listdir(folder):
-        if filename.endswith(".json"):
-            filepath = os.path.join(folder, filename)
-            with open(filepath, "r", encoding="utf-8") as f:
-                try:
-                    items[filename] = json.load(f)
-                except Exception as e:
-                    items[filename] = {"error": str(e)}
-    return items
+    """Load all JSON files in folder, re-parsing only files that changed"""
+    with profiler.span(f"load.{folder}"):
+        return world.items(folder)
 
 def validate_against_schema(data, schema_type):
     """Validate data against the appropriate schema"""
-    if schema_type not in schemas:
-        return True, "No schema available for validation"
-
-    try:
-        validate(instance=data, schema=schemas[schema_type])
-        return True, "✅ Valid schema"
-    except ValidationError as e:
-        return False, f"❌ Schema validation error: {e.message}"
+    with profiler.span(f"validate.{schema_type}"):
+        return get_schemas().validate(data, schema_type)
 
 def display_character_details(char_data):
     """Display character data in a more structured way"""
+    char = storyworld_models.as_model(CHAR_FOLDER, char_data)
     cols = st.columns(2)
 
     # Left column for basic info
     with cols[0]:
-        if "name" in char_data:
-            st.subheader(char_data["name"])
+        if char.name is not None:
+            st.subheader(char.name)
 
-        if "pronouns" in char_data:
-            st.write(f"**Pronouns:** {char_data['pronouns']}")
+        if char.pronouns is not None:
+            st.write(f"**Pronouns:** {char.pronouns}")
 
-        if "groups" in char_data:
+        if char.groups is not None:
             st.write("**Groups:**")
-            for group in char_data["groups"]:
+            for group in char.groups:
                 st.write(f"- {group}")
 
-        if "other_names" in char_data:
+        if char.other_names is not None:
             st.write("**Also known as:**")
-            for name in char_data["other_names"]:
+            for name in char.other_names:
                 st.write(f"- {name}")
 
-        if "personality" in char_data:
+        if char.personality is not None:
             st.write("**Personality:**")
-            st.write(char_data["personality"])
+            st.write(char.personality)
 
     # Right column for background and details
     with cols[1]:
-        if "background" in char_data:
+        if char.background is not None:
             st.write("**Background:**")
-            st.write(char_data["background"])
+            st.write(char.background)
 
-        if "physical_description" in char_data:
+        if char.physical_description is not None:
             st.write("**Physical Description:**")
-            st.write(char_data["physical_description"])
+            st.write(char.physical_description)
 
-        if "dialogue_style" in char_data:
+        if char.dialogue_style is not None:
             st.write("**Dialogue Style:**")
-            st.write(char_data["dialogue_style"])
+            st.write(char.dialogue_style)
 
     # Relationships section
-    if "relationships" in char_data:
+    if char.relationships is not None:
         st.write("### Relationships")
-        for person, relationship in char_data["relationships"].items():
+        for person, relationship in char.relationships.items():
             st.write(f"**{person}:** {relationship}")
 
     # Attributes section
-    if "static_attributes" in char_data:
+    attrs = char.static_attributes
+    if isinstance(attrs, storyworld_models.Model):
         st.write("### Static Attributes")
-        attrs = char_data["static_attributes"]
         attr_cols = st.columns(2)
 
         with attr_cols[0]:
-            if "birthdate" in attrs:
-                st.write(f"**Birthdate:** {attrs['birthdate']}")
-            if "role" in attrs:
-                st.write(f"**Role:** {attrs['role']}")
-            if "nationality" in attrs:
-                st.write(f"**Nationality:** {attrs['nationality']}")
+            if attrs.birthdate is not None:
+                st.write(f"**Birthdate:** {attrs.birthdate}")
+            if attrs.role is not None:
+                st.write(f"**Role:** {attrs.role}")
+            if attrs.nationality is not None:
+                st.write(f"**Nationality:** {attrs.nationality}")
 
         with attr_cols[1]:
-            if "augmentation_level" in attrs:
-                st.write(f"**Augmentation:** {attrs['augmentation_level']}")
-            if "economic_viability_rating" in attrs:
-                st.write(f"**Economic Rating:** {attrs['economic_viability_rating']}/10")
+            if attrs.augmentation_level is not None:
+                st.write(f"**Augmentation:** {attrs.augmentation_level}")
+            if attrs.economic_viability_rating is not None:
+                st.write(f"**Economic Rating:** {attrs.economic_viability_rating}/10")
 
     # Dynamic attributes (timeline) - FIXED to avoid nested expanders
-    if "dynamic_attributes" in char_data and char_data["dynamic_attributes"]:
+    if char.dynamic_attributes:
         st.write("### Character Timeline")
 
         # Using a table instead of expanders
-        for i, period in enumerate(char_data["dynamic_attributes"]):
-            st.write(f"**Time Period: {period.get('time', f'Period {i+1}')}**")
+        for i, period in enumerate(char.dynamic_attributes):
+            if not isinstance(period, storyworld_models.Model):
+                continue
+            st.write(f"**Time Period: {period.time if period.time is not None else f'Period {i+1}'}**")
 
-            if "personality" in period:
-                for trait, value in period["personality"].items():
+            if period.personality is not None:
+                for trait, value in period.personality.items():
                     st.write(f"- {trait}: {value}")
 
             # Add a divider between time periods
-            if i < len(char_data["dynamic_attributes"]) - 1:
+            if i < len(char.dynamic_attributes) - 1:
                 st.markdown("---")
 
 def display_location_details(loc_data):
     """Display location data in a structured way"""
-    if "region_name" in loc_data:
-        st.subheader(loc_data["region_name"])
+    loc = storyworld_models.as_model(LOCATION_FOLDER, loc_data)
+    if loc.region_name is not None:
+        st.subheader(loc.region_name)
 
     cols = st.columns(2)
 
     with cols[0]:
-        if "tone" in loc_data:
-            st.write(f"**Tone:** {loc_data['tone']}")
-        if "tech_level" in loc_data:
-            st.write(f"**Tech Level:** {loc_data['tech_level']}")
-        if "elevation" in loc_data:
-            st.write(f"**Elevation:** {loc_data['elevation']}")
+        if loc.tone is not None:
+            st.write(f"**Tone:** {loc.tone}")
+        if loc.tech_level is not None:
+            st.write(f"**Tech Level:** {loc.tech_level}")
+        if loc.elevation is not None:
+            st.write(f"**Elevation:** {loc.elevation}")
 
     with cols[1]:
-        if "problems" in loc_data:
+        if loc.problems is not None:
             st.write("**Problems:**")
-            for problem in loc_data["problems"]:
+            for problem in loc.problems:
                 st.write(f"- {problem}")
 
-    if "infrastructure" in loc_data:
+    if loc.infrastructure is not None:
         st.write("### Infrastructure")
-        infra_items = loc_data["infrastructure"]
-        st.write(", ".join(infra_items))
+        st.write(", ".join(loc.infrastructure))
 
-    if "youth_trends" in loc_data:
+    if loc.youth_trends is not None:
         st.write("### Youth Trends")
-        for trend in loc_data["youth_trends"]:
+        for trend in loc.youth_trends:
             st.write(f"- {trend}")
 
-    if "notes" in loc_data:
+    if loc.notes is not None:
         st.write("### Notes")
-        st.write(loc_data["notes"])
+        st.write(loc.notes)
+
+def display_world_rules(config):
+    """Display the effective world rules of a region, marking what the region overrides"""
+    import effective_world
+    st.write(f"### World Rules · {config.get('world_name', '')} {config.get('time_period', '')}")
+    overrides = set(config.get("overrides", []))
+    for section in ("global", "rules"):
+        for key, value in (config.get(section) or {}).items():
+            marker = " *(regional)*" if f"{section}.{key}" in overrides else ""
+            st.write(f"**{key.replace('_', ' ')}:** {effective_world.format_value(value)}{marker}")
+
+def display_dialogue(scene, key):
+    """Page through a scene's dialogue, reading only the lines shown"""
+    total = scene.dialogue_count
+    if not total:
+        st.info("No dialogue yet.")
+        return
+
+    page_size = settings["page_size"]
+    page_count = -(-total // page_size)
+    if page_count > 1:
+        page = st.number_input(f"Dialogue page (of {page_count})", min_value=1, max_value=page_count,
+                               value=1, step=1, key=f"{key}_dialogue_page")
+    else:
+        page = 1
+    start = (page - 1) * page_size
+    for entry in scene.iter_dialogue(start, start + page_size):
+        if "error" in entry:
+            st.warning(f"⚠️ Unreadable line: {entry['error']}")
+            continue
+        tone = f" _({entry['tone']})_" if entry.get("tone") else ""
+        st.markdown(f"**{entry.get('speaker', '?')}**{tone}: {entry.get('line', '')}")
+    st.caption(f"Lines {start + 1}–{min(start + page_size, total)} of {total}")
+
+def display_dialogue_appender(filepath):
+    """Append a line to a .jsonl scene without rewriting the file"""
+    added_key = f"appended:{filepath}"
+    if st.session_state.pop(added_key, False):
+        st.success("✅ Line added.")
+    with st.form(f"append:{filepath}", clear_on_submit=True):
+        col1, col2 = st.columns(2)
+        with col1:
+            speaker = st.text_input("Speaker")
+        with col2:
+            tone = st.text_input("Tone")
+        line = st.text_area("Line of dialogue", height=80)
+        if st.form_submit_button("➕ Add line") and speaker and line:
+            with profiler.span("save"):
+                scene_store.append_dialogue(filepath, [{"speaker": speaker, "line": line, "tone": tone}])
+            world.invalidate(SCENE_FOLDER)
+            # The dialogue above was rendered before the append; show it with the new line
+            st.session_state[added_key] = True
+            st.rerun()
 
 def display_json_editor(filename, data, folder, schema_type=None):
     if settings["validate_schema"] and schema_type:
@@ -198,8 +285,15 @@ def display_json_editor(filename, data, folder, schema_type=None):
         else:
             st.warning(message)
 
-    default_str = json.dumps(data, indent=settings["json_indent"], ensure_ascii=False)
-    edited = st.text_area("Edit JSON", default_str, height=400)
+    filepath = os.path.join(folder, filename)
+    editor_key = f"editor:{filepath}"
+    version_key = f"editor_version:{filepath}"
+    if version_key not in st.session_state:
+        # Remember which version of the file the edits start from
+        st.session_state[version_key] = storyworld_cache.get_cache().version(filepath)
+
+    default_str = json.dumps(storyworld_models.to_json(data), indent=settings["json_indent"], ensure_ascii=False)
+    edited = st.text_area("Edit JSON", default_str, height=400, key=editor_key)
 
     col1, col2 = st.columns(2)
     with col1:
@@ -214,74 +308,172 @@ def display_json_editor(filename, data, folder, schema_type=None):
                         st.error(f"Cannot save: {message}")
                         return
 
-                with open(os.path.join(folder, filename), "w", encoding="utf-8") as f:
-                    json.dump(new_data, f, indent=2, ensure_ascii=False)
+                # Atomic write; fails if someone else saved the file meanwhile
+                with profiler.span("save"):
+                    st.session_state[version_key] = storyworld_io.save_json(
+                        filepath, new_data, expected_version=st.session_state[version_key], world=world
+                    )
                 st.success(f"✅ {filename} updated.")
             except json.JSONDecodeError as e:
                 st.error(f"❌ Invalid JSON: {e}")
+            except storyworld_io.SaveConflictError:
+                st.error(f"❌ {filename} was changed by someone else after you opened it. "
+                         "Copy your edits, then reload to see the current version.")
+
+        if st.button("🔄 Reload from disk", key=f"reload:{filepath}"):
+            del st.session_state[editor_key]
+            del st.session_state[version_key]
+            st.rerun()
 
     with col2:
         if settings["show_download"]:
             st.download_button("⬇️ Download JSON", default_str, file_name=filename, mime="application/json")
 
+def facet_filter(label, facet, key):
+    """Selectbox over (value, count) pairs from the index; None means no filter"""
+    counts = dict(facet)
+    return st.selectbox(label, [None] + list(counts), key=key,
+                        format_func=lambda v: "All" if v is None else f"{v} ({counts[v]})")
+
+def pick_from_page(items, key, label_field):
+    """Show one page of items as a compact list and return the opened filename.
+
+    Only the current page is sent to the browser, and the caller renders the
+    full view for the single item the user opens, so the page stays the same
+    size no matter how many files the world has.
+    """
+    if not items:
+        st.info("No files yet.")
+        return None
+
+    filenames = sorted(items)
+    page_size = max(1, int(settings["page_size"]))
+    page_count = (len(filenames) + page_size - 1) // page_size
+
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                               value=1, step=1, key=f"{key}_page")
+    else:
+        page = 1
+    start = (page - 1) * page_size
+    page_filenames = filenames[start:start + page_size]
+    st.caption(f"Showing {start + 1}–{start + len(page_filenames)} of {len(filenames)}")
+
+    def label(filename):
+        data = items[filename]
+        if "error" in data:
+            return f"⚠️ {filename}"
+        return f"{data.get(label_field, filename)} · {filename}"
+
+    return st.radio("Open", page_filenames, index=None, format_func=label,
+                    key=f"{key}_open", label_visibility="collapsed")
+
 # === MAIN VIEW ===
 
+profiler.push(f"render.{section}")
+
 if section == "Characters":
     st.header("🧬 Character Files")
 
     # Add a new character option
     if st.button("➕ Create New Character"):
         # Template based on character schema
-        char_template = {
-            "name": "New Character",
-            "pronouns": "they/them",
-            "groups": [],
-            "other_names": [],
-            "personality": "",
-            "background": "",
-            "physical_description": "",
-            "dialogue_style": "",
-            "relationships": {},
-            "static_attributes": {
-                "birthdate": "",
-                "role": "",
-                "nationality": "",
-                "augmentation_level": "",
-                "economic_viability_rating": 5
-            },
-            "dynamic_attributes": []
-        }
+        char_template = copy.deepcopy(storyworld.CHARACTER_TEMPLATE)
 
-        new_filename = "new_character.json"
-        with open(os.path.join(CHAR_FOLDER, new_filename), "w", encoding="utf-8") as f:
-            json.dump(char_template, f, indent=2, ensure_ascii=False)
+        new_filename = storyworld.NEW_CHARACTER_FILE
+        storyworld_io.save_json(os.path.join(CHAR_FOLDER, new_filename), char_template, world=world)
         st.success(f"✅ Created {new_filename}")
 
     characters = load_json_files(CHAR_FOLDER)
-    for filename, char_data in characters.items():
-        with st.expander(filename):
-            if "error" in char_data:
-                st.error(f"❌ {char_data['error']}")
-                continue
+    conflict_index = name_conflicts.get_index()
+    conflict_index.sync(name_conflicts.json_characters(characters))
+
+    # Names used in scenes and relationships, resolved to character ids
+    resolver = cross_references.get_resolver()
+    with profiler.span("cross_references"):
+        references = resolver.report(world)
+    problems = references["dangling"] + references["ambiguous"]
+    if problems:
+        with st.expander(f"🔗 {len(problems)} unresolved references in scenes and relationships"):
+            for reference in problems:
+                st.write(cross_references.format_reference(reference, resolver.index))
+
+    shown = characters
+    if db:
+        facets = db.facets()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            group = facet_filter("Group", facets["group"], "filter_group")
+        with col2:
+            role = facet_filter("Role", facets["role"], "filter_role")
+        with col3:
+            nationality = facet_filter("Nationality", facets["nationality"], "filter_nationality")
+        if group or role or nationality:
+            matches = {os.path.basename(row["file"]) for row in db.characters(group, role, nationality)}
+            shown = {f: data for f, data in characters.items() if f in matches}
+
+    filename = pick_from_page(shown, "characters", "name")
+    if filename:
+        char_data = characters[filename]
+        st.subheader(f"📄 {filename}")
+        if "error" in char_data:
+            st.error(f"❌ {char_data['error']}")
+        else:
+            for conflict in conflict_index.conflicts_for(filename):
+                st.warning(name_conflicts.format_conflict(conflict))
 
             tab1, tab2 = st.tabs(["Character View", "Raw JSON"])
 
             with tab1:
                 display_character_details(char_data)
+                if db and char_data.get("name"):
+                    scenes = db.scenes_for_character(char_data["name"])
+                    if scenes:
+                        st.write("### Scenes")
+                        for scene in scenes:
+                            st.write(f"🎭 {scene['scene_id']} · {scene['title']} · {scene['location']}")
+
+                char_refs = references["by_character"].get(storyworld.character_id(filename, char_data), [])
+                if char_refs:
+                    st.write("### Referenced In")
+                    for reference in char_refs:
+                        status = " (ambiguous)" if reference["status"] == cross_references.AMBIGUOUS else ""
+                        st.write(f"🔗 {reference['folder']}/{reference['file']} · {reference['field']} · "
+                                 f"\"{reference['name']}\"{status}")
 
             with tab2:
-                st.json(char_data, expanded=False)
+                st.json(storyworld_models.to_json(char_data), expanded=False)
                 if settings["enable_editing"]:
                     display_json_editor(filename, char_data, CHAR_FOLDER, "character")
 
 elif section == "Scenes":
     st.header("🎭 Scenes")
+    # Headers only - dialogue is read from disk a page at a time
     scenes = load_json_files(SCENE_FOLDER)
-    for filename, scene_data in scenes.items():
-        with st.expander(filename):
-            st.json(scene_data, expanded=False)
-            if settings["enable_editing"]:
-                display_json_editor(filename, scene_data, SCENE_FOLDER)
+    filename = pick_from_page(scenes, "scenes", "title")
+    if filename:
+        scene_data = scenes[filename]
+        filepath = os.path.join(SCENE_FOLDER, filename)
+        st.subheader(f"📄 {filename}")
+        if "error" in scene_data:
+            st.error(f"❌ {scene_data['error']}")
+        else:
+            tab1, tab2 = st.tabs(["Dialogue", "Raw JSON"])
+
+            with tab1:
+                st.json(dict(scene_data), expanded=False)
+                display_dialogue(scene_data, filename)
+                if settings["enable_editing"] and filename.endswith(scene_store.LINES_EXT):
+                    display_dialogue_appender(filepath)
+
+            with tab2:
+                if filename.endswith(scene_store.LINES_EXT):
+                    st.info("Line-based scene: add dialogue in the Dialogue tab.")
+                else:
+                    full_scene = storyworld_cache.get_cache().load_file(filepath)
+                    st.json(full_scene, expanded=False)
+                    if settings["enable_editing"]:
+                        display_json_editor(filename, full_scene, SCENE_FOLDER)
 
 elif section == "Locations":
     st.header("🗺️ Locations")
@@ -301,23 +493,127 @@ elif section == "Locations":
         }
 
         new_filename = "new_location.json"
-        with open(os.path.join(LOCATION_FOLDER, new_filename), "w", encoding="utf-8") as f:
-            json.dump(loc_template, f, indent=2, ensure_ascii=False)
+        storyworld_io.save_json(os.path.join(LOCATION_FOLDER, new_filename), loc_template, world=world)
         st.success(f"✅ Created {new_filename}")
 
     locs = load_json_files(LOCATION_FOLDER)
-    for filename, loc_data in locs.items():
-        with st.expander(filename):
-            if "error" in loc_data:
-                st.error(f"❌ {loc_data['error']}")
-                continue
-
+    if db:
+        tech_level = facet_filter("Tech level", db.facets()["tech_level"], "filter_tech_level")
+        if tech_level:
+            matches = {os.path.basename(row["file"]) for row in db.locations(tech_level)}
+            locs = {f: data for f, data in locs.items() if f in matches}
+    filename = pick_from_page(locs, "locations", "region_name")
+    if filename:
+        loc_data = locs[filename]
+        st.subheader(f"📄 {filename}")
+        if "error" in loc_data:
+            st.error(f"❌ {loc_data['error']}")
+        else:
             tab1, tab2 = st.tabs(["Location View", "Raw JSON"])
 
             with tab1:
                 display_location_details(loc_data)
+                if db and loc_data.get("region_name"):
+                    for cast in db.location_cast(loc_data["region_name"]):
+                        st.write(f"**Seen here ({cast['scenes']} scenes):** {', '.join(cast['characters'])}")
+                if loc_data.get("region_name"):
+                    # World defaults merged with this region, memoized until either file changes
+                    import effective_world
+                    display_world_rules(effective_world.get_resolver(world).effective(loc_data["region_name"]))
 
             with tab2:
-                st.json(loc_data, expanded=False)
+                st.json(storyworld_models.to_json(loc_data), expanded=False)
                 if settings["enable_editing"]:
-                    display_json_editor(filename, loc_data, LOCATION_FOLDER, "region")
\ No newline at end of file
+                    display_json_editor(filename, loc_data, LOCATION_FOLDER, "region")
+
+elif section == "Relationships":
+    st.header("🕸️ Relationships")
+
+    # Rebuilt only when a character or relationship file changed
+    import relationship_graph
+    graph = relationship_graph.get_graph(world)
+    names = graph.names()
+    if not names:
+        st.info("No relationships found.")
+    else:
+        name = st.selectbox("Character", names)
+        time_label = st.text_input("At time (e.g. 2030) — leave empty for the latest state:")
+
+        for other, edge in sorted(graph.neighbours(name), key=lambda n: n[0]):
+            state = edge.state_at(time_label) if time_label else edge.latest_state()
+            st.write(f"**{other}**" + (f" · {edge.static_traits['type']}" if edge.static_traits.get("type") else ""))
+            for who, description in edge.descriptions.items():
+                st.caption(f"{who}: {description}")
+            if state:
+                when, values = state
+                st.caption(f"🕒 {when}: " + ", ".join(f"{k} {v}" for k, v in values.items()))
+
+        st.subheader("🔗 Connection")
+        col1, col2 = st.columns(2)
+        with col1:
+            start = st.selectbox("From", names, key="path_from")
+        with col2:
+            goal = st.selectbox("To", names, key="path_to")
+        path = graph.shortest_path(start, goal)
+        if path:
+            st.write(" → ".join(path))
+        else:
+            st.info("No chain of relationships connects them.")
+
+        groups = graph.groups()
+        if groups:
+            st.subheader("👥 Close circles")
+            group = st.selectbox("Group", groups)
+            cliques = graph.cliques(group)
+            if not cliques:
+                st.info("No three or more members of this group are all related to each other.")
+            for clique in cliques:
+                st.write("• " + ", ".join(clique))
+
+elif section == "Timeline":
+    st.header("🕒 Timeline")
+
+    # Rebuilt only when a character or relationship file changed
+    import timeline
+    story_timeline = timeline.get_timeline(world)
+    if not len(story_timeline):
+        st.info("No dynamic attributes or relationship states found.")
+    else:
+        labels = story_timeline.labels
+        moment = st.select_slider("State at", options=labels, value=labels[-1])
+        for entity, state in sorted(story_timeline.state_at(moment).items()):
+            st.write(f"**{entity}**")
+            st.caption(", ".join(f"{trait}: {value}" for trait, value in state.items()))
+
+        st.subheader("🔀 What changed")
+        start, end = st.select_slider("Between", options=labels, value=(labels[0], labels[-1]))
+        changes = story_timeline.changes_between(start, end)
+        if not changes:
+            st.info("Nothing changed in this period.")
+        for when, entity, trait, old, new in changes:
+            st.write(f"🕒 {when} · **{entity}** · {trait}: {old if old is not None else '—'} → {new}")
+
+elif section == "Search":
+    st.header("🔎 Search")
+
+    # Only files the cache re-parsed since the last search are re-indexed
+    index = search_index.get_index()
+    index.sync_folder(CHAR_FOLDER, "character", load_json_files(CHAR_FOLDER))
+    index.sync_folder(SCENE_FOLDER, "scene", load_json_files(SCENE_FOLDER))
+    index.sync_folder(LOCATION_FOLDER, "location", load_json_files(LOCATION_FOLDER))
+
+    query = st.text_input("Search names, groups, personalities, backgrounds, scenes and dialogue:")
+    if query:
+        results = index.search(query, limit=settings["page_size"])
+        if not results:
+            st.info("No matches.")
+        icons = {"character": "🧬", "scene": "🎭", "location": "🗺️"}
+        for doc_id, score, doc in results:
+            st.write(f"{icons[doc['kind']]} **{doc['title']}** · `{doc_id}`")
+
+profiler.pop()
+
+show_cache_stats()
+if settings["profiling"]:
+    profiler.end_run()
+    profiling.show_panel(profiler)
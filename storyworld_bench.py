@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Storyworld Benchmarks
+=====================
+
+Generates a synthetic, schema-valid storyworld of a given size and times the
+code paths the apps actually run on it:
+
+    python storyworld_bench.py                      # 1k entities
+    python storyworld_bench.py --scale 10000 --dialogue 500
+    python storyworld_bench.py --scale 100000 --keep /tmp/world100k
+
+The generator is seeded, so the same --scale/--seed always produces the same
+world: characters (with colliding first names and aliases), locations,
+scenes with long dialogue, relationships and a story bible CSV.
+
+Results are written to bench_results/bench-<scale>-<timestamp>.json and
+compared with the previous run of the same scale, flagging anything more
+than REGRESSION_THRESHOLD slower.
+
+    python storyworld_bench.py --startup
+
+times the apps' cold start instead: each app's first script run in a fresh
+interpreter (time to first paint), against STARTUP_TARGET.
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import glob
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+import storyworld
+import bible_sync
+import storyworld_cache
+import schema_registry
+import scene_store
+from story_bible import load_story_bible_file
+from name_conflicts import ConflictIndex, bible_characters
+from scene_builder import build_scene_characters, generate_scene_output, write_batch
+
+RESULTS_FOLDER = "bench_results"
+REGRESSION_THRESHOLD = 0.20  # flag results more than 20% slower than last time
+BIBLE_FILE = "story_bible.csv"
+
+STARTUP_TARGET = 0.5  # seconds for an app's first script run in a fresh process
+STARTUP_APPS = ["storyworld_app.py", "character_selector.py"]
+HEAVY_MODULES = ["pandas", "jsonschema", "sqlite3"]
+
+# Runs in a fresh interpreter: streamlit import, then the app's first and second run
+STARTUP_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+painted = time.perf_counter()
+app.run()
+print(json.dumps({
+    "streamlit_import": imported - start,
+    "first_paint": painted - imported,
+    "rerun": time.perf_counter() - painted,
+    "heavy_imports": [name for name in sys.argv[2:] if name in sys.modules],
+    "exceptions": [str(e.value) for e in app.exception],
+}))
+"""
+
+# Share of the entities of each kind
+MIX = {"characters": 0.4, "locations": 0.1, "scenes": 0.3, "relationships": 0.2}
+
+FIRST_NAMES = ["Ann", "Mira", "Saga", "Elin", "Freja", "Julia", "Mary", "Maya", "Erik", "Henrik",
+               "Astrid", "Noor", "Jonas", "Linnea", "Aline", "Kwame", "Ines", "Tove", "Oskar", "Yara"]
+SYLLABLES = ["berg", "lund", "holm", "ström", "vik", "nyi", "ra", "ba", "ho", "ng", "uyen",
+             "kvist", "dahl", "sson", "gren", "mark", "ki", "vu", "ta", "sand"]
+WORDS = ["granite", "signal", "lake", "protocol", "mycelium", "shelter", "ghost", "stream", "ledger",
+         "pedal", "voltage", "archive", "quiet", "tactical", "ember", "drift", "compass", "salt",
+         "witness", "harbor", "static", "thread", "orbit", "cinder", "marrow", "lantern"]
+GROUPS = ["Ghost Trainers Collective", "Mycelium Guild", "Kivu Data Outpost",
+          "Lake Kivu Defense Collective", "Post-Market Cryptohumans", "Ängby Cycling Club"]
+ROLES = ["Coach", "Engineer", "Streamer", "Economist", "Builder", "Medic", "Smuggler", "Archivist"]
+NATIONALITIES = ["Swedish", "Rwandan", "Congolese", "Vietnamese-Swedish", "Burundian", "Norwegian"]
+TONES = ["playful", "curious", "anxious", "flat", "warm", "sharp", "tired", "defiant"]
+
+
+# === GENERATOR ===
+
+def _sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _surname(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(2)).capitalize()
+
+
+def make_character(rng, i, names):
+    """One synthetic character (related to some of names) and its story bible row."""
+    name = f"{rng.choice(FIRST_NAMES)} {_surname(rng)}"
+    aliases = [f"{rng.choice(WORDS).capitalize()} {name.split()[0][0]}"] if rng.random() < 0.3 else []
+    groups = rng.sample(GROUPS, rng.randint(1, 2))
+    static = {
+        "birthdate": (datetime(1970, 1, 1) + timedelta(days=rng.randint(0, 15000))).strftime("%Y-%m-%d"),
+        "role": rng.choice(ROLES),
+        "nationality": rng.choice(NATIONALITIES),
+        "augmentation_level": rng.choice(["none", "light", "heavy"]),
+        "economic_viability_rating": rng.randint(0, 10),
+    }
+    data = {
+        "id": f"char_{i:06d}",
+        "name": name,
+        "pronouns": rng.choice(["she/her", "he/him", "they/them"]),
+        "groups": groups,
+        "other_names": aliases,
+        "personality": _sentence(rng, 12),
+        "background": _sentence(rng, 40),
+        "physical_description": _sentence(rng, 20),
+        "dialogue_style": _sentence(rng, 10),
+        "relationships": {},
+        "static_attributes": static,
+        "dynamic_attributes": [
+            {"time": str(2027 + t), "personality": {rng.choice(WORDS): rng.choice(WORDS) for _ in range(3)}}
+            for t in range(rng.randint(0, 3))
+        ],
+    }
+    if names:
+        for other in rng.sample(names, min(len(names), rng.randint(0, 3))):
+            data["relationships"][other] = _sentence(rng, 10)
+    bible_row = {
+        "Name": name, "Role": static["role"], "Pronouns": data["pronouns"],
+        "Groups": groups[0], "Other Names": ", ".join(aliases),
+        "Personality": data["personality"], "Background": data["background"],
+        "Dialogue Style": data["dialogue_style"],
+    }
+    return data, bible_row
+
+
+def generate_world(root, scale=1000, seed=42, dialogue=200):
+    """Write a synthetic storyworld of `scale` entities under root; returns counts."""
+    rng = random.Random(seed)
+    counts = {kind: max(1, int(scale * share)) for kind, share in MIX.items()}
+    for folder in [*MIX, "metadata"]:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    def write(folder, filename, data):
+        with open(os.path.join(root, folder, filename), "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    names = []
+    bible_rows = []
+    for i in range(counts["characters"]):
+        data, bible_row = make_character(rng, i, names)
+        write("characters", f"{data['id']}.json", data)
+        names.append(data["name"])
+        bible_rows.append(bible_row)
+
+    location_names = []
+    for i in range(counts["locations"]):
+        region_name = f"{_surname(rng)} {rng.choice(['Basin', 'Ridge', 'Harbor', 'District', 'Outpost'])}"
+        location_names.append(region_name)
+        write("locations", f"loc_{i:06d}.json", {
+            "region_name": region_name,
+            "tone": _sentence(rng, 4),
+            "tech_level": rng.choice(["low", "mid", "mid-high", "high"]),
+            "elevation": f"{rng.randint(0, 3000)} m",
+            "infrastructure": [_sentence(rng, 3) for _ in range(3)],
+            "problems": [_sentence(rng, 4) for _ in range(2)],
+            "youth_trends": [_sentence(rng, 3) for _ in range(2)],
+            "notes": _sentence(rng, 20),
+        })
+
+    for i in range(counts["scenes"]):
+        present = rng.sample(names, min(len(names), rng.randint(2, 4)))
+        write("scenes", f"{i:06d}_scene.json", {
+            "scene_id": f"{i:06d}",
+            "title": _sentence(rng, 4)[:-1],
+            "location": rng.choice(location_names),
+            "time": (datetime(2027, 1, 1) + timedelta(hours=i)).isoformat(),
+            "tags": rng.sample(WORDS, 2),
+            "characters_present": present,
+            "summary": _sentence(rng, 15),
+            "dialogue": [
+                {"speaker": rng.choice(present), "line": _sentence(rng, rng.randint(5, 20)),
+                 "tone": rng.choice(TONES)}
+                for _ in range(dialogue)
+            ],
+        })
+
+    for i in range(counts["relationships"]):
+        write("relationships", f"rel_{i:06d}.json", {"relationship": {
+            "between": rng.sample(names, 2),
+            "static_traits": {"type": rng.choice(["friendship", "rivalry", "mentorship"])},
+            "dynamic_states": [
+                {"time": str(2027 + t), "trust": round(rng.random(), 2),
+                 "tension": round(rng.random(), 2), "closeness": round(rng.random(), 2)}
+                for t in range(rng.randint(1, 4))
+            ],
+        }})
+
+    with open(os.path.join(root, BIBLE_FILE), "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(bible_rows[0]))
+        writer.writeheader()
+        writer.writerows(bible_rows)
+    return counts
+
+
+# === TIMING ===
+
+def timed(fn, repeat):
+    """Run fn repeat times; returns (timings in seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def summarize(timings, items=None):
+    summary = {
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+    if items:
+        summary["items"] = items
+        summary["per_item_us"] = summary["min"] / items * 1e6
+    return summary
+
+
+def run_benchmarks(root, repeat=3, scenes=1000, seed=42, schemas_folder=None):
+    """Time the apps' code paths on the world under root; returns {name: summary}."""
+    rng = random.Random(seed)
+    results = {}
+    folders = [storyworld.CHAR_FOLDER, storyworld.LOCATION_FOLDER, storyworld.SCENE_FOLDER]
+
+    # load_json_files: a fresh process (empty cache), then a rerun with nothing changed
+    def load_cold():
+        scene_store.clear_caches()
+        world = storyworld.Storyworld(root, cache=storyworld_cache.JsonFolderCache())
+        return world, sum(len(world.items(folder)) for folder in folders)
+    timings, (world, loaded) = timed(load_cold, repeat)
+    results["load_json_files.cold"] = summarize(timings, loaded)
+
+    def load_warm():
+        world.invalidate()
+        return sum(len(world.items(folder)) for folder in folders)
+    timings, _ = timed(load_warm, repeat)
+    results["load_json_files.warm"] = summarize(timings, loaded)
+
+    # validate_against_schema, as the explorer does for every file it shows
+    here = os.path.dirname(os.path.abspath(__file__))
+    registry = schema_registry.SchemaRegistry(schemas_folder or os.path.join(here, schema_registry.SCHEMAS_FOLDER))
+    registry.refresh()
+    characters = list(world.items(storyworld.CHAR_FOLDER).values())
+    locations = list(world.items(storyworld.LOCATION_FOLDER).values())
+
+    def validate_all():
+        valid = sum(registry.validate(data, "character")[0] for data in characters)
+        return valid + sum(registry.validate(data, "region")[0] for data in locations)
+    timings, valid = timed(validate_all, repeat)
+    results["validate_against_schema"] = summarize(timings, len(characters) + len(locations))
+    results["validate_against_schema"]["valid"] = valid
+
+    # Story bible: parse, then analyze_name_conflicts on a fresh index
+    bible_path = os.path.join(root, BIBLE_FILE)
+    timings, df = timed(lambda: load_story_bible_file(bible_path), 1)
+    results["load_story_bible"] = summarize(timings, len(df))
+
+    def analyze_name_conflicts():
+        index = ConflictIndex()
+        index.sync(bible_characters(df))
+        return index.conflicts()
+    timings, conflicts = timed(analyze_name_conflicts, repeat)
+    results["analyze_name_conflicts"] = summarize(timings, len(df))
+    results["analyze_name_conflicts"]["conflicts"] = len(conflicts)
+
+    # Scene building and output for random casts of 2-6 characters
+    name_index = df.dropna(subset=["Name"]).drop_duplicates("Name").set_index("Name", drop=False)
+    all_names = list(name_index.index)
+    casts = [rng.sample(all_names, min(len(all_names), rng.randint(2, 6))) for _ in range(scenes)]
+    timings, built = timed(lambda: [build_scene_characters(name_index, cast) for cast in casts], repeat)
+    results["build_scene"] = summarize(timings, scenes)
+
+    scene_data = [
+        {"group": "Any Group", "location": "Lake Kivu", "characters": cast, "concept": "They ride.",
+         "theme": "Drama", "conflicts": []}
+        for cast in built
+    ]
+    timings, _ = timed(lambda: [generate_scene_output(data) for data in scene_data], repeat)
+    results["generate_scene_output"] = summarize(timings, scenes)
+
+    timings, _ = timed(lambda: write_batch(scene_data, io.BytesIO(), "zip"), repeat)
+    results["write_batch.zip"] = summarize(timings, scenes)
+
+    # bible_sync on a copy, so a --keep world stays as generated
+    sync_root = tempfile.mkdtemp(prefix="bible_sync_")
+    try:
+        sync_csv = shutil.copy(bible_path, sync_root)
+        sync_folder = shutil.copytree(os.path.join(root, storyworld.CHAR_FOLDER),
+                                      os.path.join(sync_root, storyworld.CHAR_FOLDER))
+        state_file = os.path.join(sync_root, "state.pkl")
+
+        def sync():
+            return bible_sync.sync(sync_csv, sync_folder, prefer=bible_sync.CSV_SIDE, state_file=state_file)
+        timings, _ = timed(sync, 1)
+        results["bible_sync.initial"] = summarize(timings, len(df))
+        timings, _ = timed(sync, repeat)
+        results["bible_sync.unchanged"] = summarize(timings, len(df))
+
+        # One edited row: only its block is parsed and one file written
+        with open(sync_csv, "r", encoding="utf-8", newline="") as f:
+            lines = f.read().split("\n")
+        middle = len(lines) // 2
+        original = lines[middle]
+        timings = []
+        for i in range(repeat):
+            lines[middle] = original.replace(",", f",{i}", 1)
+            with open(sync_csv, "w", encoding="utf-8", newline="") as f:
+                f.write("\n".join(lines))
+            timings += timed(sync, 1)[0]
+        results["bible_sync.one_row"] = summarize(timings, len(df))
+    finally:
+        shutil.rmtree(sync_root, ignore_errors=True)
+    return results
+
+
+def run_startup(repeat=3):
+    """Time each app's cold start in fresh interpreters; returns {name: summary}."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    imports = []
+    for app in STARTUP_APPS:
+        runs = []
+        for _ in range(repeat):
+            probe = subprocess.run([sys.executable, "-c", STARTUP_PROBE, os.path.join(here, app), *HEAVY_MODULES],
+                                   cwd=here, capture_output=True, text=True, check=True)
+            runs.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+        if runs[-1]["exceptions"]:
+            print(f"⚠️  {app} raised: {runs[-1]['exceptions']}")
+
+        name = os.path.splitext(app)[0]
+        imports.extend(run["streamlit_import"] for run in runs)
+        results[f"{name}.first_paint"] = summarize([run["first_paint"] for run in runs])
+        results[f"{name}.first_paint"]["heavy_imports"] = runs[-1]["heavy_imports"]
+        results[f"{name}.rerun"] = summarize([run["rerun"] for run in runs])
+    results["streamlit_import"] = summarize(imports)
+    return results
+
+
+# === RESULTS ===
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(folder, scale):
+    paths = sorted(glob.glob(os.path.join(folder, f"bench-{scale}-*.json")))
+    if not paths:
+        return None
+    with open(paths[-1], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_report(report, previous=None):
+    print(f"\n📊 Scale {report['meta']['scale']} · {report['meta']['counts']}")
+    old = (previous or {}).get("results", {})
+    for name, summary in report["results"].items():
+        line = f"   {name:<34} {summary['min'] * 1000:>10.1f} ms"
+        if "per_item_us" in summary:
+            line += f"  ({summary['per_item_us']:.1f} µs/item)"
+        if name.endswith(".first_paint"):
+            line += f"  {'✅' if summary['min'] <= STARTUP_TARGET else '⚠️ '} target {STARTUP_TARGET * 1000:.0f} ms"
+            if summary["heavy_imports"]:
+                line += f" · imported {', '.join(summary['heavy_imports'])}"
+        if name in old:
+            change = summary["min"] / old[name]["min"] - 1
+            flag = "⚠️ " if change > REGRESSION_THRESHOLD else ""
+            line += f"  {flag}{change:+.0%} vs {previous['meta'].get('commit') or 'previous run'}"
+        print(line)
+
+
+def run_meta():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def save_report(report, output=None):
+    """Print report against the previous run of the same scale, then save it."""
+    scale = report["meta"]["scale"]
+    print_report(report, previous_result(RESULTS_FOLDER, scale))
+
+    output = output or os.path.join(
+        RESULTS_FOLDER, f"bench-{scale}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the storyworld tools on a synthetic world.")
+    parser.add_argument("--scale", type=int, default=1000, help="Number of entities (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="Generator seed (default: 42)")
+    parser.add_argument("--dialogue", type=int, default=200, help="Dialogue lines per scene (default: 200)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (default: 3)")
+    parser.add_argument("--scenes", type=int, default=1000, help="Scenes to build and render (default: 1000)")
+    parser.add_argument("--keep", metavar="DIR", help="Generate into DIR and keep it (reused if it exists)")
+    parser.add_argument("--output", help=f"Result file (default: {RESULTS_FOLDER}/bench-<scale>-<time>.json)")
+    parser.add_argument("--startup", action="store_true", help="Time the apps' cold start instead")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return save_report({
+            "meta": {"scale": "startup", "counts": {"apps": len(STARTUP_APPS)}, **run_meta()},
+            "results": run_startup(args.repeat),
+        }, args.output)
+
+    root = args.keep or tempfile.mkdtemp(prefix="storyworld-bench-")
+    try:
+        start = time.perf_counter()
+        if args.keep and os.path.exists(os.path.join(root, BIBLE_FILE)):
+            print(f"♻️  Reusing generated world in {root}")
+            counts = {kind: len(os.listdir(os.path.join(root, kind))) for kind in MIX}
+        else:
+            print(f"🏗️  Generating {args.scale} entities in {root}...")
+            counts = generate_world(root, args.scale, args.seed, args.dialogue)
+        generate_seconds = time.perf_counter() - start
+
+        results = run_benchmarks(root, args.repeat, args.scenes, args.seed)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return save_report({
+        "meta": {
+            "scale": args.scale,
+            "seed": args.seed,
+            "dialogue": args.dialogue,
+            "counts": counts,
+            "generate_seconds": generate_seconds,
+            **run_meta(),
+        },
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
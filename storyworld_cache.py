@@ -0,0 +1,168 @@
+"""
+Storyworld JSON Cache
+=====================
+
+Process-wide cache for the JSON folders (characters/, scenes/, locations/...).
+
+Streamlit re-runs the whole app script on every interaction, but imported
+modules stay loaded, so this cache survives between reruns and sessions.
+Each file is keyed by path, mtime and size: only files that changed since
+the last load are parsed again, deleted files are dropped, and hit/miss
+counters show whether the cache is doing its job.
+
+Cached data is shared between reruns - treat it as read-only. With
+use_compact_models(), characters and locations are kept as the compact
+storyworld_models objects instead of dicts.
+"""
+
+import os
+import json
+import threading
+
+
+class JsonFolderCache:
+    """Cache of parsed JSON files, keyed by path, mtime and size."""
+
+    def __init__(self, transform=None):
+        self._entries = {}  # filepath -> (mtime_ns, size, data)
+        self.transform = transform  # (filepath, parsed data) -> data to keep
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load_folder(self, folder):
+        """Return {filename: data} for every .json file in folder.
+
+        Files that fail to parse are returned as {"error": message},
+        just like the original loader did.
+        """
+        items = {}
+        seen = set()
+        # Normalized so "./characters/x.json" and "characters/x.json" share an entry
+        folder = os.path.normpath(folder)
+
+        if os.path.exists(folder):
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    items[entry.name] = self._load_entry(entry.path, entry.stat())
+                    seen.add(entry.path)
+
+        self._drop_missing(folder, seen)
+        return items
+
+    def load_file(self, filepath):
+        """Return the parsed data of a single file, using the cache."""
+        filepath = os.path.normpath(filepath)
+        return self._load_entry(filepath, os.stat(filepath))
+
+    def _load_entry(self, filepath, stat):
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(filepath)
+            if cached is not None and cached[:2] == key:
+                self.hits += 1
+                return cached[2]
+
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            data = {"error": str(e)}
+        else:
+            if self.transform is not None:
+                data = self.transform(filepath, data)
+
+        with self._lock:
+            self._entries[filepath] = (key[0], key[1], data)
+            self.misses += 1
+        return data
+
+    def _drop_missing(self, folder, seen):
+        prefix = os.path.join(folder, "")
+        with self._lock:
+            stale = [
+                path for path in self._entries
+                if path.startswith(prefix) and path not in seen
+            ]
+            for path in stale:
+                del self._entries[path]
+            self.evictions += len(stale)
+
+    def version(self, filepath):
+        """(mtime_ns, size) of the cached copy of filepath, or None."""
+        filepath = os.path.normpath(filepath)
+        with self._lock:
+            cached = self._entries.get(filepath)
+        return cached[:2] if cached is not None else None
+
+    def peek(self, filepath, version):
+        """Cached data for filepath if it is at version, else None (no disk access)."""
+        filepath = os.path.normpath(filepath)
+        with self._lock:
+            cached = self._entries.get(filepath)
+        if cached is not None and cached[:2] == tuple(version):
+            return cached[2]
+        return None
+
+    def put(self, filepath, data, version):
+        """Store data we just wrote ourselves, so it isn't parsed again; returns what was stored."""
+        filepath = os.path.normpath(filepath)
+        if self.transform is not None:
+            data = self.transform(filepath, data)
+        with self._lock:
+            self._entries[filepath] = (version[0], version[1], data)
+        return data
+
+    def invalidate(self, filepath=None):
+        """Forget one file, or everything when no path is given."""
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.normpath(filepath), None)
+
+    def stats(self):
+        """Hit/miss counters and the number of cached files."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+
+# Shared by every Streamlit session running in this process
+_cache = JsonFolderCache()
+
+
+def load_json_files(folder):
+    """Load every JSON file in folder through the process-wide cache."""
+    return _cache.load_folder(folder)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def get_cache():
+    return _cache
+
+
+def use_compact_models(enabled=True):
+    """Keep characters and locations of the shared cache as storyworld_models objects.
+
+    Returns True if this changed the setting (everything is re-read then).
+    """
+    transform = None
+    if enabled:
+        import storyworld_models
+        transform = storyworld_models.compact
+    if _cache.transform is transform:
+        return False
+    _cache.transform = transform
+    _cache.invalidate()
+    return True
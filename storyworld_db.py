@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Storyworld SQLite Index
+=======================
+
+Optional SQLite mirror of the JSON folders and the story bible CSV, for
+views that filter, join and count instead of scanning every parsed file:
+
+    db = get_db()
+    db.sync()                                   # only re-reads changed files
+    db.characters(group="Ghost Trainers Collective", role="Coach")
+    db.scenes_for_character("Coach V")          # aliases resolve to the character
+    db.location_cast("Ann's apartment")         # who appears in scenes there
+    db.facets()                                 # counts per group/role/...
+    db.search("granite determination")          # FTS5 full-text search
+
+The JSON files stay the source of truth: the database lives in
+.storyworld_cache/storyworld.db, can be deleted at any time, and is kept in
+sync by file mtime and size - unchanged files are never re-read. It runs in
+WAL mode so any number of sessions (or processes) can read while one syncs.
+
+Switch it on in the explorer with "sqlite_index": true in
+streamlit_app_settings.json, or rebuild it by hand:
+
+    python storyworld_db.py             # sync and print what changed
+    python storyworld_db.py --rebuild   # start from an empty database
+"""
+
+import os
+import sys
+import glob
+import fnmatch
+import sqlite3
+import argparse
+import threading
+from collections.abc import Mapping
+
+import app_settings
+import storyworld_cache
+import scene_store
+from search_index import fold
+
+DB_FILE = os.path.join(".storyworld_cache", "storyworld.db")
+BIBLE_PATTERN = "*story_bible*.csv"
+
+# Folder -> kind of entity stored in it
+FOLDER_KINDS = {
+    "characters": "character",
+    "locations": "location",
+    "scenes": "scene",
+    "relationships": "relationship",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS characters (
+    file TEXT PRIMARY KEY, id TEXT, name TEXT, role TEXT, nationality TEXT, pronouns TEXT, birthdate TEXT);
+CREATE INDEX IF NOT EXISTS characters_role ON characters(role);
+CREATE INDEX IF NOT EXISTS characters_nationality ON characters(nationality);
+CREATE TABLE IF NOT EXISTS character_names (file TEXT NOT NULL, name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS character_names_name ON character_names(name);
+CREATE INDEX IF NOT EXISTS character_names_file ON character_names(file);
+CREATE TABLE IF NOT EXISTS character_groups (file TEXT NOT NULL, grp TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS character_groups_grp ON character_groups(grp);
+CREATE INDEX IF NOT EXISTS character_groups_file ON character_groups(file);
+CREATE TABLE IF NOT EXISTS locations (
+    file TEXT PRIMARY KEY, region_name TEXT, folded TEXT, tone TEXT, tech_level TEXT, elevation TEXT);
+CREATE INDEX IF NOT EXISTS locations_tech_level ON locations(tech_level);
+CREATE TABLE IF NOT EXISTS scenes (
+    file TEXT PRIMARY KEY, scene_id TEXT, title TEXT, location TEXT, folded_location TEXT,
+    time TEXT, dialogue_count INTEGER);
+CREATE INDEX IF NOT EXISTS scenes_location ON scenes(folded_location);
+CREATE TABLE IF NOT EXISTS scene_characters (file TEXT NOT NULL, name TEXT NOT NULL, display TEXT);
+CREATE INDEX IF NOT EXISTS scene_characters_name ON scene_characters(name);
+CREATE INDEX IF NOT EXISTS scene_characters_file ON scene_characters(file);
+CREATE TABLE IF NOT EXISTS relationship_members (file TEXT NOT NULL, name TEXT NOT NULL, display TEXT);
+CREATE INDEX IF NOT EXISTS relationship_members_name ON relationship_members(name);
+CREATE INDEX IF NOT EXISTS relationship_members_file ON relationship_members(file);
+CREATE TABLE IF NOT EXISTS bible (
+    file TEXT NOT NULL, row INTEGER, name TEXT, other_names TEXT, groups TEXT, role TEXT, pronouns TEXT);
+CREATE INDEX IF NOT EXISTS bible_file ON bible(file);
+CREATE TABLE IF NOT EXISTS search_docs (
+    rowid INTEGER PRIMARY KEY, file TEXT NOT NULL, kind TEXT NOT NULL, ref TEXT, title TEXT);
+CREATE INDEX IF NOT EXISTS search_docs_file ON search_docs(file);
+"""
+
+FTS_SCHEMA = ("CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+              "title, body, tokenize='unicode61 remove_diacritics 2')")
+# Without FTS5 (rare SQLite builds) search falls back to LIKE over this table
+PLAIN_SEARCH_SCHEMA = "CREATE TABLE IF NOT EXISTS search (rowid INTEGER PRIMARY KEY, title TEXT, body TEXT)"
+
+# Tables with one or more rows per source file
+FILE_TABLES = ["characters", "character_names", "character_groups", "locations", "scenes",
+               "scene_characters", "relationship_members", "bible"]
+
+BIBLE_COLUMNS = {
+    "Name": "name", "Other Names": "other_names", "Groups": "groups",
+    "Role": "role", "Pronouns": "pronouns",
+}
+BIBLE_TEXT_COLUMNS = ["Name", "Other Names", "Groups", "Role", "Personality", "Background", "Dialogue Style"]
+
+
+def _text(value):
+    """Flatten a JSON value to searchable text."""
+    if isinstance(value, Mapping):
+        return " ".join(_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_text(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def _csv_list(value):
+    if not isinstance(value, str):
+        return []
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+class StoryworldDB:
+    """SQLite index of one storyworld; one connection per thread."""
+
+    def __init__(self, root=".", path=None, cache=None):
+        self.root = root
+        self.path = path or os.path.join(root, DB_FILE)
+        self.cache = cache or storyworld_cache.get_cache()
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self.fts = None
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        if self.fts is None:
+            try:
+                conn.execute(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                conn.execute(PLAIN_SEARCH_SCHEMA)
+                self.fts = False
+        self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    # --- Syncing ---
+
+    def _kind_of(self, rel):
+        """Kind of entity a relative path holds, or None if it isn't mirrored."""
+        folder, _, filename = rel.rpartition("/")
+        if not folder:
+            return "bible" if fnmatch.fnmatch(filename, BIBLE_PATTERN) else None
+        kind = FOLDER_KINDS.get(folder)
+        if kind == "scene":
+            return kind if scene_store.is_scene_file(filename) else None
+        return kind if kind and filename.endswith(".json") else None
+
+    def _source_files(self):
+        """Relative paths of everything the index mirrors."""
+        files = [os.path.basename(path) for path in glob.glob(os.path.join(self.root, BIBLE_PATTERN))]
+        for folder in FOLDER_KINDS:
+            folder_path = os.path.join(self.root, folder)
+            if os.path.isdir(folder_path):
+                files.extend(f"{folder}/{filename}" for filename in os.listdir(folder_path))
+        return [rel for rel in files if self._kind_of(rel)]
+
+    def sync(self, paths=None):
+        """Re-index files added, changed or deleted since the last sync.
+
+        paths limits the check to those relative paths (e.g. from a file
+        watcher); by default every file is checked. Returns the relative
+        paths that were (re-)indexed or dropped.
+        """
+        with self._sync_lock:
+            conn = self._connect()
+            known = {row["path"]: (row["mtime_ns"], row["size"])
+                     for row in conn.execute("SELECT path, mtime_ns, size FROM files")}
+            if paths is None:
+                sources = self._source_files()
+            else:
+                sources = [rel for rel in paths if self._kind_of(rel)
+                           and os.path.isfile(os.path.join(self.root, rel))]
+                known = {rel: known[rel] for rel in paths if rel in known}
+            changed = []
+            with conn:
+                for rel in sources:
+                    path = os.path.join(self.root, rel)
+                    stat = os.stat(path)
+                    version = (stat.st_mtime_ns, stat.st_size)
+                    if known.pop(rel, None) == version:
+                        continue
+                    self._delete(conn, rel)
+                    getattr(self, f"_index_{self._kind_of(rel)}")(conn, rel, path)
+                    conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (rel, *version))
+                    changed.append(rel)
+                for rel in known:
+                    self._delete(conn, rel)
+                    conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                    changed.append(rel)
+            return changed
+
+    def rebuild(self):
+        """Drop everything and index from scratch."""
+        with self._sync_lock:
+            conn = self._connect()
+            with conn:
+                for table in FILE_TABLES + ["files", "search_docs", "search"]:
+                    conn.execute(f"DELETE FROM {table}")
+        return self.sync()
+
+    def _delete(self, conn, rel):
+        for table in FILE_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE file = ?", (rel,))
+        conn.execute("DELETE FROM search WHERE rowid IN (SELECT rowid FROM search_docs WHERE file = ?)", (rel,))
+        conn.execute("DELETE FROM search_docs WHERE file = ?", (rel,))
+
+    def _add_search(self, conn, rel, kind, ref, title, body):
+        rowid = conn.execute("INSERT INTO search_docs (file, kind, ref, title) VALUES (?, ?, ?, ?)",
+                             (rel, kind, ref, title)).lastrowid
+        conn.execute("INSERT INTO search (rowid, title, body) VALUES (?, ?, ?)", (rowid, title, body))
+
+    def _index_character(self, conn, rel, path):
+        data = self.cache.load_file(path)
+        if "error" in data:
+            return
+        static = data.get("static_attributes") or {}
+        filename = os.path.basename(path)
+        name = data.get("name", "")
+        conn.execute("INSERT INTO characters VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            rel, data.get("id") or filename[:-len(".json")], name, static.get("role"),
+            static.get("nationality"), data.get("pronouns"), static.get("birthdate"),
+        ))
+        names = {fold(n) for n in [name, *(data.get("other_names") or [])] if n}
+        conn.executemany("INSERT INTO character_names VALUES (?, ?)", [(rel, n) for n in names])
+        conn.executemany("INSERT INTO character_groups VALUES (?, ?)",
+                         [(rel, g) for g in dict.fromkeys(data.get("groups") or [])])
+        self._add_search(conn, rel, "character", rel, name or filename, _text(data))
+
+    def _index_location(self, conn, rel, path):
+        data = self.cache.load_file(path)
+        if "error" in data:
+            return
+        region_name = data.get("region_name", "")
+        conn.execute("INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?)", (
+            rel, region_name, fold(region_name), data.get("tone"),
+            data.get("tech_level"), data.get("elevation"),
+        ))
+        self._add_search(conn, rel, "location", rel, region_name or os.path.basename(path), _text(data))
+
+    def _index_scene(self, conn, rel, path):
+        header = scene_store.read_header(path, self.cache)
+        if "error" in header:
+            return
+        location = header.get("location", "")
+        conn.execute("INSERT INTO scenes VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            rel, str(header.get("scene_id", "")), header.get("title"), location,
+            fold(location), header.get("time"), header.dialogue_count,
+        ))
+        conn.executemany("INSERT INTO scene_characters VALUES (?, ?, ?)",
+                         [(rel, fold(n), n) for n in dict.fromkeys(header.get("characters_present") or [])])
+        # Dialogue is streamed into the index, never held in full
+        lines = " ".join(entry.get("line", "") for entry in header.iter_dialogue() if isinstance(entry, dict))
+        self._add_search(conn, rel, "scene", rel, header.get("title") or os.path.basename(path),
+                         _text(dict(header)) + " " + lines)
+
+    def _index_relationship(self, conn, rel, path):
+        data = self.cache.load_file(path)
+        if "error" in data:
+            return
+        relationship = data.get("relationship", data)
+        conn.executemany("INSERT INTO relationship_members VALUES (?, ?, ?)",
+                         [(rel, fold(n), n) for n in dict.fromkeys(relationship.get("between") or [])])
+
+    def _index_bible(self, conn, rel, path):
+        from story_bible import load_story_bible_file
+        df = load_story_bible_file(path)
+        columns = [c for c in BIBLE_COLUMNS if c in df.columns]
+        text_columns = [c for c in BIBLE_TEXT_COLUMNS if c in df.columns]
+        for row, record in enumerate(df.to_dict("records")):
+            values = {BIBLE_COLUMNS[c]: record[c] if isinstance(record[c], str) else None for c in columns}
+            conn.execute("INSERT INTO bible VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                rel, row, values.get("name"), values.get("other_names"), values.get("groups"),
+                values.get("role"), values.get("pronouns"),
+            ))
+            if values.get("name"):
+                body = " ".join(record[c] for c in text_columns if isinstance(record[c], str))
+                self._add_search(conn, rel, "bible", str(row), values["name"], body)
+
+    # --- Queries ---
+
+    def characters(self, group=None, role=None, nationality=None):
+        """Character rows matching every given filter, by name."""
+        sql = "SELECT c.* FROM characters c"
+        where, params = [], []
+        if group:
+            sql += " JOIN character_groups g ON g.file = c.file"
+            where.append("g.grp = ?")
+            params.append(group)
+        if role:
+            where.append("c.role = ?")
+            params.append(role)
+        if nationality:
+            where.append("c.nationality = ?")
+            params.append(nationality)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql + " ORDER BY c.name", params)
+
+    def locations(self, tech_level=None):
+        if tech_level:
+            return self._query("SELECT * FROM locations WHERE tech_level = ? ORDER BY region_name", (tech_level,))
+        return self._query("SELECT * FROM locations ORDER BY region_name")
+
+    def facets(self):
+        """{field: [(value, count)]} for the filterable fields, most common first."""
+        queries = {
+            "group": "SELECT grp, COUNT(*) FROM character_groups GROUP BY grp",
+            "role": "SELECT role, COUNT(*) FROM characters WHERE role IS NOT NULL AND role != '' GROUP BY role",
+            "nationality": "SELECT nationality, COUNT(*) FROM characters "
+                           "WHERE nationality IS NOT NULL AND nationality != '' GROUP BY nationality",
+            "tech_level": "SELECT tech_level, COUNT(*) FROM locations "
+                          "WHERE tech_level IS NOT NULL AND tech_level != '' GROUP BY tech_level",
+        }
+        conn = self._connect()
+        return {
+            field: sorted((tuple(row) for row in conn.execute(sql)), key=lambda row: (-row[1], row[0]))
+            for field, sql in queries.items()
+        }
+
+    def _names_of(self, name):
+        """Folded name plus every name and alias of the characters it refers to."""
+        key = fold(name)
+        names = {key}
+        names.update(row["name"] for row in self._query(
+            "SELECT n2.name FROM character_names n1 JOIN character_names n2 ON n2.file = n1.file "
+            "WHERE n1.name = ?", (key,)))
+        return sorted(names)
+
+    def scenes_for_character(self, name):
+        """Scenes listing the character (by name or any alias) in characters_present."""
+        names = self._names_of(name)
+        marks = ", ".join("?" * len(names))
+        return self._query(
+            "SELECT DISTINCT s.* FROM scenes s JOIN scene_characters sc ON sc.file = s.file "
+            f"WHERE sc.name IN ({marks}) ORDER BY s.scene_id", names)
+
+    def relationships_of(self, name):
+        """Other members of the relationships the character is part of."""
+        names = self._names_of(name)
+        marks = ", ".join("?" * len(names))
+        return self._query(
+            "SELECT DISTINCT other.display AS name, other.file FROM relationship_members me "
+            "JOIN relationship_members other ON other.file = me.file AND other.name != me.name "
+            f"WHERE me.name IN ({marks}) ORDER BY other.display", names)
+
+    def location_cast(self, location=None):
+        """[{"location", "characters", "scenes"}]: who appears in scenes at each location."""
+        sql = ("SELECT s.location, COUNT(DISTINCT s.file) AS scenes, "
+               "GROUP_CONCAT(sc.display, char(31)) AS characters "
+               "FROM scenes s JOIN scene_characters sc ON sc.file = s.file")
+        params = ()
+        if location:
+            sql += " WHERE s.folded_location = ?"
+            params = (fold(location),)
+        rows = self._query(sql + " GROUP BY s.folded_location ORDER BY scenes DESC, s.location", params)
+        for row in rows:
+            # Unit separator, since names can contain commas; DISTINCT can't take one
+            row["characters"] = sorted(set(row["characters"].split("\x1f")), key=fold)
+        return rows
+
+    def shared_locations(self, a, b):
+        """Locations where scenes feature both characters."""
+        names_a, names_b = self._names_of(a), self._names_of(b)
+        marks_a, marks_b = ", ".join("?" * len(names_a)), ", ".join("?" * len(names_b))
+        rows = self._query(
+            "SELECT DISTINCT s.location FROM scenes s "
+            f"JOIN scene_characters x ON x.file = s.file AND x.name IN ({marks_a}) "
+            f"JOIN scene_characters y ON y.file = s.file AND y.name IN ({marks_b}) "
+            "ORDER BY s.location", names_a + names_b)
+        return [row["location"] for row in rows]
+
+    def bible(self, group=None, role=None):
+        """Story bible rows, optionally filtered by role and group."""
+        if role:
+            rows = self._query("SELECT * FROM bible WHERE role = ? ORDER BY file, row", (role,))
+        else:
+            rows = self._query("SELECT * FROM bible ORDER BY file, row")
+        if group:
+            rows = [r for r in rows if group in _csv_list(r["groups"])]
+        return rows
+
+    def search(self, query, limit=20, kinds=None):
+        """[{"file", "kind", "ref", "title"}] best matches first."""
+        words = [w for w in query.replace('"', " ").split() if w]
+        if not words:
+            return []
+        if self.fts:
+            # Every word must match, as a prefix
+            match = " ".join(f'"{w}"*' for w in words)
+            sql = ("SELECT d.file, d.kind, d.ref, d.title FROM search JOIN search_docs d "
+                   "ON d.rowid = search.rowid WHERE search MATCH ?")
+            params = [match]
+        else:
+            sql = ("SELECT d.file, d.kind, d.ref, d.title FROM search JOIN search_docs d "
+                   "ON d.rowid = search.rowid WHERE "
+                   + " AND ".join("(search.title || ' ' || search.body) LIKE ?" for _ in words))
+            params = [f"%{w}%" for w in words]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY bm25(search)" if self.fts else ""
+        return self._query(sql + " LIMIT ?", params + [limit])
+
+
+def enabled(settings_file=app_settings.SETTINGS_FILE):
+    """True if "sqlite_index" is switched on in the app settings."""
+    return bool(app_settings.get_setting("sqlite_index", settings_file))
+
+
+_dbs = {}
+_dbs_lock = threading.Lock()
+
+
+def get_db(root="."):
+    """The process-wide index for a storyworld root."""
+    with _dbs_lock:
+        db = _dbs.get(os.path.abspath(root))
+        if db is None:
+            db = _dbs[os.path.abspath(root)] = StoryworldDB(root)
+        return db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or update the storyworld SQLite index.")
+    parser.add_argument("--root", default=".", help="Storyworld repository root (default: current folder)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index everything from scratch")
+    args = parser.parse_args(argv)
+
+    db = StoryworldDB(args.root)
+    changed = db.rebuild() if args.rebuild else db.sync()
+    for rel in changed:
+        print(f"🔄 {rel}")
+    print(f"✅ {len(changed)} file(s) indexed into {db.path}" + ("" if db.fts else " (no FTS5: plain search)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
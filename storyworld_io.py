@@ -0,0 +1,112 @@
+"""
+Storyworld File Writing
+=======================
+
+Safe writes for the storyworld JSON files.
+
+- Atomic: data is written to a temp file in the same folder, fsync'ed and
+  renamed over the target, so a crash or a concurrent reader never sees a
+  half-written file.
+- Conflict-checked: callers pass the version (mtime + size) of the file they
+  started editing; if the file changed on disk since then, SaveConflictError
+  is raised instead of silently overwriting someone else's edit.
+- Cache-aware: the written data goes straight into the JSON cache (and the
+  shared Storyworld, if given), so the next render doesn't re-read the file
+  or the folder.
+- Saves of unchanged data are skipped, so double clicks and repeated saves
+  of the same content cost nothing and don't bump the file's mtime.
+"""
+
+import os
+import json
+import tempfile
+import threading
+from collections import defaultdict
+
+import storyworld_cache
+
+
+class SaveConflictError(Exception):
+    """The file changed on disk after the caller loaded it."""
+
+    def __init__(self, path, expected_version, actual_version):
+        super().__init__(f"{path} was changed by someone else since it was loaded")
+        self.path = path
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+
+# One lock per path serializes writers in this process, so the version
+# check and the rename happen together
+_path_locks = defaultdict(threading.Lock)
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    with _path_locks_guard:
+        return _path_locks[os.path.abspath(path)]
+
+
+def file_version(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def atomic_write_text(path, text):
+    """Replace path with text via temp file + fsync + rename."""
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Make the rename itself durable (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(folder, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(path, data, indent=2):
+    atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=False))
+
+
+def save_json(path, data, expected_version=None, indent=2, cache=None, world=None):
+    """Atomically save data to path and update the in-memory stores.
+
+    expected_version is the file_version() the caller loaded; pass None to
+    skip the conflict check (e.g. for new files). Returns the new version.
+    Raises SaveConflictError if the file changed in the meantime.
+    """
+    cache = cache or storyworld_cache.get_cache()
+
+    with _lock_for(path):
+        current_version = file_version(path)
+        if expected_version is not None and current_version != expected_version:
+            raise SaveConflictError(path, expected_version, current_version)
+
+        # Nothing to write if the file already holds exactly this data
+        if current_version is not None and cache.peek(path, current_version) == data:
+            return current_version
+
+        atomic_write_json(path, data, indent=indent)
+        new_version = file_version(path)
+        data = cache.put(path, data, new_version)
+
+    if world is not None:
+        folder = os.path.relpath(os.path.dirname(path), world.root)
+        world.put(folder, os.path.basename(path), data)
+    return new_version
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Storyworld Entity Models
+========================
+
+Compact, typed objects for characters and locations, instead of the nested
+dicts json.load() returns.
+
+The classes are generated from schemas/character-schema.json and
+region-schema.json:
+
+- one __slots__ attribute per schema property, so there is no dict and no
+  copy of the key strings per entity;
+- nested classes for nested objects (static_attributes, dynamic_attributes,
+  signature_traits), and tuples for arrays;
+- interned enum-like strings (pronouns, role, tone, tech_level...), so 100k
+  characters share one "she/her".
+
+Models are read-only Mappings, so code written for the dicts keeps working
+(data.get("name"), "groups" in data, data["static_attributes"]["role"]).
+They also have typed attributes: char.pronouns, char.static_attributes.role,
+with None for properties the file doesn't have. The JSON round trip is
+lossless: to_dict() returns the same keys in the same order, including
+properties the schema doesn't know about.
+
+With "compact_models": true in streamlit_app_settings.json, the JSON cache
+keeps characters and locations as models. Measure the savings with:
+
+    python storyworld_models.py --characters 100000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections.abc import Mapping
+
+SCHEMAS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas")
+
+# Folder -> (class name, schema file)
+MODEL_SCHEMAS = {
+    "characters": ("Character", "character-schema.json"),
+    "locations": ("Location", "region-schema.json"),
+}
+
+# Properties with a small set of recurring values, stored interned
+INTERNED = frozenset({
+    "pronouns", "groups", "role", "nationality", "augmentation_level", "time",
+    "tone", "tech_level", "elevation",
+})
+
+_key_orders = {}  # key tuple -> the same tuple, shared by entities with the same layout
+
+
+def _shared_keys(keys):
+    return _key_orders.setdefault(keys, keys)
+
+
+def _to_json(value):
+    if isinstance(value, Model):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class Model(Mapping):
+    """Base of the generated entity classes."""
+
+    __slots__ = ("_keys", "_extra")
+    _fields = frozenset()  # schema properties stored in slots
+    _nested = {}           # property -> Model class for objects (or array items)
+    _interned = frozenset()
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = object.__new__(cls)
+        fields = cls._fields
+        convert = cls._convert
+        extra = None
+        for key, value in data.items():
+            if key in fields:
+                # Strings of non-interned properties need no conversion
+                setattr(obj, key, value if type(value) is str and key not in cls._interned
+                        else convert(key, value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        obj._keys = _shared_keys(tuple(data))
+        obj._extra = extra
+        return obj
+
+    @classmethod
+    def _convert(cls, key, value):
+        if isinstance(value, str):
+            return sys.intern(value) if key in cls._interned else value
+        nested = cls._nested.get(key)
+        if isinstance(value, dict):
+            return nested.from_dict(value) if nested else value
+        if isinstance(value, list):
+            return tuple(
+                nested.from_dict(item) if nested and isinstance(item, dict)
+                else sys.intern(item) if key in cls._interned and isinstance(item, str)
+                else item
+                for item in value
+            )
+        return value
+
+    def to_dict(self):
+        """The entity as plain JSON data, exactly as it was loaded."""
+        data = {}
+        for key in self._keys:
+            data[key] = _to_json(getattr(self, key)) if key in self._fields else self._extra[key]
+        return data
+
+    def __getattr__(self, name):
+        # Only called for unset slots: a schema property the file doesn't have
+        if name in type(self)._fields:
+            return None
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            return getattr(self, key) if key in self._fields else self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, Model):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _class_name(key):
+    return "".join(part.capitalize() for part in key.split("_"))
+
+
+def model_class(name, schema):
+    """A Model subclass with a slot per property of an object schema."""
+    properties = schema.get("properties") or {}
+    fields = [key for key in properties if key.isidentifier() and not hasattr(Model, key)]
+    nested = {}
+    for key in fields:
+        prop = properties[key]
+        if prop.get("type") == "array" and isinstance(prop.get("items"), dict):
+            prop = prop["items"]
+        if prop.get("type") == "object" and prop.get("properties"):
+            nested[key] = model_class(name + _class_name(key), prop)
+    return type(name, (Model,), {
+        "__slots__": tuple(fields),
+        "__module__": __name__,
+        "__doc__": schema.get("description") or schema.get("title"),
+        "_fields": frozenset(fields),
+        "_nested": nested,
+        "_interned": INTERNED.intersection(fields),
+    })
+
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_model(folder, schemas_folder=SCHEMAS_FOLDER):
+    """The model class for a folder's entities, generated from its schema on first use."""
+    with _lock:
+        cls = _models.get((folder, schemas_folder))
+        if cls is None:
+            name, filename = MODEL_SCHEMAS[folder]
+            with open(os.path.join(schemas_folder, filename), "r", encoding="utf-8") as f:
+                cls = _models[(folder, schemas_folder)] = model_class(name, json.load(f))
+        return cls
+
+
+def __getattr__(name):
+    # storyworld_models.Character / .Location, generated when first used
+    for folder, (class_name, _) in MODEL_SCHEMAS.items():
+        if name == class_name:
+            return get_model(folder)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def as_model(folder, data):
+    """data as its folder's model (converting a plain dict if needed)."""
+    if isinstance(data, Model) or not isinstance(data, dict) or "error" in data:
+        return data
+    return get_model(folder).from_dict(data)
+
+
+def compact(filepath, data):
+    """JSON cache transform: models for character and location files, the rest unchanged."""
+    folder = os.path.basename(os.path.dirname(filepath))
+    return as_model(folder, data) if folder in MODEL_SCHEMAS else data
+
+
+def to_json(data):
+    """Plain JSON data for a model (or data that already is plain)."""
+    return data.to_dict() if isinstance(data, Model) else data
+
+
+# === MEMORY MEASUREMENT ===
+
+def measure(characters=100000, seed=42):
+    """Memory of `characters` synthetic characters as dicts vs models; returns a report dict."""
+    import gc
+    import random
+    import tracemalloc
+    from storyworld_bench import make_character
+
+    rng = random.Random(seed)
+    names = []
+    documents = []
+    for i in range(characters):
+        data, _ = make_character(rng, i, names)
+        names.append(data["name"])
+        documents.append(json.dumps(data, ensure_ascii=False))
+    names = None
+
+    def traced(build):
+        # Timed without tracemalloc (it slows allocation down), then measured
+        start = time.perf_counter()
+        build()
+        seconds = time.perf_counter() - start
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size, seconds
+
+    dicts, dict_bytes, dict_seconds = traced(lambda: [json.loads(doc) for doc in documents])
+    lossless = all(
+        json.dumps(as_model("characters", data).to_dict(), ensure_ascii=False) == doc
+        for doc, data in zip(documents, dicts)
+    )
+    dicts = None
+
+    Character = get_model("characters")
+    models, model_bytes, model_seconds = traced(
+        lambda: [Character.from_dict(json.loads(doc)) for doc in documents])
+    models = None
+
+    return {
+        "characters": characters,
+        "dict_bytes": dict_bytes,
+        "model_bytes": model_bytes,
+        "saved": 1 - model_bytes / dict_bytes,
+        "dict_seconds": dict_seconds,
+        "model_seconds": model_seconds,
+        "lossless": lossless,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure memory of characters as dicts vs compact models.")
+    parser.add_argument("--characters", type=int, default=100000, help="Synthetic characters (default: 100000)")
+    parser.add_argument("--seed", type=int, default=42, help="Generator seed (default: 42)")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Loading {args.characters} synthetic characters both ways...")
+    report = measure(args.characters, args.seed)
+    mib = 1024 * 1024
+    print(f"   dicts:  {report['dict_bytes'] / mib:>8.1f} MiB  ({report['dict_seconds']:.2f} s)")
+    print(f"   models: {report['model_bytes'] / mib:>8.1f} MiB  ({report['model_seconds']:.2f} s)")
+    print(f"   saved:  {report['saved']:.0%}")
+    print(f"{'✅' if report['lossless'] else '❌'} JSON round trip {'lossless' if report['lossless'] else 'CHANGED data'}")
+    return 0 if report["lossless"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Storyworld File Watcher
+=======================
+
+Background thread that notices changed storyworld files (an editor save, a
+`git pull` in run_all_storyworld.bat...) and applies them to the shared
+in-memory store, instead of every Streamlit rerun re-checking every file.
+
+- Events come from inotify on Linux, or from polling the folders' mtimes and
+  sizes everywhere else (and whenever inotify isn't available).
+- Events are batched: a batch is applied once the folders have been quiet for
+  DEBOUNCE seconds (at most MAX_DELAY after its first event), so a pull that
+  touches 5k files becomes one update.
+- Only the affected entries are re-read: the JSON cache, the shared
+  Storyworld and the SQLite index (if any) are updated per file.
+- Each applied batch bumps `generation`; open sessions that called
+  auto_refresh() notice it and rerun.
+"""
+
+import os
+import sys
+import time
+import struct
+import select
+import threading
+import ctypes
+import ctypes.util
+
+import scene_store
+from storyworld import FOLDERS, METADATA_FILE
+
+METADATA_FOLDER = os.path.dirname(METADATA_FILE)
+
+DEBOUNCE = 0.5       # seconds without events before a batch is applied
+MAX_DELAY = 5.0      # ...but never hold a batch longer than this
+POLL_INTERVAL = 1.0  # seconds between scans for the polling backend
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MODIFY
+EVENT_HEADER = struct.Struct("iIII")
+
+RESCAN = None  # filename meaning "re-read the whole folder"
+
+
+def is_watched(folder, filename):
+    """Does a change to folder/filename matter to the storyworld?"""
+    if filename.startswith(".tmp-"):
+        return False  # atomic-write temp files
+    if folder == "":
+        return filename.endswith(".csv")
+    if folder == scene_store.SCENE_FOLDER:
+        return scene_store.is_scene_file(filename)
+    return filename.endswith(".json")
+
+
+class InotifyBackend:
+    """Change events from the Linux kernel; raises OSError where unsupported."""
+
+    def __init__(self, root, folders):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.folders = set(folders)
+        self._watches = {}  # watch descriptor -> folder ("" for the root)
+        self._watch("")
+        for folder in folders:
+            self._watch(folder)
+
+    def _watch(self, folder):
+        path = os.path.join(self.root, folder) if folder else self.root
+        if not os.path.isdir(path):
+            return False
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._watches[wd] = folder
+        return True
+
+    def read(self, timeout):
+        """[(folder, filename or RESCAN)] that changed; waits up to timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buffer = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = os.fsdecode(buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events: re-read everything
+                return [(folder, RESCAN) for folder in self.folders]
+            folder = self._watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_ISDIR:
+                # A watched folder appeared (e.g. first pull that adds relationships/)
+                if folder == "" and name in self.folders and self._watch(name):
+                    events.append((name, RESCAN))
+                continue
+            if is_watched(folder, name):
+                events.append((folder, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Change events from comparing mtime and size of every file, periodically."""
+
+    def __init__(self, root, folders, interval=POLL_INTERVAL):
+        self.root = root
+        self.folders = ["", *folders]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for folder in self.folders:
+            path = os.path.join(self.root, folder) if folder else self.root
+            if not os.path.isdir(path):
+                continue
+            with os.scandir(path) as it:
+                for entry in it:
+                    if is_watched(folder, entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        snapshot[(folder, entry.name)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval) if timeout is not None else self.interval)
+        snapshot = self._scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        changed = [key for key, version in snapshot.items() if previous.get(key) != version]
+        changed.extend(key for key in previous if key not in snapshot)
+        return changed
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    """Watches a Storyworld's folders and applies changes in batches."""
+
+    def __init__(self, world, db=None, debounce=DEBOUNCE, max_delay=MAX_DELAY, backend=None):
+        self.world = world
+        self.db = db
+        self.debounce = debounce
+        self.max_delay = max_delay
+        folders = [*FOLDERS, METADATA_FOLDER]
+        if backend is None:
+            try:
+                backend = InotifyBackend(world.root, folders)
+            except (OSError, AttributeError):
+                backend = PollingBackend(world.root, folders)
+        self.backend = backend
+        self.generation = 0
+        self.batches = 0
+        self.files = 0
+        self.last_error = None   # why the last batch failed, shown by auto_refresh()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        return "inotify" if isinstance(self.backend, InotifyBackend) else "polling"
+
+    def start(self):
+        if self.db is not None:
+            self.db.sync()  # Catch up on changes made while nobody was watching
+        self._thread = threading.Thread(target=self._run, name="storyworld-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.backend.close()
+
+    def _run(self):
+        pending = {}  # folder -> set of filenames (RESCAN for the whole folder)
+        first_event = last_event = None
+        while not self._stop.is_set():
+            timeout = self.debounce if pending else 1.0
+            for folder, filename in self.backend.read(timeout):
+                pending.setdefault(folder, set()).add(filename)
+                last_event = time.monotonic()
+                first_event = first_event or last_event
+
+            now = time.monotonic()
+            if pending and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                try:
+                    self.apply(pending)
+                    self.last_error = None
+                except Exception as e:  # Keep watching; the next rerun re-reads from disk
+                    print(f"⚠️ Storyworld watcher: {e}")
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    self.world.invalidate()
+                    # Open sessions rerun, re-read from disk and show the error
+                    self.generation += 1
+                pending = {}
+                first_event = last_event = None
+
+    def apply(self, changes):
+        """Apply one batch {folder: {filenames}} to the shared stores."""
+        paths = []
+        full_sync = False
+        for folder, filenames in changes.items():
+            if RESCAN in filenames:
+                full_sync = True
+                if folder in FOLDERS:
+                    self.world.invalidate(folder)
+                elif folder == METADATA_FOLDER:
+                    self.world.apply_changes(folder, ())
+                continue
+            if folder:
+                self.world.apply_changes(folder, filenames)
+            paths.extend(f"{folder}/{name}" if folder else name for name in filenames)
+
+        if self.db is not None:
+            self.db.sync(None if full_sync else paths)
+        self.batches += 1
+        self.files += sum(len(filenames) for filenames in changes.values())
+        # Bumped last, so sessions that rerun see the finished update
+        self.generation += 1
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(world, db=None):
+    """The running watcher for a Storyworld, started on first use."""
+    with _watchers_lock:
+        watcher = _watchers.get(id(world))
+        if watcher is None:
+            watcher = _watchers[id(world)] = Watcher(world, db).start()
+        return watcher
+
+
+def auto_refresh(watcher, every=2.0):
+    """Rerun this Streamlit session whenever the watcher applies a batch.
+
+    Call once per script run; it checks a counter every `every` seconds.
+    Shows the watcher's last error, if its last batch failed.
+    """
+    import streamlit as st
+
+    if watcher.last_error:
+        st.warning(f"⚠️ Storyworld watcher: {watcher.last_error}. Files are re-read from disk until it recovers.")
+
+    key = "storyworld_watch_generation"
+    # This run already sees everything applied so far
+    st.session_state[key] = watcher.generation
+
+    @st.fragment(run_every=every)
+    def check_for_changes():
+        if watcher.generation != st.session_state[key]:
+            st.session_state[key] = watcher.generation
+            st.rerun(scope="app")
+
+    check_for_changes()
@@ -0,0 +1,87 @@
+"""
+Bible Sync Tests
+================
+
+    python -m pytest test_bible_sync.py
+"""
+
+import os
+import csv
+import json
+import shutil
+
+import bible_sync
+import schema_registry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _rows(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_conflict_is_kept_across_syncs(tmp_path):
+    folder = tmp_path / "characters"
+    folder.mkdir()
+    csv_path = str(tmp_path / "bible.csv")
+    state_file = str(tmp_path / "state.pkl")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows([["Name", "Pronouns"], ["Ann Charlotte", "she/her"], ["Mira Nguyen", "they/she"]])
+    for filename, data in [("ann.json", {"id": "ann", "name": "Ann Charlotte", "pronouns": "she/they"}),
+                           ("mira.json", {"id": "mira", "name": "Mira Nguyen", "pronouns": "they/she"})]:
+        (folder / filename).write_text(json.dumps(data), encoding="utf-8")
+
+    first = bible_sync.sync(csv_path, str(folder), state_file=state_file)
+    assert first["conflicts"] == ["ann charlotte"]
+    rows = _rows(csv_path)
+
+    second = bible_sync.sync(csv_path, str(folder), state_file=state_file)
+    assert second["conflicts"] == ["ann charlotte"]
+    assert not second["csv_added"]
+    assert _rows(csv_path) == rows
+
+
+def test_repo_conflicts_dont_duplicate_rows(tmp_path):
+    shutil.copytree(os.path.join(HERE, bible_sync.CHAR_FOLDER), tmp_path / "characters")
+    csv_path = shutil.copy(os.path.join(HERE, bible_sync.BIBLE_FILE), tmp_path)
+    folder = str(tmp_path / "characters")
+    state_file = str(tmp_path / "state.pkl")
+
+    first = bible_sync.sync(csv_path, folder, state_file=state_file)
+    rows = len(_rows(csv_path))
+    second = bible_sync.sync(csv_path, folder, state_file=state_file)
+
+    assert first["conflicts"]
+    assert second["conflicts"] == first["conflicts"]
+    assert not second["csv_added"]
+    assert len(_rows(csv_path)) == rows
+
+
+def test_created_files_are_schema_valid(tmp_path):
+    shutil.copytree(os.path.join(HERE, bible_sync.CHAR_FOLDER), tmp_path / "characters")
+    csv_path = shutil.copy(os.path.join(HERE, bible_sync.BIBLE_FILE), tmp_path)
+    folder = tmp_path / "characters"
+    existing = set(os.listdir(os.path.join(HERE, bible_sync.CHAR_FOLDER)))
+
+    result = bible_sync.sync(csv_path, str(folder), prefer=bible_sync.CSV_SIDE,
+                             state_file=str(tmp_path / "state.pkl"))
+    created = [f for f in result["json_written"] if f not in existing]
+    assert created
+
+    registry = schema_registry.SchemaRegistry(os.path.join(HERE, schema_registry.SCHEMAS_FOLDER))
+    registry.refresh()
+    for filename in created:
+        data = json.loads((folder / filename).read_text(encoding="utf-8"))
+        is_valid, message = registry.validate(data, "character")
+        assert is_valid, f"{filename}: {message}"
+
+
+def test_template_is_not_exported(tmp_path):
+    shutil.copytree(os.path.join(HERE, bible_sync.CHAR_FOLDER), tmp_path / "characters")
+    csv_path = shutil.copy(os.path.join(HERE, bible_sync.BIBLE_FILE), tmp_path)
+
+    result = bible_sync.sync(csv_path, str(tmp_path / "characters"), prefer=bible_sync.CSV_SIDE,
+                             state_file=str(tmp_path / "state.pkl"))
+    assert bible_sync.NEW_CHARACTER_FILE not in result["csv_added"]
+    assert "New Character" not in [row[0] for row in _rows(csv_path)]
@@ -0,0 +1,267 @@
+"""
+Storyworld Timeline
+===================
+
+Puts the free-text time labels of characters' dynamic_attributes and
+relationships' dynamic_states ("before China trip", "Rwanda offer received",
+"2033") on one ordered timeline, and stores every trait as a compact series
+over it.
+
+- Ordering: each character's list is already chronological, and labels with a
+  year or date are ordered by it; the timeline is a topological merge of both.
+- Series: per (entity, trait) an array of time indexes plus the values, so
+  "state at T" is one binary search per series.
+- Change log: every change sorted by time, so "what changed between T1 and
+  T2" is two binary searches plus the changes in between.
+
+A trait keeps its value until a later time point changes it. Relationships
+appear as entities named "A & B".
+"""
+
+import re
+import heapq
+import bisect
+import threading
+from array import array
+from collections.abc import Mapping
+
+from search_index import fold
+
+YEAR_RE = re.compile(r"\b(\d{4})(?:-(\d{2}))?(?:-(\d{2}))?")
+
+
+def date_key(label):
+    """(year, month, day) found in a time label, or None."""
+    match = YEAR_RE.search(str(label))
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return (int(year), int(month or 0), int(day or 0))
+
+
+def time_key(label, position=0):
+    """Sortable key for a time label: dated labels by date, others by position."""
+    date = date_key(label)
+    if date:
+        return (0, *date, position)
+    return (1, 0, 0, 0, position)
+
+
+def label_key(label):
+    return " ".join(fold(str(label)).split())
+
+
+def flatten_state(state, prefix=""):
+    """{"personality": {"trust": "x"}} -> {"personality.trust": "x"}, minus "time"."""
+    flat = {}
+    for key, value in state.items():
+        if key == "time" and not prefix:
+            continue
+        if isinstance(value, Mapping):
+            flat.update(flatten_state(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def order_labels(sequences):
+    """Merge chronological label sequences into one ordered list of label keys.
+
+    Labels that appear earlier in any sequence come first, dated labels keep
+    their date order; ties go to the label seen first. Contradictions (A
+    before B in one list, B before A in another) are broken by first sighting.
+    """
+    first_seen = {}
+    labels = {}
+    for sequence in sequences:
+        for label in sequence:
+            key = label_key(label)
+            if key not in first_seen:
+                first_seen[key] = len(first_seen)
+                labels[key] = label
+
+    after = {key: set() for key in first_seen}
+    for sequence in sequences:
+        keys = [label_key(label) for label in sequence]
+        for a, b in zip(keys, keys[1:]):
+            if a != b:
+                after[a].add(b)
+    dated = sorted((k for k in first_seen if date_key(labels[k])), key=lambda k: date_key(labels[k]))
+    for a, b in zip(dated, dated[1:]):
+        if date_key(labels[a]) != date_key(labels[b]):
+            after[a].add(b)
+
+    incoming = {key: 0 for key in first_seen}
+    for targets in after.values():
+        for b in targets:
+            incoming[b] += 1
+
+    ready = [(first_seen[k], k) for k, n in incoming.items() if n == 0]
+    heapq.heapify(ready)
+    order = []
+    placed = set()
+    while len(order) < len(first_seen):
+        if not ready:
+            # Cycle: release the earliest-seen label still waiting
+            key = min((k for k in first_seen if k not in placed), key=first_seen.get)
+            ready.append((first_seen[key], key))
+            incoming[key] = 0
+        _, key = heapq.heappop(ready)
+        if key in placed:
+            continue
+        placed.add(key)
+        order.append(key)
+        for b in after[key]:
+            incoming[b] -= 1
+            if incoming[b] == 0 and b not in placed:
+                heapq.heappush(ready, (first_seen[b], b))
+    return order, labels
+
+
+class Timeline:
+    """Ordered time points with per-entity trait series."""
+
+    def __init__(self, entries):
+        """entries: [(entity, [(time label, {trait: value}), ...])] in story order."""
+        order, labels = order_labels([[label for label, _ in states] for _, states in entries])
+        self.labels = [labels[key] for key in order]
+        self._index = {key: i for i, key in enumerate(order)}
+        self._dated = sorted(
+            (date_key(label), i) for i, label in enumerate(self.labels) if date_key(label)
+        )
+
+        self._series = {}   # entity -> {trait: (array of time indexes, [values])}
+        changes = []
+        for entity, states in entries:
+            traits = self._series.setdefault(entity, {})
+            points = sorted(
+                (self._index[label_key(label)], position, state)
+                for position, (label, state) in enumerate(states)
+            )
+            for t, _, state in points:
+                for trait, value in state.items():
+                    times, values = traits.setdefault(trait, (array("l"), []))
+                    if values and values[-1] == value:
+                        continue
+                    if times and times[-1] == t:
+                        values[-1] = value
+                        continue
+                    times.append(t)
+                    values.append(value)
+                    changes.append((t, entity, trait))
+        changes.sort(key=lambda c: c[0])
+        self._change_times = array("l", (c[0] for c in changes))
+        self._changes = [c[1:] for c in changes]
+
+    @classmethod
+    def build(cls, characters, relationships):
+        """Build from loaded {filename: data} of characters/ and relationships/."""
+        entries = []
+        for filename in sorted(characters):
+            data = characters[filename]
+            if "error" in data:
+                continue
+            states = [
+                (period.get("time", ""), flatten_state(period))
+                for period in data.get("dynamic_attributes") or []
+                if isinstance(period, Mapping)
+            ]
+            if states:
+                entries.append((data.get("name") or filename, states))
+
+        for filename in sorted(relationships):
+            data = relationships[filename]
+            if "error" in data:
+                continue
+            relationship = data.get("relationship", data)
+            states = [
+                (state.get("time", ""), flatten_state(state))
+                for state in relationship.get("dynamic_states") or []
+                if isinstance(state, dict)
+            ]
+            if states:
+                entries.append((" & ".join(relationship.get("between") or [filename]), states))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def entities(self):
+        return sorted(self._series, key=fold)
+
+    def index_of(self, time):
+        """Position of a time label (or index) on the timeline, or None.
+
+        Unknown labels containing a year land on the last point dated at or
+        before it.
+        """
+        if isinstance(time, int):
+            return time if 0 <= time < len(self.labels) else None
+        index = self._index.get(label_key(time))
+        if index is not None:
+            return index
+        date = date_key(time)
+        if date is None:
+            return None
+        i = bisect.bisect_right(self._dated, (date, len(self.labels)))
+        return self._dated[i - 1][1] if i else None
+
+    def _resolve(self, time):
+        index = self.index_of(time)
+        if index is None:
+            raise KeyError(f"Unknown time point: {time!r}")
+        return index
+
+    @staticmethod
+    def _value_at(series, t):
+        times, values = series
+        i = bisect.bisect_right(times, t)
+        return values[i - 1] if i else None
+
+    def entity_at(self, entity, time):
+        """{trait: value} of one entity at a time point."""
+        t = self._resolve(time)
+        state = {}
+        for trait, series in self._series.get(entity, {}).items():
+            value = self._value_at(series, t)
+            if value is not None:
+                state[trait] = value
+        return state
+
+    def state_at(self, time):
+        """{entity: {trait: value}} for every entity known at a time point."""
+        t = self._resolve(time)
+        states = {}
+        for entity in self._series:
+            state = self.entity_at(entity, t)
+            if state:
+                states[entity] = state
+        return states
+
+    def changes_between(self, start, end):
+        """[(time label, entity, trait, old value, new value)] after start up to end."""
+        t1, t2 = self._resolve(start), self._resolve(end)
+        lo = bisect.bisect_right(self._change_times, t1)
+        hi = bisect.bisect_right(self._change_times, t2)
+        changes = []
+        for t, (entity, trait) in zip(self._change_times[lo:hi], self._changes[lo:hi]):
+            series = self._series[entity][trait]
+            changes.append((self.labels[t], entity, trait, self._value_at(series, t - 1), self._value_at(series, t)))
+        return changes
+
+
+_timeline = None
+_timeline_sources = (None, None)
+_timeline_lock = threading.Lock()
+
+
+def get_timeline(world):
+    """Timeline for a Storyworld, rebuilt only if its characters or relationships changed."""
+    global _timeline, _timeline_sources
+    characters = world.items("characters")
+    relationships = world.items("relationships")
+    with _timeline_lock:
+        if _timeline is None or _timeline_sources[0] is not characters or _timeline_sources[1] is not relationships:
+            _timeline = Timeline.build(characters, relationships)
+            _timeline_sources = (characters, relationships)
+        return _timeline
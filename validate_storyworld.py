@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Storyworld Validator
+====================
+
+Headless schema check for the whole storyworld, e.g. for CI:
+
+    python validate_storyworld.py
+    python validate_storyworld.py --format json --jobs 8
+
+Every JSON file in characters/, locations/, scenes/ and relationships/ is
+checked on a process pool, using the same compiled schemas as the Streamlit
+explorer. All errors are collected (not just the first one per file) and the
+exit code is 1 if anything failed, 0 otherwise.
+
+Folders without a schema are still checked for well-formed JSON; line-based
+scenes (.jsonl) are checked line by line.
+"""
+
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import schema_registry
+import scene_store
+
+# Folder -> schema type (None = only check that the JSON parses)
+FOLDER_SCHEMAS = {
+    "characters": "character",
+    "locations": "region",
+    "scenes": None,
+    "relationships": None,
+}
+
+# Below this many files the pool start-up costs more than it saves
+MIN_FILES_FOR_POOL = 200
+
+_worker_registry = None
+
+
+def _init_worker(schemas_folder):
+    global _worker_registry
+    _worker_registry = schema_registry.SchemaRegistry(schemas_folder)
+    _worker_registry.refresh()
+
+
+def validate_file(task):
+    """Validate one file and return {"file", "schema", "errors": [...]}."""
+    filepath, schema_type = task
+    result = {"file": filepath, "schema": schema_type, "errors": []}
+
+    try:
+        if filepath.endswith(scene_store.LINES_EXT):
+            data = scene_store.read_scene(filepath)
+            bad_lines = [i for i, entry in enumerate(data.get("dialogue", []), 1) if "error" in entry]
+            if "error" in data or bad_lines:
+                raise ValueError(data.get("error") or f"unreadable dialogue line(s) {bad_lines}")
+        else:
+            with open(filepath, "r", encoding="utf-8") as f:
+                data = json.load(f)
+    except Exception as e:
+        result["errors"].append({"path": "", "message": f"Invalid JSON: {e}"})
+        return result
+
+    if schema_type:
+        for error in _worker_registry.iter_errors(data, schema_type):
+            result["errors"].append({
+                "path": "/".join(str(part) for part in error.absolute_path),
+                "message": error.message,
+            })
+    return result
+
+
+def collect_files(root):
+    """List (filepath, schema_type) for every JSON file in the entity folders."""
+    tasks = []
+    for folder, schema_type in FOLDER_SCHEMAS.items():
+        folder_path = os.path.normpath(os.path.join(root, folder))
+        if not os.path.isdir(folder_path):
+            continue
+        for filename in sorted(os.listdir(folder_path)):
+            if filename.endswith(".json") or (folder == "scenes" and filename.endswith(scene_store.LINES_EXT)):
+                tasks.append((os.path.join(folder_path, filename), schema_type))
+    return tasks
+
+
+def validate_storyworld(root=".", jobs=None):
+    """Validate every entity file under root and return the per-file results."""
+    schemas_folder = os.path.join(root, schema_registry.SCHEMAS_FOLDER)
+    tasks = collect_files(root)
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(tasks) < MIN_FILES_FOR_POOL:
+        _init_worker(schemas_folder)
+        return [validate_file(task) for task in tasks]
+
+    # Big chunks keep the inter-process overhead per file small
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(schemas_folder,)
+    ) as pool:
+        return list(pool.map(validate_file, tasks, chunksize=chunksize))
+
+
+def print_report(results):
+    failed = [r for r in results if r["errors"]]
+    for result in failed:
+        print(f"❌ {result['file']}")
+        for error in result["errors"]:
+            where = f" at {error['path']}" if error["path"] else ""
+            print(f"   - {error['message']}{where}")
+
+    error_count = sum(len(r["errors"]) for r in failed)
+    print()
+    print(f"📊 Summary:")
+    print(f"   Files checked: {len(results)}")
+    print(f"   Files with errors: {len(failed)}")
+    print(f"   Total errors: {error_count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate all storyworld JSON files against their schemas.")
+    parser.add_argument("--root", default=".", help="Storyworld repository root (default: current folder)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Report format")
+    args = parser.parse_args(argv)
+
+    schemas = schema_registry.SchemaRegistry(os.path.join(args.root, schema_registry.SCHEMAS_FOLDER))
+    schemas.refresh()
+    if schemas.load_errors():
+        for schema_type, error in schemas.load_errors().items():
+            print(f"❌ Couldn't load {schema_type} schema: {error}", file=sys.stderr)
+        return 2
+
+    results = validate_storyworld(args.root, args.jobs)
+
+    if args.format == "json":
+        failed = [r for r in results if r["errors"]]
+        json.dump({
+            "files_checked": len(results),
+            "files_with_errors": len(failed),
+            "results": failed,
+        }, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(results)
+
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())